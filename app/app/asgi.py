@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# Warm up in the background, /readyz reports ready once done.
+from core.startup import readiness  # noqa: E402
+readiness.start()
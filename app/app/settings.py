@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'drf_spectacular',
     'core',
     'rest_framework',
@@ -45,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.HealthCheckMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +55,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ProfilerMiddleware',
+    'core.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -78,16 +83,47 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections come from a per-process pool (core.db.backends.postgresql) of
+# at most DB_POOL_MAX_SIZE connections; Django returns them to it at the end
+# of each request. With DB_POOL_MAX_SIZE=0, DB_CONN_MAX_AGE keeps a
+# persistent connection per thread instead.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'NAME': os.environ.get('DB_NAME'),
         'HOST': os.environ.get('DB_HOST'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'CHECK_AFTER': float(os.environ.get('DB_POOL_CHECK_AFTER', 30)),
+        },
     }
 }
 
+# Read replicas of the default database, one per host of DB_REPLICA_HOSTS.
+# Safe requests of the recipe, ingredient and user views read from them,
+# except for users who wrote in the last DB_REPLICA_PIN_SECONDS
+# (core.db.routers), pinned in the `replica_pins` cache. Tests get a
+# separate database per replica. Test settings (app.settings_test) disable
+# the routing, only core.tests.test_replica_routing reads from a replica, so
+# pointing DB_REPLICA_HOSTS at DB_HOST tests the routing locally with two
+# databases.
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'NAME': f"test_{DATABASES['default']['NAME']}_replica{index}"},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+DATABASE_REPLICA_PIN_CACHE_ALIAS = 'replica_pins'
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -107,6 +143,30 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (core.hashers). New hashes use PASSWORD_HASHER with the
+# work factors below, which `manage.py calibrate_hashers` picks for a target
+# latency on the host. Hashes of the other algorithms, or of other work
+# factors, are rehashed at the next successful login. argon2 and bcrypt_sha256
+# need the argon2-cffi and bcrypt packages.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2_sha256')
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+PASSWORD_ARGON2_TIME_COST = int(os.environ.get('PASSWORD_ARGON2_TIME_COST', 2))
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get('PASSWORD_BCRYPT_ROUNDS', 12))
+PASSWORD_SCRYPT_WORK_FACTOR = int(os.environ.get('PASSWORD_SCRYPT_WORK_FACTOR', 2 ** 14))
+_PASSWORD_HASHERS = {
+    'pbkdf2_sha256': 'core.hashers.PBKDF2PasswordHasher',
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt_sha256': 'core.hashers.BCryptSHA256PasswordHasher',
+    'scrypt': 'core.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for algorithm, path in _PASSWORD_HASHERS.items() if algorithm != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+# Seconds the password hash counts of /metrics are kept.
+PASSWORD_METRICS_TTL = int(os.environ.get('PASSWORD_METRICS_TTL', 300))
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
@@ -131,6 +191,159 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.UserProfile'
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Picked by the Accept and Content-Type headers, JSON is the default.
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    # Proxies in front of the app, whose X-Forwarded-For entries identify
+    # clients for throttling. With 0, the address of the connection is used.
+    'NUM_PROXIES': int(os.environ.get('API_NUM_PROXIES', 0)),
 }
 
+
+# Keyset pagination of the recipe and ingredient list endpoints.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+
+# Maximum number of recipes accepted by /api/recipe/recipes/batch/.
+RECIPE_BATCH_MAX_SIZE = int(os.environ.get('RECIPE_BATCH_MAX_SIZE', 1000))
+
+# Cache of token key -> user used by core.authentication.CachedTokenAuthentication.
+# Entries are invalidated when a token is deleted or its user saved, so the
+# cache must be shared by the workers: the `tokens` entry of CACHES. Empty the
+# alias for a per-process cache, only correct with a single worker process.
+TOKEN_AUTH_CACHE_ALIAS = os.environ.get('TOKEN_AUTH_CACHE_ALIAS', 'tokens')
+TOKEN_AUTH_CACHE_TTL = int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 300))
+TOKEN_AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_AUTH_CACHE_MAX_ENTRIES', 10000))
+
+# Caches
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The `responses` cache holds the per-user recipe/ingredient responses. It
+# may stay per process: a response is only served under the current data
+# version, whichever process bumped it.
+# The `data_versions` cache holds the per-user versions (core.cache) that
+# their keys and ETags embed. Every process, including management commands
+# writing recipes, bumps them there, so it defaults to the database cache.
+# The `tokens` cache holds authenticated tokens (see TOKEN_AUTH_CACHE_ALIAS)
+# and defaults to the database cache, which every worker shares. Hits on it
+# still cost a query, so saving the token query of each request takes a
+# memcached or Redis TOKEN_AUTH_CACHE_BACKEND.
+# The `replica_pins` cache holds the read-your-writes pins of the replica
+# routing. It must be shared by the workers and must not evict live pins, so
+# it defaults to the database cache (`manage.py createcachetable`), sized far
+# above the number of users writing within DB_REPLICA_PIN_SECONDS.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'responses'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 5000)),
+        },
+    },
+    'data_versions': {
+        'BACKEND': os.environ.get('DATA_VERSION_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('DATA_VERSION_CACHE_LOCATION', 'data_versions'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DATA_VERSION_CACHE_MAX_ENTRIES', 1000000)),
+        },
+    },
+    'tokens': {
+        'BACKEND': os.environ.get('TOKEN_AUTH_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('TOKEN_AUTH_CACHE_LOCATION', 'auth_tokens'),
+        'OPTIONS': {
+            'MAX_ENTRIES': TOKEN_AUTH_CACHE_MAX_ENTRIES,
+        },
+    },
+    'replica_pins': {
+        'BACKEND': os.environ.get('DB_REPLICA_PIN_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('DB_REPLICA_PIN_CACHE_LOCATION', 'replica_pins'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DB_REPLICA_PIN_CACHE_MAX_ENTRIES', 1000000)),
+        },
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+DATA_VERSION_CACHE_ALIAS = 'data_versions'
+# Expired versions are replaced, so this only bounds how long a version kept
+# in a cache that is not shared can go stale.
+DATA_VERSION_TIMEOUT = int(os.environ.get('DATA_VERSION_TIMEOUT', 86400))
+
+# Number of recipes read per server-side cursor fetch by /api/recipe/recipes/export/.
+RECIPE_EXPORT_CHUNK_SIZE = int(os.environ.get('RECIPE_EXPORT_CHUNK_SIZE', 1000))
+
+# Default and maximum number of matches returned by /api/ingredient/ingredients/autocomplete/.
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(os.environ.get('INGREDIENT_AUTOCOMPLETE_LIMIT', 10))
+INGREDIENT_AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get('INGREDIENT_AUTOCOMPLETE_MAX_LIMIT', 50))
+
+# Build list and retrieve responses of the recipe and ingredient endpoints
+# from values() rows instead of model instances (core.mixins.ValuesReadMixin).
+API_FAST_READS = os.environ.get('API_FAST_READS', '1') == '1'
+
+# Serve list and retrieve of recipes and ingredients, and GET of the user
+# endpoint, from async handlers (core.async_views). Opt-in, under ASGI only:
+# they measured slower than the sync views run in threads.
+API_ASYNC_READS = os.environ.get('API_ASYNC_READS', '0') == '1'
+# Requests served at once by those views per process. Each one holds a
+# database connection, so the default is the size of the pool and requests
+# wait for a slot rather than for a connection.
+API_ASYNC_MAX_CONCURRENCY = int(
+    os.environ.get('API_ASYNC_MAX_CONCURRENCY', DATABASES['default']['POOL']['MAX_SIZE'] or 20)
+)
+
+# Startup (core.startup). wait_for_db and the warm-up retry with exponential
+# backoff until their timeout. /readyz reports ready once every warm-up step
+# has run; STARTUP_WARM_UP=0 skips them.
+STARTUP_WAIT_FOR_DB_TIMEOUT = float(os.environ.get('STARTUP_WAIT_FOR_DB_TIMEOUT', 60))
+STARTUP_WARM_UP_TIMEOUT = float(os.environ.get('STARTUP_WARM_UP_TIMEOUT', 60))
+STARTUP_WARM_UP_CONNECTIONS = int(os.environ.get('STARTUP_WARM_UP_CONNECTIONS', 4))
+STARTUP_WARM_UP_STEPS = [
+    'core.startup.open_connections',
+    'core.startup.populate_url_resolvers',
+    'core.startup.compile_serializers',
+    'core.startup.prime_caches',
+] if os.environ.get('STARTUP_WARM_UP', '1') == '1' else []
+
+# Prometheus text endpoint of core.middleware.MetricsMiddleware. Served to
+# clients of METRICS_ALLOWED_IPS (addresses or networks, comma separated) or
+# sending `Authorization: Bearer <METRICS_TOKEN>`, refused to the others.
+METRICS_PATH = os.environ.get('METRICS_PATH', '/metrics')
+METRICS_ALLOWED_IPS = [value for value in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if value]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# On-demand profiler of core.middleware.ProfilerMiddleware, for staff users
+# sending `X-Profile: 1` or `?profile=1`. Profiles are browsable in the admin,
+# only the latest PROFILER_MAX_PROFILES are kept.
+PROFILER_MAX_PROFILES = int(os.environ.get('PROFILER_MAX_PROFILES', 100))
+# Functions listed in the stored CPU profile, by cumulative time.
+PROFILER_MAX_FUNCTIONS = int(os.environ.get('PROFILER_MAX_FUNCTIONS', 50))
+
+# Token bucket throttles (core.throttling). A rate `num/period` (s, min, hour
+# or day) lets bursts of num requests through, then num per period. Empty
+# rates disable their throttle. Buckets are kept per process unless
+# THROTTLE_CACHE_ALIAS names an entry of CACHES shared by the workers.
+THROTTLE_CACHE_ALIAS = os.environ.get('THROTTLE_CACHE_ALIAS', '')
+THROTTLE_MAX_ENTRIES = int(os.environ.get('THROTTLE_MAX_ENTRIES', 100000))
+THROTTLE_RATES = {
+    # /api/user/token/, per client IP and per email.
+    'token-ip': os.environ.get('THROTTLE_RATE_TOKEN_IP', '30/min') or None,
+    'token-account': os.environ.get('THROTTLE_RATE_TOKEN_ACCOUNT', '10/min') or None,
+    # /api/user/create/.
+    'create-ip': os.environ.get('THROTTLE_RATE_CREATE_IP', '20/hour') or None,
+    'create-account': os.environ.get('THROTTLE_RATE_CREATE_ACCOUNT', '5/hour') or None,
+    # Recipe and ingredient writes, per user.
+    'write': os.environ.get('THROTTLE_RATE_WRITE', '300/min') or None,
+}
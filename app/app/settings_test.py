@@ -0,0 +1,10 @@
+"""
+Django settings for running the tests:
+
+    python manage.py test --settings=app.settings_test
+"""
+from app.settings import *  # noqa: F401,F403
+
+# Test data is written in a transaction of the default database that the
+# replicas cannot see. core.tests.test_replica_routing enables them.
+DATABASE_REPLICAS = []
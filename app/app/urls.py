@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import DatabasePoolStatsView
+
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView
@@ -29,4 +31,5 @@ urlpatterns = [
     path('api/user/', include('user.urls')),
     path('api/ingredient/', include('ingredient.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/db-pool/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
 ]
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Warm up in the background, /readyz reports ready once done.
+from core.startup import readiness  # noqa: E402
+readiness.start()
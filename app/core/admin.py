@@ -1,8 +1,9 @@
 from django.contrib import admin  # noqa
 
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.utils.html import format_html, format_html_join
 
-from core.models import UserProfile, Ingredient
+from core.models import UserProfile, Ingredient, RequestProfile
 
 
 class UserAdmin(BaseUserAdmin):
@@ -29,5 +30,50 @@ class IngredientAdmin(admin.ModelAdmin):
     list_display = ['name']
 
 
+class RequestProfileAdmin(admin.ModelAdmin):
+    """Read-only view of the profiles recorded by `core.profiling`."""
+    list_display = ['created_at', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'peak_memory_kib',
+                    'user']
+    list_filter = ['method', 'status_code']
+    search_fields = ['path']
+    fields = ['created_at', 'user', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'db_time_ms',
+              'peak_memory_kib', 'sql_timeline_display', 'cpu_profile_display']
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='duration (ms)', ordering='duration')
+    def duration_ms(self, obj):
+        return f'{obj.duration * 1000:.1f}'
+
+    @admin.display(description='DB time (ms)')
+    def db_time_ms(self, obj):
+        return f'{obj.db_time * 1000:.1f}'
+
+    @admin.display(description='peak memory (KiB)', ordering='peak_memory')
+    def peak_memory_kib(self, obj):
+        return f'{obj.peak_memory / 1024:.0f}'
+
+    @admin.display(description='SQL timeline')
+    def sql_timeline_display(self, obj):
+        lines = format_html_join(
+            '\n', '+{} ms  {} ms  {}  {}',
+            (
+                (f'{query["start"] * 1000:.1f}', f'{query["duration"] * 1000:.1f}', query['alias'], query['sql'])
+                for query in obj.sql_timeline
+            )
+        )
+        return format_html('<pre>{}</pre>', lines)
+
+    @admin.display(description='CPU profile')
+    def cpu_profile_display(self, obj):
+        return format_html('<pre>{}</pre>', obj.cpu_profile)
+
+
 admin.site.register(UserProfile, UserAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,134 @@
+"""Async (ASGI) read path of the API views.
+
+Views mixing in `AsyncReadMixin` serve the methods they have an async
+handler for (`alist`, `aretrieve`, `aget` ...) from a coroutine when
+`API_ASYNC_READS` is enabled under ASGI. Authentication, permissions,
+content negotiation, exception handling and rendering are the ones of the
+DRF view, so responses are the same as the sync path. Other methods are
+handed to the sync view in a thread. Nothing on this path may block the
+event loop: caches are read with their async API, or in a thread.
+
+Django runs the ORM calls of each in-flight request in a thread of its
+own, with its own database connection, so `API_ASYNC_MAX_CONCURRENCY`
+bounds the requests a process serves at once; the others wait for a slot
+instead of failing to connect.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+
+from rest_framework.exceptions import APIException
+
+
+async def authenticate(request):
+    """Async `Request._authenticate()`.
+
+    Authenticators without an `aauthenticate()` method run in a thread.
+    """
+    # Set like `Request._authenticate()` does, so `request.user` and
+    # `request.successful_authenticator` do not authenticate again.
+    request._authenticator = None
+    request.user, request.auth = AnonymousUser(), None
+
+    for authenticator in request.authenticators:
+        if hasattr(authenticator, 'aauthenticate'):
+            user_auth = await authenticator.aauthenticate(request)
+        else:
+            user_auth = await sync_to_async(authenticator.authenticate)(request)
+
+        if user_auth is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = user_auth
+            return
+
+
+async def dispatch(view, request, handler, *args, **kwargs):
+    """Async `APIView.dispatch()`."""
+    view.args = args
+    view.kwargs = kwargs
+    request = view.initialize_request(request, *args, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+
+    try:
+        try:
+            await authenticate(request)
+        except APIException:
+            request._authenticator = None
+            request.user, request.auth = AnonymousUser(), None
+            raise
+
+        # Throttles and replica pins may read a networked cache.
+        await sync_to_async(view.initial)(request, *args, **kwargs)
+        response = await handler(request, *args, **kwargs)
+    except Exception as exc:
+        response = view.handle_exception(exc)
+
+    view.response = view.finalize_response(request, response, *args, **kwargs)
+    # Rendered here rather than by Django in a thread.
+    return view.response.render()
+
+
+_slots = {}
+
+
+def _get_slots():
+    """Return the semaphore of the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _slots:
+        _slots.clear()
+        _slots[loop] = asyncio.Semaphore(settings.API_ASYNC_MAX_CONCURRENCY)
+
+    return _slots[loop]
+
+
+def async_read_view(sync_view, handlers):
+    """Wrap a DRF view function, serving `handlers` ({method: handler name}) natively."""
+    cls, initkwargs = sync_view.cls, sync_view.initkwargs
+    actions = getattr(sync_view, 'actions', None)
+    run_sync = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        async with _get_slots():
+            return await handle(request, *args, **kwargs)
+
+    async def handle(request, *args, **kwargs):
+        method = request.method.lower()
+        handler_name = handlers.get('get' if method == 'head' else method)
+        if handler_name is None:
+            return await run_sync(request, *args, **kwargs)
+
+        self = cls(**initkwargs)
+        if actions is not None:
+            # As in `ViewSetMixin.as_view()`.
+            self.action_map = {'head': actions['get'], **actions} if 'get' in actions else actions
+            for action_method, action in self.action_map.items():
+                setattr(self, action_method, getattr(self, action))
+
+        return await dispatch(self, request, getattr(self, handler_name), *args, **kwargs)
+
+    view.cls = cls
+    view.initkwargs = initkwargs
+    view.actions = actions
+    view.csrf_exempt = True
+    return view
+
+
+class AsyncReadMixin:
+    """Serve methods with an `a<action>` handler natively under ASGI."""
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        view = super().as_view(*args, **initkwargs)
+        if not settings.API_ASYNC_READS:
+            return view
+
+        actions = getattr(view, 'actions', None) or {method: method for method in cls.http_method_names}
+        handlers = {
+            method: f'a{action}' for method, action in actions.items() if hasattr(cls, f'a{action}')
+        }
+
+        return async_read_view(view, handlers) if handlers else view
@@ -0,0 +1,126 @@
+"""Token authentication with a cache of token key to user."""
+import copy
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+
+from core.cache import LocalTTLCache
+
+CACHE_KEY_PREFIX = 'auth-token:'
+
+_local_cache = LocalTTLCache(
+    max_entries=settings.TOKEN_AUTH_CACHE_MAX_ENTRIES,
+    ttl=settings.TOKEN_AUTH_CACHE_TTL
+)
+
+
+def get_token_cache():
+    """Return the `TOKEN_AUTH_CACHE_ALIAS` cache, shared by the workers.
+
+    The in-process cache, used when the alias is empty, is only invalidated
+    in the process that made the change, so it only suits a single worker.
+    """
+    if settings.TOKEN_AUTH_CACHE_ALIAS:
+        return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+
+    return _local_cache
+
+
+def invalidate_tokens(keys):
+    """Drop cached users for the given token keys.
+
+    Dropped right away and again on commit, so a concurrent request cannot
+    cache the user as it was before the not yet committed change.
+    """
+    cache_keys = [CACHE_KEY_PREFIX + key for key in keys]
+
+    def invalidate():
+        get_token_cache().delete_many(cache_keys)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """`TokenAuthentication` that skips the token/user query on cache hits.
+
+    Entries are dropped as soon as the token is deleted or its user is
+    saved (see `core.signals`), so deactivated users and password changes
+    take effect on the next request, in every worker. `QuerySet.update()`
+    and raw SQL send no signals: call `invalidate_tokens()` after them.
+    """
+
+    def get_key(self, request):
+        """Return the token key of the Authorization header, or None.
+
+        Same checks as `TokenAuthentication.authenticate()`.
+        """
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+    def authenticate(self, request):
+        key = self.get_key(request)
+        return None if key is None else self.authenticate_credentials(key)
+
+    async def aauthenticate(self, request):
+        """`authenticate()` reading tokens missing from the cache with the async ORM."""
+        key = self.get_key(request)
+        if key is None:
+            return None
+
+        cached = self._copy_cached(await get_token_cache().aget(CACHE_KEY_PREFIX + key))
+        if cached is not None:
+            return cached
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        await get_token_cache().aset(*self._cache_entry(key, token.user, token))
+        return token.user, token
+
+    def authenticate_credentials(self, key):
+        cached = self._copy_cached(get_token_cache().get(CACHE_KEY_PREFIX + key))
+        if cached is not None:
+            return cached
+
+        user, token = super().authenticate_credentials(key)
+        get_token_cache().set(*self._cache_entry(key, user, token))
+        return user, token
+
+    def _copy_cached(self, cached):
+        if cached is None:
+            return None
+
+        # Hand out copies, views must not share mutable instances.
+        user, token = copy.copy(cached[0]), copy.copy(cached[1])
+        token.user = user
+        return user, token
+
+    def _cache_entry(self, key, user, token):
+        """Return the arguments of the cache `set()` of a token."""
+        return CACHE_KEY_PREFIX + key, (copy.copy(user), copy.copy(token)), settings.TOKEN_AUTH_CACHE_TTL
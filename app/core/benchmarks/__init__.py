@@ -0,0 +1,23 @@
+"""Micro benchmarks, run as subcommands of `manage.py benchmark`."""
+from abc import ABC, abstractmethod
+
+
+class Rollback(Exception):
+    pass
+
+
+class Benchmark(ABC):
+    """A `benchmark` subcommand, writing to the output of the command."""
+
+    help = ''
+
+    def __init__(self, command):
+        self.stdout, self.stderr, self.style = command.stdout, command.stderr, command.style
+
+    @classmethod
+    def add_arguments(cls, parser):
+        pass
+
+    @abstractmethod
+    def handle(self, **options):
+        """Run the benchmark with the parsed options of its subcommand."""
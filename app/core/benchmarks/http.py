@@ -0,0 +1,111 @@
+"""Load a running API server with concurrent keep-alive connections.
+
+Used to compare the ASGI (uvicorn) and WSGI (gunicorn) deployments of the
+read endpoints, for example:
+
+    python manage.py benchmark http http://127.0.0.1:8000/api/recipe/recipes/ \
+        --token <key> --connections 1000 --requests 20000
+"""
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from django.core.management import CommandError
+
+from core.benchmarks import Benchmark
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response, returning its status code."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    headers = dict(
+        (name.strip().lower(), value.strip())
+        for name, _, value in (line.partition(':') for line in header_lines if line)
+    )
+
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+
+    return int(status_line.split()[1])
+
+
+class HttpBenchmark(Benchmark):
+    help = 'Measure throughput and latency of GET requests against a running server.'
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('url')
+        parser.add_argument('--token', help='Key sent in a "Token" Authorization header.')
+        parser.add_argument('--connections', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=10000, help='Total number of requests.')
+        parser.add_argument('--accept', default='application/json')
+
+    def handle(self, **options):
+        url = urlsplit(options['url'])
+        if url.scheme != 'http':
+            raise CommandError('Only http:// URLs are supported.')
+
+        headers = [f'Host: {url.netloc}', f'Accept: {options["accept"]}']
+        if options['token']:
+            headers.append(f'Authorization: Token {options["token"]}')
+        path = url.path + (f'?{url.query}' if url.query else '')
+        request = '\r\n'.join([f'GET {path or "/"} HTTP/1.1', *headers, '', '']).encode('latin-1')
+
+        latencies, statuses, errors, elapsed = asyncio.run(self._run(
+            url.hostname, url.port or 80, request, options['connections'], options['requests']
+        ))
+
+        latencies.sort()
+        if not latencies:
+            raise CommandError(f'No request succeeded ({errors} connection errors).')
+
+        def percentile(value):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+        self.stdout.write(
+            f'{len(latencies)} requests over {options["connections"]} connections in {elapsed:.2f} s: '
+            f'{len(latencies) / elapsed:.0f} req/s, p50 {percentile(0.5):.1f} ms, '
+            f'p99 {percentile(0.99):.1f} ms, max {latencies[-1] * 1000:.1f} ms'
+        )
+        self.stdout.write(
+            'status codes: ' + ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))
+            + (f', connection errors: {errors}' if errors else '')
+        )
+
+    async def _run(self, host, port, request, connections, requests):
+        latencies, statuses = [], {}
+        remaining = requests
+        errors = 0
+
+        async def worker():
+            nonlocal remaining, errors
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+            except OSError:
+                errors += 1
+                return
+
+            try:
+                while remaining > 0:
+                    remaining -= 1
+                    started = time.perf_counter()
+                    writer.write(request)
+                    status = await _read_response(reader)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[status] = statuses.get(status, 0) + 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+            finally:
+                writer.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(connections)))
+
+        return latencies, statuses, errors, time.perf_counter() - started
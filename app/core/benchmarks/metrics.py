@@ -0,0 +1,63 @@
+"""Measure the per-request overhead of MetricsMiddleware.
+
+Requests for the recipe list are resolved once and then passed through
+the middleware around a view that runs `--queries` no-op query wrappers,
+so only the instrumentation itself is timed.
+"""
+import time
+
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from core import metrics
+from core.benchmarks import Benchmark
+from core.metrics import RequestMetrics, _record_query
+from core.middleware import MetricsMiddleware
+
+
+def _execute(sql, params, many, context):
+    return None
+
+
+class MetricsBenchmark(Benchmark):
+    help = 'Time requests with and without MetricsMiddleware.'
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--requests', type=int, default=100000)
+        parser.add_argument('--queries', type=int, default=3, help='Queries per request.')
+
+    def handle(self, **options):
+        request = RequestFactory().get(reverse('recipe:recipe-list'))
+        request.resolver_match = resolve(request.path)
+        queries = options['queries']
+
+        def view(request):
+            for _ in range(queries):
+                _record_query(_execute, 'SELECT 1', None, False, {'connection': connection})
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(view)
+        with_metrics, without_metrics = [], []
+        for _ in range(5):
+            without_metrics.append(self._time(view, request, options['requests']))
+            with_metrics.append(self._time(middleware, request, options['requests']))
+
+        overhead = min(with_metrics) - min(without_metrics)
+        self.stdout.write(
+            f'{queries} queries per request: {min(without_metrics) * 1e6:.2f} µs without metrics, '
+            f'{min(with_metrics) * 1e6:.2f} µs with metrics, overhead {overhead * 1e6:.2f} µs per request'
+        )
+
+    def _time(self, handler, request, requests):
+        # Keep the recorded metrics out of the process-wide registry.
+        metrics.request_metrics, registry = RequestMetrics(), metrics.request_metrics
+        try:
+            started = time.perf_counter()
+            for _ in range(requests):
+                handler(request)
+            return (time.perf_counter() - started) / requests
+        finally:
+            metrics.request_metrics = registry
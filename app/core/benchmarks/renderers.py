@@ -0,0 +1,71 @@
+"""Encode/decode throughput of the API renderers and parsers.
+
+Uses recipe list payloads generated in memory, no database access.
+"""
+import io
+import time
+
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmarks import Benchmark
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+CODECS = {
+    'json': (JSONRenderer, JSONParser),
+    'orjson': (ORJSONRenderer, ORJSONParser),
+    'msgpack': (MessagePackRenderer, MessagePackParser),
+}
+
+
+def recipe_list(rows, ingredients_per_recipe):
+    return [
+        {
+            'id': index,
+            'title': f'Recipe {index}',
+            'time_minutes': index % 120,
+            'price': '9.99',
+            'ingredients': [
+                {'id': index * ingredients_per_recipe + offset, 'name': f'ingredient {offset}'}
+                for offset in range(ingredients_per_recipe)
+            ],
+            'description': 'Lorem ipsum ' * 20,
+        }
+        for index in range(rows)
+    ]
+
+
+class RenderersBenchmark(Benchmark):
+    help = 'Time encoding and decoding of recipe lists with each renderer and parser.'
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--ingredients', type=int, default=3, help='Ingredients per recipe.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - started)
+
+        return sorted(timings)[len(timings) // 2], result
+
+    def handle(self, **options):
+        for rows in options['rows']:
+            data = recipe_list(rows, options['ingredients'])
+
+            for name, (renderer_class, parser_class) in CODECS.items():
+                renderer, parser = renderer_class(), parser_class()
+                encode_time, body = self._time(lambda: renderer.render(data), options['repeat'])
+                decode_time, decoded = self._time(lambda: parser.parse(io.BytesIO(body)), options['repeat'])
+
+                self.stdout.write(
+                    f'{rows} rows {name}: {len(body) / 1024:.0f} KiB, '
+                    f'encode {encode_time * 1000:.1f} ms ({len(body) / encode_time / 2 ** 20:.0f} MiB/s), '
+                    f'decode {decode_time * 1000:.1f} ms ({len(body) / decode_time / 2 ** 20:.0f} MiB/s), '
+                    f'round trip ok: {decoded == data}'
+                )
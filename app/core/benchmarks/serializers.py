@@ -0,0 +1,89 @@
+"""Compare the serializer and values() read paths of the recipe list.
+
+Recipes are created for a throwaway user inside a transaction that is
+rolled back at the end, so the benchmark can run against any database.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Prefetch
+
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmarks import Benchmark, Rollback
+from core.models import Ingredient, Recipe
+from core.serializers import ValuesReader
+
+from recipe.serializers import RecipeSerializer
+
+
+class SerializersBenchmark(Benchmark):
+    help = 'Time RecipeSerializer against ValuesReader on generated recipe lists.'
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--ingredients', type=int, default=3, help='Ingredients per recipe.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, **options):
+        try:
+            with transaction.atomic():
+                user = get_user_model().objects.create_user(
+                    email='benchmark-serializers@example.com', name='benchmark', password=None
+                )
+                created = 0
+                for rows in sorted(options['rows']):
+                    self._create_recipes(user, rows - created, options['ingredients'])
+                    created = rows
+                    self._benchmark(user, rows, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _create_recipes(self, user, count, ingredients_per_recipe):
+        recipes = Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {index}', time_minutes=index % 120, price='9.99',
+                   description='Lorem ipsum ' * 20)
+            for index in range(count)
+        )
+        ingredients = Ingredient.objects.get_or_create_many(user, [f'ingredient {index}' for index in range(100)])
+        ingredients = list(ingredients.values())
+        RecipeIngredient = Recipe.ingredients.through
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredients[(recipe.id + offset) % 100].id)
+            for recipe in recipes for offset in range(ingredients_per_recipe)
+        )
+
+    def _time(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            content = func()
+            timings.append(time.perf_counter() - started)
+
+        return sorted(timings)[len(timings) // 2], content
+
+    def _benchmark(self, user, rows, repeat):
+        queryset = Recipe.objects.filter(user=user).defer('search_vector').order_by('-id')
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            recipes = queryset.prefetch_related(
+                Prefetch('ingredients', queryset=Ingredient.objects.order_by('pk'))
+            )
+            return renderer.render(RecipeSerializer(recipes, many=True).data)
+
+        def values_path():
+            reader = ValuesReader.compile(RecipeSerializer())
+            return renderer.render(reader.represent(list(reader.get_values(queryset))))
+
+        serializer_time, expected = self._time(serializer_path, repeat)
+        values_time, content = self._time(values_path, repeat)
+
+        self.stdout.write(
+            f'{rows} rows: serializer {serializer_time * 1000:.1f} ms, '
+            f'values {values_time * 1000:.1f} ms ({serializer_time / values_time:.1f}x), '
+            f'identical output: {content == expected}'
+        )
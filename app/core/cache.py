@@ -0,0 +1,131 @@
+"""Caching helpers."""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+class LocalTTLCache:
+    """Bounded in-process LRU cache whose entries expire after a TTL.
+
+    Implements the subset of Django's cache API used in this project, so it
+    can be swapped for a `django.core.cache.caches` backend.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.ttl if timeout is None else timeout
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    # In-process and never blocking, so safe to call from the event loop.
+    async def aget(self, key, default=None):
+        return self.get(key, default)
+
+    async def aset(self, key, value, timeout=None):
+        self.set(key, value, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def get_response_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def get_data_version_cache():
+    """Return the cache of the data versions, which every process must share.
+
+    Responses cached in a process are only reachable under the current
+    version, so they may stay in a per-process cache.
+    """
+    return caches[settings.DATA_VERSION_CACHE_ALIAS]
+
+
+def _data_version_key(user_id):
+    return f'data-version:{user_id}'
+
+
+def get_data_version(user_id):
+    """Return the current version of the user's recipes and ingredients.
+
+    Versions are random, so a version lost to eviction or expiry is
+    replaced by one that no cached response or ETag can match.
+    """
+    cache = get_data_version_cache()
+    key = _data_version_key(user_id)
+
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(key, version, settings.DATA_VERSION_TIMEOUT):
+            version = cache.get(key, version)
+
+    return version
+
+
+async def aget_data_version(user_id):
+    """Async `get_data_version()`."""
+    cache = get_data_version_cache()
+    key = _data_version_key(user_id)
+
+    version = await cache.aget(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not await cache.aadd(key, version, settings.DATA_VERSION_TIMEOUT):
+            version = await cache.aget(key, version)
+
+    return version
+
+
+def bump_data_version(user_id):
+    """Invalidate every cached response of the user.
+
+    The version is bumped right away and again on commit, so a concurrent
+    read of the not yet committed data cannot be cached under the final
+    version.
+    """
+    def bump():
+        get_data_version_cache().set(_data_version_key(user_id), uuid.uuid4().hex, settings.DATA_VERSION_TIMEOUT)
+
+    bump()
+    transaction.on_commit(bump)
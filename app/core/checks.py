@@ -0,0 +1,16 @@
+"""System checks of the core app."""
+from django.core.checks import Tags, register
+from django.db import connections
+
+
+@register(Tags.database)
+def check_database_connection(app_configs, databases=None, **kwargs):
+    """Connect to the checked databases, raising the error if one is down.
+
+    Database checks only run for the databases passed to `check()`, as
+    `wait_for_db` and `migrate` do.
+    """
+    for alias in databases or []:
+        connections[alias].ensure_connection()
+
+    return []
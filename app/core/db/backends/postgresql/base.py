@@ -0,0 +1,83 @@
+"""PostgreSQL backend taking its connections from a `ConnectionPool`.
+
+Configured with a `POOL` entry in the database settings:
+
+    'POOL': {
+        'MAX_SIZE': 20,      # open connections per process, 0 disables pooling
+        'TIMEOUT': 10,       # seconds to wait for a free connection
+        'CHECK_AFTER': 30,   # seconds idle after which a connection is checked
+    }
+
+Closing the Django connection, which happens at the end of every request
+when `CONN_MAX_AGE` is 0, returns it to the pool instead of disconnecting.
+"""
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.creation import DatabaseCreation as BaseDatabaseCreation
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+
+from core.db.pool import ConnectionPool, PoolTimeout, close_pools, get_pool
+
+
+def is_usable(connection):
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        if not connection.autocommit:
+            connection.rollback()
+    except base.Database.Error:
+        return False
+
+    return True
+
+
+class DatabaseCreation(BaseDatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Pooled connections to the test database would prevent dropping it.
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    _pool = None
+
+    def get_pool_settings(self):
+        return {'MAX_SIZE': 0, 'TIMEOUT': 10, 'CHECK_AFTER': 30, **self.settings_dict.get('POOL', {})}
+
+    def get_new_connection(self, conn_params):
+        pool_settings = self.get_pool_settings()
+        if not pool_settings['MAX_SIZE']:
+            return super().get_new_connection(conn_params)
+
+        pool = get_pool(
+            self.alias,
+            (sorted(conn_params.items()), sorted(pool_settings.items())),
+            lambda: ConnectionPool(
+                lambda: super(DatabaseWrapper, self).get_new_connection(conn_params),
+                max_size=pool_settings['MAX_SIZE'],
+                timeout=pool_settings['TIMEOUT'],
+                check_after=pool_settings['CHECK_AFTER'],
+                is_usable=is_usable,
+            ),
+        )
+        # Set by the base class when it opens a connection.
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+
+        try:
+            connection = pool.acquire()
+        except PoolTimeout as exc:
+            raise base.Database.OperationalError(str(exc)) from exc
+
+        self._pool = pool
+        return connection
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            pool.release(self.connection)
@@ -0,0 +1,192 @@
+"""Process-wide pools of database connections."""
+import os
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections.
+
+    At most `max_size` connections are open at once; `acquire()` waits up to
+    `timeout` seconds for one to be released before raising `PoolTimeout`.
+    Connections idle for longer than `check_after` seconds are checked with
+    `is_usable` before being handed out, and broken ones are replaced.
+    """
+
+    def __init__(self, connect, max_size, timeout, check_after=None, is_usable=None):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.is_usable = is_usable
+        self.pid = os.getpid()
+        self.closed = False
+
+        self._idle = []  # (connection, released at), most recent last
+        self._size = 0
+        self._cond = threading.Condition()
+
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+
+    def acquire(self):
+        while True:
+            connection, released_at = self._checkout()
+            if connection is None:
+                return self._create()
+
+            idle_for = time.monotonic() - released_at
+            if connection.closed or (
+                self.check_after is not None and idle_for > self.check_after and not self.is_usable(connection)
+            ):
+                self.discard(connection)
+                continue
+
+            return connection
+
+    def _checkout(self):
+        """Take an idle connection, or reserve a slot for a new one (None)."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        with self._cond:
+            waited = False
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(
+                        f'No database connection available within {self.timeout}s '
+                        f'({self.max_size} in use).'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+            if waited:
+                self.waits += 1
+                self.wait_time += time.monotonic() - started
+
+            if self._idle:
+                return self._idle.pop()
+
+            self._size += 1
+            return None, None
+
+    def _create(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.created += 1
+
+        return connection
+
+    def release(self, connection):
+        """Return a connection, rolling back any transaction left open."""
+        if not connection.closed and not connection.autocommit:
+            try:
+                connection.rollback()
+            except Exception:
+                pass
+
+        if connection.closed or self.closed:
+            self.discard(connection)
+            return
+
+        with self._cond:
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, connection):
+        """Close a connection taken from the pool and free its slot."""
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    def close(self):
+        """Close the idle connections, and the others once released."""
+        with self._cond:
+            self.closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+
+        for connection, _ in idle:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'waits': self.waits,
+                'wait_time': round(self.wait_time, 6),
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'discarded': self.discarded,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, params, factory):
+    """Return the pool of a database alias, creating it with `factory()`.
+
+    The pool is replaced when the parameters of the alias change (e.g. when
+    the test runner switches to the test database), and pools
+    inherited from a parent process are dropped, as their connections belong
+    to it.
+    """
+    with _pools_lock:
+        current = _pools.get(alias)
+        if current is not None and current[0] == params and not current[1].closed and current[1].pid == os.getpid():
+            return current[1]
+
+        pool = factory()
+        _pools[alias] = (params, pool)
+
+    if current is not None and current[1].pid == os.getpid():
+        current[1].close()
+
+    return pool
+
+
+def close_pools():
+    """Close every pool of this process."""
+    with _pools_lock:
+        pools = [pool for _, pool in _pools.values() if pool.pid == os.getpid()]
+
+    for pool in pools:
+        pool.close()
+
+
+def pool_stats():
+    """Return {alias: statistics} for the pools of this process."""
+    with _pools_lock:
+        pools = [(alias, pool) for alias, (_, pool) in _pools.items() if pool.pid == os.getpid()]
+
+    return {alias: pool.stats() for alias, pool in pools}
@@ -0,0 +1,70 @@
+"""Routing of reads to the replicas of the default database.
+
+Reads go to the primary unless `use_replica()` was called for the current
+request, which `core.mixins.ReplicaReadMixin` does for safe requests of
+users that have not written recently. `core.middleware.ReplicaMiddleware`
+clears the choice after each request and pins users to the primary for
+`DATABASE_REPLICA_PIN_SECONDS` after their writes, so they read them back.
+Pins are kept in the `DATABASE_REPLICA_PIN_CACHE_ALIAS` cache, which every
+worker must share.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Alias of the replica serving the reads of the current request.
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def use_replica():
+    """Send the reads of the current request to a random replica."""
+    if settings.DATABASE_REPLICAS:
+        _read_alias.set(random.choice(settings.DATABASE_REPLICAS))
+
+
+def use_primary():
+    _read_alias.set(None)
+
+
+def get_pin_cache():
+    return caches[settings.DATABASE_REPLICA_PIN_CACHE_ALIAS]
+
+
+def _pin_key(user_id):
+    return f'primary-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Serve the reads of the user from the primary for a while."""
+    if settings.DATABASE_REPLICAS:
+        get_pin_cache().set(_pin_key(user_id), True, settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    return bool(settings.DATABASE_REPLICAS) and get_pin_cache().get(_pin_key(user_id), False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == 'django_cache':
+            # Database caches (tokens, pins, data versions) are read back
+            # right after they are written.
+            return 'default'
+
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+
+        return None
@@ -0,0 +1,133 @@
+"""Password hashers whose work factor is read from the settings.
+
+`PASSWORD_HASHER` picks the algorithm of new hashes. Hashes made with
+another algorithm, or another work factor, are still checked and Django
+rehashes them at the next successful login (`AbstractBaseUser.check_password()`).
+Work factors are calibrated on the host with `manage.py calibrate_hashers`.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, hashers
+from django.db import DatabaseError
+
+from core import metrics
+
+# Setting of the work factor of each algorithm.
+WORK_FACTOR_SETTINGS = {
+    'pbkdf2_sha256': 'PASSWORD_PBKDF2_ITERATIONS',
+    'argon2': 'PASSWORD_ARGON2_TIME_COST',
+    'bcrypt_sha256': 'PASSWORD_BCRYPT_ROUNDS',
+    'scrypt': 'PASSWORD_SCRYPT_WORK_FACTOR',
+}
+
+# Lowest work factors calibration picks: OWASP's minimums for PBKDF2-SHA256
+# and bcrypt, and one pass over Argon2's 100 MiB (Django's memory cost).
+# scrypt stays at Django's default, which is also the most Django's memory
+# limit allows.
+MINIMUM_WORK_FACTORS = {
+    'pbkdf2_sha256': 600000,
+    'argon2': 1,
+    'bcrypt_sha256': 10,
+    'scrypt': 2 ** 14,
+}
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+
+class BCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+    @property
+    def rounds(self):
+        return settings.PASSWORD_BCRYPT_ROUNDS
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+
+def classify(encoded):
+    """Return the algorithm of a usable hash, and whether it is `current`
+    or `legacy`, that is rehashed at the next login of its user."""
+    preferred = hashers.get_hasher('default')
+    try:
+        hasher = hashers.identify_hasher(encoded)
+    except ValueError:
+        # Not made by a configured hasher, it cannot be checked at all.
+        return 'unknown', 'legacy'
+
+    legacy = hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
+    return hasher.algorithm, 'legacy' if legacy else 'current'
+
+
+class PasswordHashStats:
+    """Counts of usable password hashes by algorithm, current or legacy.
+
+    Counting reads every password of the user table, so the counts are
+    kept for `PASSWORD_METRICS_TTL` seconds.
+    """
+
+    def __init__(self):
+        self._counts = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if time.monotonic() >= self._expires_at:
+                try:
+                    self._counts = self.count()
+                except DatabaseError:
+                    # Keep the last counts, retried on the next scrape.
+                    pass
+                else:
+                    self._expires_at = time.monotonic() + settings.PASSWORD_METRICS_TTL
+
+            return self._counts
+
+    def clear(self):
+        with self._lock:
+            self._counts, self._expires_at = None, 0
+
+    def count(self):
+        counts = {}
+        passwords = get_user_model().objects.values_list('password', flat=True)
+        for encoded in passwords.iterator(chunk_size=10000):
+            if hashers.is_password_usable(encoded):
+                key = classify(encoded)
+                counts[key] = counts.get(key, 0) + 1
+
+        return counts
+
+    def render(self):
+        counts = self.get()
+        if counts is None:
+            return []
+
+        total = sum(counts.values())
+        legacy = sum(number for (_, state), number in counts.items() if state == 'legacy')
+        return [
+            '# HELP password_hashes Usable password hashes by algorithm and parameters.',
+            '# TYPE password_hashes gauge',
+            *(f'password_hashes{{algorithm="{algorithm}",state="{state}"}} {number}'
+              for (algorithm, state), number in sorted(counts.items())),
+            '# HELP password_hashes_legacy_ratio Share of the hashes rehashed at the next login.',
+            '# TYPE password_hashes_legacy_ratio gauge',
+            f'password_hashes_legacy_ratio {legacy / total if total else 0.0}',
+        ]
+
+
+password_hash_stats = PasswordHashStats()
+metrics.collectors.append(password_hash_stats.render)
@@ -0,0 +1,523 @@
+"""Generate a benchmark dataset and measure the latency of every endpoint.
+
+    python manage.py benchmark generate --users 10000 --recipes 2000000 --ingredients 200000
+    python manage.py benchmark run --output before.json
+    python manage.py benchmark compare before.json after.json
+    python manage.py benchmark http http://127.0.0.1:8000/api/recipe/recipes/ --token <key>
+
+`generate` creates users `user-<n>@benchmark.example.com`, with recipes and
+ingredients spread over them following a Zipf law: a few users own most of
+the rows. Rows are written with PostgreSQL `COPY` under ids reserved from
+the table sequences, one transaction per batch.
+
+`run` sends requests to every endpoint of `app/urls.py` in-process, through
+the full middleware stack, as a sample of the generated users. It reports
+p50/p95/p99 latency and SQL queries per endpoint and writes them as JSON.
+Requests run in a transaction that is rolled back, so writes do not alter
+the dataset. The response cache is cleared before each request unless
+`--warm-cache` is given, so reads are timed down to the database.
+
+`http` measures a running server over the network; `metrics`, `renderers`
+and `serializers` time parts of the request path (see `core.benchmarks`).
+"""
+import csv
+import io
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from itertools import count
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLResolver, get_resolver, reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import metrics
+from core.benchmarks import Rollback
+from core.benchmarks.http import HttpBenchmark
+from core.benchmarks.metrics import MetricsBenchmark
+from core.benchmarks.renderers import RenderersBenchmark
+from core.benchmarks.serializers import SerializersBenchmark
+from core.cache import bump_data_version, get_response_cache
+from core.models import Ingredient, Recipe
+
+BENCHMARKS = {
+    'http': HttpBenchmark,
+    'metrics': MetricsBenchmark,
+    'renderers': RenderersBenchmark,
+    'serializers': SerializersBenchmark,
+}
+
+EMAIL_DOMAIN = '@benchmark.example.com'
+PASSWORD = 'benchmark-password'
+
+INGREDIENTS = [
+    'basil', 'bay leaf', 'beef', 'bell pepper', 'black pepper', 'broccoli', 'butter', 'carrot', 'cauliflower',
+    'celery', 'cheddar', 'chicken', 'chickpeas', 'chili', 'cinnamon', 'coconut milk', 'cod', 'coriander', 'cream',
+    'cumin', 'egg', 'eggplant', 'feta', 'flour', 'garlic', 'ginger', 'honey', 'kale', 'leek', 'lemon', 'lentils',
+    'lime', 'mint', 'mozzarella', 'mushroom', 'mustard', 'noodles', 'oats', 'olive oil', 'onion', 'oregano',
+    'paprika', 'parmesan', 'parsley', 'pasta', 'peas', 'pork', 'potato', 'rice', 'rosemary', 'saffron', 'salmon',
+    'salt', 'shrimp', 'soy sauce', 'spinach', 'sugar', 'sweet potato', 'thyme', 'tofu', 'tomato', 'turmeric',
+    'vinegar', 'walnuts', 'yogurt', 'zucchini',
+]
+ADJECTIVES = [
+    'baked', 'braised', 'creamy', 'crispy', 'fresh', 'fried', 'grilled', 'roasted', 'smoked', 'spicy', 'steamed',
+    'stuffed',
+]
+DISHES = ['bowl', 'casserole', 'curry', 'gratin', 'pie', 'risotto', 'salad', 'skewers', 'soup', 'stew', 'tart']
+WORDS = [
+    'add', 'bake', 'boil', 'chop', 'cook', 'cover', 'dice', 'drain', 'heat', 'minutes', 'mix', 'oven', 'pan', 'pot',
+    'serve', 'simmer', 'slice', 'stir', 'until', 'warm', 'whisk', 'with',
+]
+
+
+def ingredient_name(index):
+    """Distinct realistic names for indexes 0, 1, 2 ..."""
+    word = INGREDIENTS[index % len(INGREDIENTS)]
+    kind = index // len(INGREDIENTS)
+    if kind == 0:
+        return word
+    if kind <= len(ADJECTIVES):
+        return f'{ADJECTIVES[kind - 1]} {word}'
+
+    return f'{word} {kind}'
+
+
+def skewed_counts(total, buckets, skew):
+    """Split `total` into `buckets` counts, the n-th proportional to 1 / n ** skew."""
+    weights = [1 / rank ** skew for rank in range(1, buckets + 1)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for index in range(total - sum(counts)):
+        counts[index % buckets] += 1
+
+    return counts
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted `values`."""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def iter_routes(patterns, namespaces=()):
+    """Yield the route names (see `core.metrics.route_name()`) of the URL patterns."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_routes(pattern.url_patterns, (*namespaces, pattern.namespace) if pattern.namespace
+                                   else namespaces)
+        elif pattern.name is not None:
+            yield metrics.route_name(pattern.name, list(namespaces))
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a benchmark dataset, measure the latency of every endpoint, compare two runs, or time parts of '
+        'the request path.'
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        generate = subparsers.add_parser('generate', help='Bulk create users, recipes and ingredients.')
+        generate.add_argument('--users', type=int, default=1000)
+        generate.add_argument('--recipes', type=int, default=100000, help='Total over all users.')
+        generate.add_argument('--ingredients', type=int, default=20000, help='Total over all users.')
+        generate.add_argument('--max-links', type=int, default=8, help='Maximum ingredients per recipe.')
+        generate.add_argument('--skew', type=float, default=1.1, help='Exponent of the Zipf law.')
+        generate.add_argument('--seed', type=int, default=0)
+        generate.add_argument('--batch-size', type=int, default=50000, help='Recipes written per transaction.')
+        generate.add_argument('--replace', action='store_true', help='Delete an existing benchmark dataset.')
+
+        run = subparsers.add_parser('run', help='Measure the latency and queries of every endpoint.')
+        run.add_argument('--output', default='benchmark.json')
+        run.add_argument('--requests', type=int, default=100, help='Measured requests per endpoint.')
+        run.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per endpoint.')
+        run.add_argument('--users', type=int, default=20, help='Generated users sending the requests.')
+        run.add_argument('--endpoints', nargs='+', help='Only these, as named in the output.')
+        run.add_argument('--seed', type=int, default=0)
+        run.add_argument('--warm-cache', action='store_true',
+                         help='Keep cached responses between requests instead of clearing the response cache.')
+
+        compare = subparsers.add_parser('compare', help='Compare the results of two runs.')
+        compare.add_argument('base')
+        compare.add_argument('head')
+        compare.add_argument('--threshold', type=float, default=10, help='Regression of p95 latency, in %%.')
+        compare.add_argument('--fail-on-regression', action='store_true')
+
+        for name, benchmark in BENCHMARKS.items():
+            benchmark.add_arguments(subparsers.add_parser(name, help=benchmark.help))
+
+    def handle(self, *args, **options):
+        if options['action'] in BENCHMARKS:
+            return BENCHMARKS[options['action']](self).handle(**options)
+
+        if options['action'] != 'compare' and connection.vendor != 'postgresql':
+            raise CommandError('benchmark requires PostgreSQL.')
+
+        getattr(self, options['action'])(**options)
+
+    # Dataset.
+
+    def generate(self, users, recipes, ingredients, max_links, skew, seed, batch_size, replace, **options):
+        existing = get_user_model().objects.filter(email__endswith=EMAIL_DOMAIN)
+        if existing.exists():
+            if not replace:
+                raise CommandError('A benchmark dataset exists, use --replace to delete it.')
+            self.stdout.write('Deleting the existing dataset ...')
+            self._delete_dataset(existing)
+
+        rng = random.Random(seed)
+        started = time.monotonic()
+
+        password = make_password(PASSWORD)
+        created = get_user_model().objects.bulk_create(
+            (get_user_model()(email=f'user-{index}{EMAIL_DOMAIN}', name=f'Benchmark {index}', password=password)
+             for index in range(users)),
+            batch_size=5000
+        )
+        # Heavy users own many recipes and many ingredients.
+        ranked = rng.sample(created, len(created))
+        plan = list(zip(ranked, skewed_counts(recipes, users, skew), skewed_counts(ingredients, users, skew)))
+
+        batch, batch_recipes, written = [], 0, [0, 0, 0]
+        for entry in plan:
+            batch.append(entry)
+            batch_recipes += entry[1]
+            if batch_recipes >= batch_size:
+                self._write_batch(rng, batch, max_links, written)
+                batch, batch_recipes = [], 0
+        if batch:
+            self._write_batch(rng, batch, max_links, written)
+
+        with connection.cursor() as cursor:
+            for model in (Recipe, Ingredient, Recipe.ingredients.through):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {users} users, {written[0]} recipes, {written[1]} ingredients and {written[2]} links '
+            f'in {time.monotonic() - started:.1f}s.'
+        ))
+
+    def _delete_dataset(self, users):
+        """Delete the users and their rows with one statement per table.
+
+        `QuerySet.delete()` would fetch every recipe and ingredient to send
+        their delete signals, so the data versions those receivers bump are
+        bumped here instead.
+        """
+        user_ids = list(users.values_list('pk', flat=True))
+        with transaction.atomic():
+            # Recipes before their links (foreign keys are checked at
+            # commit), so the delete trigger of the links has no search
+            # vector left to rebuild. Links only join a recipe to
+            # ingredients of the same user.
+            for queryset in (
+                Recipe.objects.filter(user_id__in=user_ids),
+                Recipe.ingredients.through.objects.filter(ingredient__user_id__in=user_ids),
+                Ingredient.objects.filter(user_id__in=user_ids),
+            ):
+                queryset._raw_delete(queryset.db)
+            # Tokens and the other rows of the users are few.
+            users.delete()
+
+            for user_id in user_ids:
+                bump_data_version(user_id)
+
+    def _write_batch(self, rng, batch, max_links, written):
+        recipe_rows, ingredient_rows, link_rows = [], [], []
+        recipe_ids = self._reserve_ids(Recipe, sum(entry[1] for entry in batch))
+        ingredient_ids = self._reserve_ids(Ingredient, sum(entry[2] for entry in batch))
+
+        for user, recipe_count, ingredient_count in batch:
+            ids = [next(ingredient_ids) for _ in range(ingredient_count)]
+            ingredient_rows.extend([id, user.id, ingredient_name(index)] for index, id in enumerate(ids))
+
+            for _ in range(recipe_count):
+                recipe_id = next(recipe_ids)
+                title = f'{rng.choice(ADJECTIVES)} {rng.choice(INGREDIENTS)} {rng.choice(DISHES)}'
+                description = ' '.join(rng.choices(WORDS, k=rng.randint(0, 60)))
+                recipe_rows.append(
+                    [recipe_id, user.id, title, rng.randint(5, 240), f'{rng.uniform(1, 60):.2f}', description]
+                )
+                links = rng.sample(ids, min(len(ids), rng.randint(1, max_links)))
+                link_rows.extend([recipe_id, ingredient_id] for ingredient_id in links)
+
+        link_table = Recipe.ingredients.through._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Links first (foreign keys are checked at commit), so the insert
+            # trigger of recipes builds their search vector once, looking up
+            # their ingredients through the freshly analyzed link table.
+            self._copy(cursor, Ingredient._meta.db_table, ['id', 'user_id', 'name'], ingredient_rows)
+            self._copy(cursor, link_table, ['recipe_id', 'ingredient_id'], link_rows)
+            cursor.execute(f'ANALYZE {link_table}')
+            self._copy(cursor, Recipe._meta.db_table,
+                       ['id', 'user_id', 'title', 'time_minutes', 'price', 'description'], recipe_rows)
+
+        written[0] += len(recipe_rows)
+        written[1] += len(ingredient_rows)
+        written[2] += len(link_rows)
+        self.stdout.write(f'{written[0]} recipes, {written[1]} ingredients, {written[2]} links ...')
+
+    def _reserve_ids(self, model, number):
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)", [table, number]
+            )
+            return iter([row[0] for row in cursor.fetchall()])
+
+    def _copy(self, cursor, table, columns, rows):
+        buffer = io.StringIO()
+        # Unquoted empty fields would be read as NULL by COPY.
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    # Latency.
+
+    def run(self, output, requests, warmup, users, endpoints, seed, warm_cache, **options):
+        user_ids = list(
+            get_user_model().objects.filter(email__endswith=EMAIL_DOMAIN, recipe__isnull=False)
+            .distinct().order_by('pk').values_list('pk', flat=True)
+        )
+        if not user_ids:
+            raise CommandError('No benchmark dataset, run `benchmark generate` first.')
+
+        rng = random.Random(seed)
+        sample = rng.sample(user_ids, min(users, len(user_ids)))
+
+        results = {}
+        try:
+            # The transaction is not visible from replicas. The client's
+            # host is allowed as by the test runner, and its requests are
+            # not throttled.
+            with override_settings(DATABASE_REPLICAS=[], ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                                   THROTTLE_RATES={}), transaction.atomic():
+                scenarios = self._scenarios(rng, sample, requests + warmup)
+                for name, send in scenarios.items():
+                    if endpoints and name not in endpoints:
+                        continue
+                    for index in range(warmup):
+                        send(index)
+                    results[name] = self._measure(send, warmup, requests, warm_cache)
+                    self.stdout.write(self._format(name, results[name]))
+                raise Rollback
+        except Rollback:
+            pass
+
+        routes = {name.rsplit(' ', 1)[0] for name in scenarios}
+        report = {
+            'meta': self._meta(sample, requests, warmup, seed, warm_cache),
+            'endpoints': results,
+            'uncovered': sorted(
+                route for route in set(iter_routes(get_resolver().url_patterns))
+                if route not in routes and not route.startswith('admin:')
+            ),
+        }
+        if report['uncovered']:
+            self.stderr.write(f'Endpoints without a scenario: {", ".join(report["uncovered"])}')
+
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {output}.'))
+
+    def _scenarios(self, rng, user_ids, requests):
+        """Return the request senders by endpoint name, `<route> <method>`.
+
+        Senders take the index of the request and return the response.
+        Users take turns, each with their own token, recipes and ingredients.
+        """
+        client = Client()
+        users = []
+        for user in get_user_model().objects.filter(pk__in=user_ids).order_by('pk'):
+            recipes = list(Recipe.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[:requests])
+            ingredients = list(
+                Ingredient.objects.filter(user=user).order_by('pk').values_list('pk', flat=True)[:requests]
+            )
+            headers = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=user).key}'}
+            users.append((user, headers, recipes, ingredients))
+
+        staff = get_user_model().objects.create_superuser('benchmark-staff@example.com', 'Benchmark staff', PASSWORD)
+        staff_client = Client()
+        staff_client.force_login(staff)
+        staff_headers = {'HTTP_AUTHORIZATION': f'Token {Token.objects.create(user=staff).key}'}
+        emails = count()
+
+        def user(index):
+            return users[index % len(users)]
+
+        def send(method, path, headers=None, data=None, using=client):
+            if data is None:
+                return getattr(using, method)(path, **(headers or {}))
+            return getattr(using, method)(path, json.dumps(data), content_type='application/json', **(headers or {}))
+
+        def read(path):
+            """GET `path`, or `path(index)`, as the user of the turn."""
+            return lambda index: send('get', path(index) if callable(path) else path, user(index)[1])
+
+        def detail(route, position):
+            """URL of one of the user's recipes or ingredients, a different one on each turn."""
+            def url(index):
+                _, headers, *owned = user(index)
+                ids = owned[position]
+                # Users without ingredients get 404s.
+                pk = ids[index // len(users) % len(ids)] if ids else 0
+                return reverse(route, args=[pk]), headers
+            return url
+
+        recipe_url = detail('recipe:recipe-detail', 0)
+        ingredient_url = detail('ingredient:ingredient-detail', 1)
+
+        def new_recipe(index):
+            return {
+                'title': f'{rng.choice(ADJECTIVES)} {rng.choice(INGREDIENTS)} {rng.choice(DISHES)}',
+                'time_minutes': rng.randint(5, 240), 'price': f'{rng.uniform(1, 60):.2f}',
+                'ingredients': [{'name': name} for name in rng.sample(INGREDIENTS, 3)],
+            }
+
+        recipes_url = reverse('recipe:recipe-list')
+
+        return {
+            'api-schema GET': lambda index: send('get', reverse('api-schema')),
+            'api-docs GET': lambda index: send('get', reverse('api-docs')),
+            'admin:index GET': lambda index: send('get', reverse('admin:index'), using=staff_client),
+            'db-pool-stats GET': lambda index: send('get', reverse('db-pool-stats'), staff_headers),
+            'user:create POST': lambda index: send('post', reverse('user:create'), data={
+                'email': f'benchmark-new-{next(emails)}@example.com', 'name': 'New', 'password': PASSWORD,
+            }),
+            'user:token POST': lambda index: send('post', reverse('user:token'), data={
+                'email': user(index)[0].email, 'password': PASSWORD,
+            }),
+            'user:me GET': read(reverse('user:me')),
+            'user:me PATCH': lambda index: send('patch', reverse('user:me'), user(index)[1],
+                                                {'name': f'Benchmark {index}'}),
+            'recipe:api-root GET': read(reverse('recipe:api-root')),
+            'recipe-list GET': read(recipes_url),
+            'recipe-list POST': lambda index: send('post', recipes_url, user(index)[1], new_recipe(index)),
+            'recipe-batch POST': lambda index: send('post', reverse('recipe:recipe-batch'), user(index)[1],
+                                                    [new_recipe(index) for _ in range(10)]),
+            'recipe-export GET': read(reverse('recipe:recipe-export')),
+            'recipe-search GET': read(lambda index: f'{reverse("recipe:recipe-search")}?q={rng.choice(INGREDIENTS)}'),
+            'recipe-detail GET': lambda index: send('get', *recipe_url(index)),
+            'recipe-detail PATCH': lambda index: send('patch', *recipe_url(index), {'time_minutes': index % 240 + 1}),
+            'recipe-detail DELETE': lambda index: send('delete', *recipe_url(index)),
+            'ingredient:api-root GET': read(reverse('ingredient:api-root')),
+            'ingredient-list GET': read(reverse('ingredient:ingredient-list')),
+            'ingredient-autocomplete GET': read(
+                lambda index: f'{reverse("ingredient:ingredient-autocomplete")}?q={rng.choice(INGREDIENTS)[:2]}'
+            ),
+            'ingredient-detail GET': lambda index: send('get', *ingredient_url(index)),
+            'ingredient-detail PATCH': lambda index: send('patch', *ingredient_url(index), {
+                'name': f'renamed {index}',
+            }),
+            'ingredient-detail DELETE': lambda index: send('delete', *ingredient_url(index)),
+        }
+
+    def _measure(self, send, first, requests, warm_cache):
+        latencies, queries, statuses = [], [], {}
+        for index in range(first, first + requests):
+            if not warm_cache:
+                # Requests replay the same URLs, later ones would be hits.
+                get_response_cache().clear()
+            usage, token = metrics.start_db_usage()
+            started = time.perf_counter()
+            try:
+                response = send(index)
+                # Streamed responses are produced while they are read.
+                response.getvalue()
+                latencies.append(time.perf_counter() - started)
+            finally:
+                metrics.stop_db_usage(token)
+            queries.append(usage[0])
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        latencies.sort()
+        return {
+            'requests': requests,
+            'p50_ms': percentile(latencies, 0.5) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000,
+            'p99_ms': percentile(latencies, 0.99) * 1000,
+            'mean_ms': sum(latencies) / len(latencies) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'queries_mean': sum(queries) / len(queries),
+            'queries_max': max(queries),
+            'statuses': statuses,
+        }
+
+    def _format(self, name, result):
+        statuses = ', '.join(f'{status}: {number}' for status, number in sorted(result['statuses'].items()))
+        return (
+            f'{name:<30} p50 {result["p50_ms"]:8.2f} ms  p95 {result["p95_ms"]:8.2f} ms  '
+            f'p99 {result["p99_ms"]:8.2f} ms  {result["queries_mean"]:6.1f} queries  ({statuses})'
+        )
+
+    def _meta(self, sample, requests, warmup, seed, warm_cache):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+
+        users = get_user_model().objects.filter(email__endswith=EMAIL_DOMAIN)
+        return {
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'dataset': {
+                'users': users.count(),
+                'recipes': Recipe.objects.filter(user__in=users).count(),
+                'ingredients': Ingredient.objects.filter(user__in=users).count(),
+            },
+            'options': {
+                'requests': requests, 'warmup': warmup, 'users': len(sample), 'seed': seed, 'warm_cache': warm_cache,
+            },
+            'settings': {
+                **{name: getattr(settings, name) for name in ('API_FAST_READS', 'API_ASYNC_READS', 'API_PAGE_SIZE')},
+                'DB_POOL': settings.DATABASES['default'].get('POOL'),
+            },
+        }
+
+    # Comparison.
+
+    def compare(self, base, head, threshold, fail_on_regression, **options):
+        with open(base) as file:
+            base_results = json.load(file)['endpoints']
+        with open(head) as file:
+            head_results = json.load(file)['endpoints']
+
+        regressions = []
+        for name in sorted(base_results.keys() & head_results.keys()):
+            before, after = base_results[name], head_results[name]
+            changes = {
+                key: (after[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                for key in ('p50_ms', 'p95_ms', 'p99_ms')
+            }
+            if changes['p95_ms'] > threshold:
+                regressions.append(name)
+            self.stdout.write(
+                f'{name:<30} '
+                + '  '.join(f'{key[:3]} {before[key]:8.2f} -> {after[key]:8.2f} ms ({changes[key]:+.0f}%)'
+                            for key in ('p50_ms', 'p95_ms', 'p99_ms'))
+                + f'  queries {before["queries_mean"]:.1f} -> {after["queries_mean"]:.1f}'
+            )
+
+        for name in sorted(base_results.keys() ^ head_results.keys()):
+            self.stdout.write(f'{name:<30} only in {base if name in base_results else head}')
+
+        if regressions:
+            message = f'p95 latency regressed by more than {threshold:g}%: {", ".join(regressions)}'
+            if fail_on_regression:
+                raise CommandError(message)
+            self.stderr.write(message)
@@ -0,0 +1,116 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management import BaseCommand, CommandError
+from django.test import override_settings
+
+from core.hashers import MINIMUM_WORK_FACTORS, WORK_FACTOR_SETTINGS
+
+PASSWORD = 'calibration password'
+
+# Lowest work factors the hashers accept, the floor of --below-minimum.
+LOWEST_WORK_FACTORS = {
+    'pbkdf2_sha256': 1000,
+    'argon2': 1,
+    'bcrypt_sha256': 4,
+    'scrypt': 2,
+}
+
+
+def scale(algorithm, work_factor, ratio):
+    """Return the work factor hashing `ratio` times as long as `work_factor`."""
+    if algorithm == 'bcrypt_sha256':
+        # Rounds are the log2 of the iterations.
+        return work_factor + round(math.log2(ratio))
+    if algorithm == 'scrypt':
+        return work_factor * 2 ** round(math.log2(ratio))
+    if algorithm == 'pbkdf2_sha256':
+        return int(round(work_factor * ratio, -3))
+
+    return round(work_factor * ratio)
+
+
+class Command(BaseCommand):
+    help = 'Pick the work factor of each available password hasher for a target hashing time on this host.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target-ms', type=float, default=100, help='Target milliseconds per hash.')
+        parser.add_argument(
+            '--hasher', action='append', choices=list(WORK_FACTOR_SETTINGS), dest='hashers',
+            help='Calibrate this algorithm only, may be repeated. Defaults to all of them.'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Hashes timed per work factor, the fastest counts.')
+        parser.add_argument(
+            '--below-minimum', action='store_true',
+            help='Let work factors go below the security minimums when those are slower than the target.'
+        )
+
+    def handle(self, *args, **options):
+        target = options['target_ms'] / 1000
+        if target <= 0:
+            raise CommandError('--target-ms must be positive.')
+
+        results = {}
+        for algorithm in options['hashers'] or WORK_FACTOR_SETTINGS:
+            hasher = get_hasher(algorithm)
+            try:
+                if hasher.library:
+                    hasher._load_library()
+            except ValueError as exc:
+                self.stdout.write(self.style.WARNING(f'{algorithm}: skipped, {exc}'))
+                continue
+
+            minimum = MINIMUM_WORK_FACTORS[algorithm]
+            floor = LOWEST_WORK_FACTORS[algorithm] if options['below_minimum'] else minimum
+            work_factor, seconds = self.calibrate(algorithm, target, options['repeat'], floor)
+            results[algorithm] = work_factor
+            self.stdout.write(f'{algorithm}: {WORK_FACTOR_SETTINGS[algorithm]}={work_factor} ({seconds * 1000:.1f} ms)')
+            if work_factor < minimum:
+                self.stdout.write(self.style.WARNING(
+                    f'{algorithm}: below the minimum work factor of {minimum}, '
+                    'its hashes are cheaper to crack when they leak.'
+                ))
+            elif work_factor == minimum and seconds > target * 1.5:
+                self.stdout.write(self.style.WARNING(
+                    f'{algorithm}: the minimum work factor is slower than the target, kept for security '
+                    '(see --below-minimum).'
+                ))
+
+        if not results:
+            raise CommandError('No password hasher is available.')
+
+        algorithm = settings.PASSWORD_HASHER if settings.PASSWORD_HASHER in results else next(iter(results))
+        self.stdout.write('\nEnvironment:')
+        self.stdout.write(f'PASSWORD_HASHER={algorithm}')
+        for name, work_factor in results.items():
+            self.stdout.write(f'{WORK_FACTOR_SETTINGS[name]}={work_factor}')
+
+    def time(self, algorithm, work_factor, repeat):
+        with override_settings(**{WORK_FACTOR_SETTINGS[algorithm]: work_factor}):
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                make_password(PASSWORD, hasher=algorithm)
+                timings.append(time.perf_counter() - started)
+
+        return min(timings)
+
+    def calibrate(self, algorithm, target, repeat, floor):
+        """Return the work factor closest to `target` seconds, and not below
+        `floor`, and its time."""
+        work_factor = MINIMUM_WORK_FACTORS[algorithm]
+        seconds = self.time(algorithm, work_factor, repeat)
+        # Hashing time is not quite proportional to the work, so scale twice.
+        for _ in range(2):
+            candidate = max(floor, scale(algorithm, work_factor, target / seconds))
+            if candidate == work_factor:
+                break
+            try:
+                seconds, work_factor = self.time(algorithm, candidate, repeat), candidate
+            except ValueError:
+                # Over the memory limit of scrypt.
+                break
+
+        return work_factor, seconds
@@ -0,0 +1,226 @@
+"""Bulk import recipes for one user from NDJSON or CSV files.
+
+Each batch is copied into temporary staging tables with PostgreSQL `COPY`
+and moved into the recipe, ingredient and recipe/ingredient tables with
+set-based statements in a single transaction, which also records the
+batch in an `ImportCheckpoint`. An interrupted import can be started again
+and continues with the first uncommitted batch.
+
+Recipes are upserted on their `import_key`: the `id` of the record, e.g.
+in a file of the recipe export, or a hash of its content. Importing a
+record again, from any file or with `--restart`, updates its recipe and
+replaces its ingredients instead of creating a duplicate.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.db import DataError, connection, transaction
+
+from core.cache import bump_data_version
+from core.models import ImportCheckpoint, Ingredient, Recipe
+
+STAGING_RECIPES = 'import_recipe_staging'
+STAGING_INGREDIENTS = 'import_ingredient_staging'
+
+
+def read_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        # None for a row with fewer fields than the header.
+        row['ingredients'] = [name for name in (row.get('ingredients') or '').split(';') if name]
+        yield row
+
+
+READERS = {
+    'ndjson': read_ndjson,
+    'csv': read_csv,
+}
+
+
+def parse_recipe(record):
+    """Return the staging columns and ingredient names of one input record."""
+    try:
+        title = record['title']
+        time_minutes = int(record['time_minutes'])
+        price = Decimal(str(record['price']))
+        names = [
+            ingredient['name'] if isinstance(ingredient, dict) else ingredient
+            for ingredient in record.get('ingredients') or []
+        ]
+    except (KeyError, TypeError, ValueError, InvalidOperation) as exc:
+        raise ValueError(f'invalid recipe {record!r}: {exc!r}')
+
+    description = record.get('description') or ''
+
+    if record.get('id') not in (None, ''):
+        key = f"id:{record['id']}"
+    else:
+        content = json.dumps([title, time_minutes, str(price), description, sorted(set(names))])
+        key = f'sha256:{hashlib.sha256(content.encode()).hexdigest()}'
+
+    return [key, title, time_minutes, price, description], names
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Bulk import recipes and ingredients of a user from an NDJSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File with one recipe per line (NDJSON) or row (CSV).')
+        parser.add_argument('--user', required=True, help='Email of the user owning the recipes.')
+        parser.add_argument('--format', choices=sorted(READERS), help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--checkpoint', help='Name of the progress record, defaults to the absolute path.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Discard an existing checkpoint, recipes imported before are updated again.'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('import_recipes requires PostgreSQL.')
+
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist.")
+
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if file_format not in READERS:
+            raise CommandError(f'Unknown format {file_format!r}, use --format.')
+
+        checkpoint = options['checkpoint'] or os.path.abspath(path)
+        checkpoints = ImportCheckpoint.objects.filter(user=user, name=checkpoint)
+        if options['restart']:
+            checkpoints.delete()
+        done_batches = checkpoints.values_list('batches', flat=True).first() or 0
+        batch_size = options['batch_size']
+
+        imported = 0
+        started = time.monotonic()
+
+        with open(path, newline='') as file, connection.cursor() as cursor:
+            recipes = (parse_recipe(record) for record in READERS[file_format](file))
+            if done_batches:
+                self.stdout.write(f'Resuming after batch {done_batches} ...')
+
+            self._create_staging_tables(cursor)
+            try:
+                for number, batch in enumerate(batches(recipes, batch_size), 1):
+                    if number <= done_batches:
+                        continue
+
+                    batch_started = time.monotonic()
+                    self._import_batch(cursor, user, batch, checkpoint, number)
+                    done_batches = number
+                    imported += len(batch)
+
+                    elapsed = time.monotonic() - batch_started
+                    self.stdout.write(
+                        f'Batch {number}: {len(batch)} recipes '
+                        f'({len(batch) / max(elapsed, 1e-6):.0f} rows/s, {imported} total)'
+                    )
+            except (ValueError, DataError) as exc:
+                # DataError: a value out of the range of its column.
+                raise CommandError(f'Batch {done_batches + 1}: {exc}'.strip())
+            finally:
+                self._drop_staging_tables(cursor)
+                if imported:
+                    bump_data_version(user.id)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes in {elapsed:.1f}s ({imported / max(elapsed, 1e-6):.0f} rows/s).'
+        ))
+
+    def _create_staging_tables(self, cursor):
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_RECIPES} ('
+            'seq integer PRIMARY KEY, id bigint, import_key varchar(255) NOT NULL, title varchar(255) NOT NULL, '
+            'time_minutes integer NOT NULL, price numeric(5, 2) NOT NULL, description text NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_INGREDIENTS} ('
+            'seq integer NOT NULL, name varchar(255) NOT NULL)'
+        )
+
+    def _drop_staging_tables(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {STAGING_RECIPES}, {STAGING_INGREDIENTS}')
+
+    def _copy(self, cursor, table, columns, rows):
+        buffer = io.StringIO()
+        # Unquoted empty fields would be read as NULL by COPY.
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        # Not wrapped by Django's cursor, raises psycopg2 errors otherwise.
+        with connection.wrap_database_errors:
+            cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    def _import_batch(self, cursor, user, recipes, checkpoint, number):
+        recipe_table = Recipe._meta.db_table
+        ingredient_table = Ingredient._meta.db_table
+        link_table = Recipe.ingredients.through._meta.db_table
+
+        # A key must occur once per upsert, the last record wins as it does
+        # across batches.
+        recipes = list({columns[0]: (columns, names) for columns, names in recipes}.values())
+
+        with transaction.atomic():
+            cursor.execute(f'TRUNCATE {STAGING_RECIPES}, {STAGING_INGREDIENTS}')
+            self._copy(
+                cursor, STAGING_RECIPES, ['seq', 'import_key', 'title', 'time_minutes', 'price', 'description'],
+                ([seq] + columns for seq, (columns, _) in enumerate(recipes))
+            )
+            self._copy(
+                cursor, STAGING_INGREDIENTS, ['seq', 'name'],
+                ([seq, name] for seq, (_, names) in enumerate(recipes) for name in names)
+            )
+
+            cursor.execute(
+                f'INSERT INTO {ingredient_table} (user_id, name) '
+                f'SELECT DISTINCT %s, name FROM {STAGING_INGREDIENTS} '
+                'ON CONFLICT (user_id, name) DO NOTHING',
+                [user.id]
+            )
+            cursor.execute(
+                f'INSERT INTO {recipe_table} (user_id, import_key, title, time_minutes, price, description) '
+                f'SELECT %s, import_key, title, time_minutes, price, description FROM {STAGING_RECIPES} '
+                'ORDER BY seq '
+                'ON CONFLICT (user_id, import_key) DO UPDATE SET title = EXCLUDED.title, '
+                'time_minutes = EXCLUDED.time_minutes, price = EXCLUDED.price, description = EXCLUDED.description',
+                [user.id]
+            )
+            cursor.execute(
+                f'UPDATE {STAGING_RECIPES} s SET id = r.id FROM {recipe_table} r '
+                'WHERE r.user_id = %s AND r.import_key = s.import_key',
+                [user.id]
+            )
+            # Ingredients of recipes imported before are replaced.
+            cursor.execute(f'DELETE FROM {link_table} l USING {STAGING_RECIPES} r WHERE l.recipe_id = r.id')
+            cursor.execute(
+                f'INSERT INTO {link_table} (recipe_id, ingredient_id) '
+                f'SELECT DISTINCT r.id, i.id FROM {STAGING_INGREDIENTS} s '
+                f'JOIN {STAGING_RECIPES} r ON r.seq = s.seq '
+                f'JOIN {ingredient_table} i ON i.user_id = %s AND i.name = s.name',
+                [user.id]
+            )
+            ImportCheckpoint.objects.update_or_create(user=user, name=checkpoint, defaults={'batches': number})
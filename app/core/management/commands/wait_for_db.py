@@ -1,17 +1,38 @@
-from django.core.management import BaseCommand
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from core.startup import retry
+
 
 class Command(BaseCommand):
+    help = 'Wait for the database, retrying with exponential backoff and jitter.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=settings.STARTUP_WAIT_FOR_DB_TIMEOUT,
+            help='Seconds after which to give up.'
+        )
+        parser.add_argument('--base-delay', type=float, default=0.1, help='Seconds before the first retry.')
+        parser.add_argument('--max-delay', type=float, default=5.0, help='Maximum seconds between retries.')
+
     def handle(self, *args, **options):
-        is_ready = False
         self.stdout.write("Checking availability of database ...")
 
-        while not is_ready:
-            try:
-                self.check(databases=['default'])
-                is_ready = True
-                self.stdout.write(self.style.SUCCESS('Database is ready now ...'))
-            except (Psycopg2OpError, OperationalError):
-                self.stdout.write(self.style.ERROR("Database is still unavailable ..."))
+        def on_retry(exc, delay):
+            self.stdout.write(self.style.ERROR(f"Database is still unavailable, retrying in {delay:.2f}s ..."))
+
+        try:
+            retry(
+                lambda: self.check(databases=['default']),
+                (Psycopg2OpError, OperationalError),
+                options['timeout'],
+                base=options['base_delay'],
+                cap=options['max_delay'],
+                on_retry=on_retry,
+            )
+        except (Psycopg2OpError, OperationalError) as exc:
+            raise CommandError(f"Database is unavailable after {options['timeout']:g}s: {exc}") from exc
+
+        self.stdout.write(self.style.SUCCESS('Database is ready now ...'))
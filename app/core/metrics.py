@@ -0,0 +1,235 @@
+"""Per-route request metrics in the Prometheus text format.
+
+`core.middleware.MetricsMiddleware` times each request and counts the SQL
+queries it runs, and serves `/metrics` to the clients of
+`METRICS_ALLOWED_IPS` or sending `METRICS_TOKEN` as a bearer token.
+Metrics are kept per process, so each worker of a multi-process server is
+scraped on its own.
+"""
+import functools
+import hmac
+import ipaddress
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core.db.pool import pool_stats
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Functions returning more lines of `/metrics`, called on each scrape.
+collectors = []
+
+# [queries, seconds, timeline] of the request being served.
+_db_usage = ContextVar('db_usage', default=None)
+
+
+def _record_query(execute, sql, params, many, context):
+    usage = _db_usage.get()
+    if usage is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = time.perf_counter() - started
+        usage[0] += 1
+        usage[1] += seconds
+        if usage[2] is not None:
+            usage[2].append((context['connection'].alias, sql, started, seconds))
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def start_db_usage(timeline=None):
+    """Count the queries of the current request, returning the counters.
+
+    Queries are also appended to `timeline`, if given, as
+    `(alias, sql, started, seconds)`.
+    """
+    usage = [0, 0.0, timeline]
+    return usage, _db_usage.set(usage)
+
+
+def stop_db_usage(token):
+    """Stop counting, adding the counts to the usage it was nested in."""
+    usage = _db_usage.get()
+    _db_usage.reset(token)
+
+    outer = _db_usage.get()
+    if outer is not None:
+        outer[0] += usage[0]
+        outer[1] += usage[1]
+
+
+def route_name(url_name, namespaces):
+    """Name a URL pattern, e.g. `recipe-list`.
+
+    Router URL names already include the basename, other names are
+    qualified by their namespace (`user:token`).
+    """
+    if not namespaces or url_name.startswith(f'{namespaces[-1]}-'):
+        return url_name
+
+    return ':'.join([*namespaces, url_name])
+
+
+def get_route(request):
+    """Name the URL pattern that served the request, see `route_name()`."""
+    match = request.resolver_match
+    if match is None or match.url_name is None:
+        return 'unmatched'
+
+    return route_name(match.url_name, match.namespaces)
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'seconds', 'queries', 'db_seconds', 'statuses')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statuses = {}
+
+
+class RequestMetrics:
+    """Latency histogram, status counts and DB usage per route and method."""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, route, method, status, seconds, queries, db_seconds):
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+
+        with self._lock:
+            series = self._series.get((route, method))
+            if series is None:
+                series = self._series[(route, method)] = _Series()
+
+            series.buckets[bucket] += 1
+            series.count += 1
+            series.seconds += seconds
+            series.queries += queries
+            series.db_seconds += db_seconds
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            series = [
+                (route, method, list(s.buckets), s.count, s.seconds, s.queries, s.db_seconds, dict(s.statuses))
+                for (route, method), s in sorted(self._series.items())
+            ]
+
+        latency, requests, queries, db_time = [], [], [], []
+        for route, method, buckets, count, seconds, query_count, db_seconds, statuses in series:
+            labels = f'route="{_escape(route)}",method="{_escape(method)}"'
+            cumulative = 0
+            for bound, bucket_count in zip((*LATENCY_BUCKETS, '+Inf'), buckets):
+                cumulative += bucket_count
+                latency.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            latency.append(f'http_request_duration_seconds_sum{{{labels}}} {seconds}')
+            latency.append(f'http_request_duration_seconds_count{{{labels}}} {count}')
+            requests.extend(
+                f'http_requests_total{{{labels},status="{status}"}} {status_count}'
+                for status, status_count in sorted(statuses.items())
+            )
+            queries.append(f'http_request_db_queries_total{{{labels}}} {query_count}')
+            db_time.append(f'http_request_db_seconds_total{{{labels}}} {db_seconds}')
+
+        lines = [
+            *_family('http_request_duration_seconds', 'histogram', 'Request latency.', latency),
+            *_family('http_requests_total', 'counter', 'Requests by response status.', requests),
+            *_family('http_request_db_queries_total', 'counter', 'SQL queries run by requests.', queries),
+            *_family('http_request_db_seconds_total', 'counter', 'Time spent in SQL queries.', db_time),
+            *_pool_lines(),
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _family(name, kind, help_text, samples):
+    if not samples:
+        return []
+
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', *samples]
+
+
+def _pool_lines():
+    """Gauges and counters of the database connection pools."""
+    stats = sorted(pool_stats().items())
+    connections = [
+        f'db_pool_connections{{alias="{_escape(alias)}",state="{state}"}} {pool[state]}'
+        for alias, pool in stats for state in ('in_use', 'idle')
+    ]
+
+    return [
+        *_family('db_pool_connections', 'gauge', 'Open pooled connections.', connections),
+        *_family('db_pool_max_size', 'gauge', 'Maximum size of the pool.', [
+            f'db_pool_max_size{{alias="{_escape(alias)}"}} {pool["max_size"]}' for alias, pool in stats
+        ]),
+        *_family('db_pool_waits_total', 'counter', 'Acquisitions that waited for a connection.', [
+            f'db_pool_waits_total{{alias="{_escape(alias)}"}} {pool["waits"]}' for alias, pool in stats
+        ]),
+        *_family('db_pool_wait_seconds_total', 'counter', 'Time spent waiting for a connection.', [
+            f'db_pool_wait_seconds_total{{alias="{_escape(alias)}"}} {pool["wait_time"]}' for alias, pool in stats
+        ]),
+        *_family('db_pool_timeouts_total', 'counter', 'Acquisitions that timed out.', [
+            f'db_pool_timeouts_total{{alias="{_escape(alias)}"}} {pool["timeouts"]}' for alias, pool in stats
+        ]),
+    ]
+
+
+request_metrics = RequestMetrics()
+
+
+def render():
+    """Return the request metrics followed by the lines of the `collectors`."""
+    lines = [line for collector in collectors for line in collector()]
+    return request_metrics.render() + ''.join(f'{line}\n' for line in lines)
+
+
+@functools.lru_cache(maxsize=None)
+def _networks(allowed_ips):
+    return [ipaddress.ip_network(value, strict=False) for value in allowed_ips]
+
+
+def is_scrape_allowed(request):
+    """Whether the client may read `/metrics`.
+
+    The address is `REMOTE_ADDR`, forwarded addresses are not trusted.
+    """
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        address = None
+    if address is not None and any(address in network for network in _networks(tuple(settings.METRICS_ALLOWED_IPS))):
+        return True
+
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
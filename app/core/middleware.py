@@ -0,0 +1,173 @@
+"""Middleware of the API."""
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from rest_framework.permissions import SAFE_METHODS
+
+from core import metrics, profiling, startup
+from core.db.routers import pin_to_primary, use_primary
+
+
+class NativeAsyncMiddleware(MiddlewareMixin):
+    """Base of middleware implementing both `__call__` and `__acall__`.
+
+    The mode is decided once, `MiddlewareMixin` checks it on each request.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = iscoroutinefunction(self)
+
+
+class MetricsMiddleware(NativeAsyncMiddleware):
+    """Record per-route latency and DB usage, and serve them on `/metrics`
+    to allowed clients (see `core.metrics.is_scrape_allowed()`).
+
+    Handles sync and async requests natively, so it adds no thread hop
+    under ASGI.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.path == settings.METRICS_PATH:
+            return self.metrics_response(request)
+
+        started = time.perf_counter()
+        usage, token = metrics.start_db_usage()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop_db_usage(token)
+
+        self.observe(request, response, time.perf_counter() - started, usage)
+        return response
+
+    async def __acall__(self, request):
+        if request.path == settings.METRICS_PATH:
+            # Collectors may query the database.
+            return await sync_to_async(self.metrics_response)(request)
+
+        started = time.perf_counter()
+        usage, token = metrics.start_db_usage()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop_db_usage(token)
+
+        self.observe(request, response, time.perf_counter() - started, usage)
+        return response
+
+    def observe(self, request, response, seconds, usage):
+        metrics.request_metrics.observe(
+            metrics.get_route(request), request.method, response.status_code, seconds, usage[0], usage[1]
+        )
+
+    def metrics_response(self, request):
+        if not metrics.is_scrape_allowed(request):
+            return HttpResponseForbidden()
+
+        return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+class ProfilerMiddleware(NativeAsyncMiddleware):
+    """Profile the requests of staff users asking for it (see `core.profiling`).
+
+    The id of the stored profile is returned in the `X-Profile-Id` header.
+    Under ASGI, the CPU profile only covers the event loop thread.
+    """
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not profiling.is_requested(request):
+            return self.get_response(request)
+
+        user = profiling.get_staff_user(request)
+        profiler = profiling.Profiler()
+        if user is None or not profiler.start():
+            return self.get_response(request)
+
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.stop()
+
+        response['X-Profile-Id'] = profiler.save(request, response, user).pk
+        return response
+
+    async def __acall__(self, request):
+        if not profiling.is_requested(request):
+            return await self.get_response(request)
+
+        user = await profiling.aget_staff_user(request)
+        profiler = profiling.Profiler()
+        if user is None or not profiler.start():
+            return await self.get_response(request)
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+
+        response['X-Profile-Id'] = (await sync_to_async(profiler.save)(request, response, user)).pk
+        return response
+
+
+class HealthCheckMiddleware(MiddlewareMixin):
+    """Answer the liveness and readiness probes ahead of the other middleware.
+
+    `/healthz` only tells that the process serves requests. `/readyz` also
+    requires the warm-up to have completed and the database to answer.
+    """
+
+    def process_request(self, request):
+        if request.path == '/healthz':
+            return JsonResponse({'status': 'ok'})
+        if request.path == '/readyz':
+            return self.readiness()
+
+        return None
+
+    def readiness(self):
+        readiness = startup.readiness
+        if readiness.error is not None:
+            return JsonResponse({'status': 'warm-up failed', 'error': readiness.error}, status=503)
+        if not readiness.is_ready():
+            return JsonResponse({'status': 'warming up'}, status=503)
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            return JsonResponse({'status': 'database unavailable'}, status=503)
+
+        return JsonResponse({'status': 'ready'})
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Reset replica reads per request and pin writers to the primary."""
+
+    def process_request(self, request):
+        use_primary()
+
+    def process_response(self, request, response):
+        use_primary()
+
+        # `request.user` is the user authenticated by DRF for API views.
+        user = getattr(request, 'user', None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user.pk)
+
+        return response
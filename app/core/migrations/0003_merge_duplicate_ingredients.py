@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:46
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Keep the oldest ingredient per (user, name) and move recipe links to it."""
+    Ingredient = apps.get_model('core', 'Ingredient')
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeIngredient = Recipe.ingredients.through
+
+    duplicates = (
+        Ingredient.objects.values('user_id', 'name')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+
+    for duplicate in duplicates:
+        duplicate_ids = list(
+            Ingredient.objects.filter(user_id=duplicate['user_id'], name=duplicate['name'])
+            .exclude(id=duplicate['keep_id'])
+            .values_list('id', flat=True)
+        )
+        recipe_ids = set(
+            RecipeIngredient.objects.filter(ingredient_id__in=duplicate_ids).values_list('recipe_id', flat=True)
+        )
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(recipe_id=recipe_id, ingredient_id=duplicate['keep_id']) for recipe_id in recipe_ids],
+            ignore_conflicts=True
+        )
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_user_id_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients, migrations.RunPython.noop),
+    ]
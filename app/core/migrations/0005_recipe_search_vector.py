@@ -0,0 +1,103 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Weights: A title, B ingredient names, C description.
+CREATE_TRIGGERS = """
+CREATE FUNCTION core_recipe_build_search_vector(p_recipe_id bigint, p_title text, p_description text)
+RETURNS tsvector AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_title, '')), 'A')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(i.name, ' ')
+            FROM core_recipe_ingredients ri
+            JOIN core_ingredient i ON i.id = ri.ingredient_id
+            WHERE ri.recipe_id = p_recipe_id
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce(p_description, '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE FUNCTION core_recipe_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := core_recipe_build_search_vector(NEW.id, NEW.title, NEW.description);
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_search_vector
+BEFORE INSERT OR UPDATE OF title, description ON core_recipe
+FOR EACH ROW EXECUTE FUNCTION core_recipe_search_vector_trigger();
+
+CREATE FUNCTION core_recipe_ingredients_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_build_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (SELECT recipe_id FROM changed_links);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_recipe_ingredients_insert_search_vector
+AFTER INSERT ON core_recipe_ingredients
+REFERENCING NEW TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_ingredients_search_vector_trigger();
+
+CREATE TRIGGER core_recipe_ingredients_delete_search_vector
+AFTER DELETE ON core_recipe_ingredients
+REFERENCING OLD TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE FUNCTION core_recipe_ingredients_search_vector_trigger();
+
+CREATE FUNCTION core_ingredient_search_vector_trigger() RETURNS trigger AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_build_search_vector(r.id, r.title, r.description)
+    WHERE r.id IN (
+        SELECT ri.recipe_id
+        FROM core_recipe_ingredients ri
+        JOIN renamed_new n ON n.id = ri.ingredient_id
+        JOIN renamed_old o ON o.id = n.id
+        WHERE n.name IS DISTINCT FROM o.name
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_ingredient_search_vector
+AFTER UPDATE ON core_ingredient
+REFERENCING NEW TABLE AS renamed_new OLD TABLE AS renamed_old
+FOR EACH STATEMENT EXECUTE FUNCTION core_ingredient_search_vector_trigger();
+
+UPDATE core_recipe SET search_vector = core_recipe_build_search_vector(id, title, description);
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER core_ingredient_search_vector ON core_ingredient;
+DROP TRIGGER core_recipe_ingredients_delete_search_vector ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_ingredients_insert_search_vector ON core_recipe_ingredients;
+DROP TRIGGER core_recipe_search_vector ON core_recipe;
+DROP FUNCTION core_ingredient_search_vector_trigger();
+DROP FUNCTION core_recipe_ingredients_search_vector_trigger();
+DROP FUNCTION core_recipe_search_vector_trigger();
+DROP FUNCTION core_recipe_build_search_vector(bigint, text, text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_unique_ingredient_name_per_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+        ),
+        migrations.RunSQL(CREATE_TRIGGERS, DROP_TRIGGERS),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+# Ingredient-first index on the recipe/ingredient table, so the ingredient
+# filters of the recipe list find and group the recipes of a set of
+# ingredients with an index-only scan.
+CREATE_INDEX = (
+    'CREATE INDEX core_recipe_ingredients_ingredient_recipe_idx '
+    'ON core_recipe_ingredients (ingredient_id, recipe_id)'
+)
+DROP_INDEX = 'DROP INDEX core_recipe_ingredients_ingredient_recipe_idx'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='import_key',
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='recipe',
+            constraint=models.UniqueConstraint(fields=('user', 'import_key'), name='unique_recipe_import_key_per_user'),
+        ),
+    ]
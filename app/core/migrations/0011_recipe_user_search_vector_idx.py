@@ -0,0 +1,52 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+# Every search is limited to the recipes of one user, a GIN index on both
+# columns (with btree_gin for `user_id`) finds them without reading the
+# matches of all other users. Servers without the contrib extensions get an
+# index on the search vector only, under the same name.
+CREATE_INDEX = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT FROM pg_available_extensions WHERE name = 'btree_gin') THEN
+        CREATE EXTENSION IF NOT EXISTS btree_gin;
+        CREATE INDEX recipe_user_search_vector_idx ON core_recipe USING gin (user_id, search_vector);
+    ELSE
+        CREATE INDEX recipe_user_search_vector_idx ON core_recipe USING gin (search_vector);
+    END IF;
+END
+$$;
+DROP INDEX recipe_search_vector_idx;
+"""
+
+DROP_INDEX = """
+CREATE INDEX recipe_search_vector_idx ON core_recipe USING gin (search_vector);
+DROP INDEX recipe_user_search_vector_idx;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_import_key'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+            ],
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='recipe',
+                    name='recipe_search_vector_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(
+                        fields=['user', 'search_vector'], name='recipe_user_search_vector_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
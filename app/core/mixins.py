@@ -0,0 +1,264 @@
+"""Mixins shared by the API viewsets."""
+import hashlib
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Prefetch
+from django.http import Http404
+from django.utils.http import parse_etags
+
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from core.cache import aget_data_version, get_data_version, get_response_cache
+from core.db.routers import is_pinned_to_primary, use_replica
+from core.serializers import ValuesReader
+
+
+def _fingerprint(view, request, version):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{request.user.id}:{version}:{view.basename}:{view.action}:{path}'
+
+
+def get_request_fingerprint(view, request):
+    """Identify the data a read request returns, as of the user's data version."""
+    return _fingerprint(view, request, get_data_version(request.user.id))
+
+
+async def aget_request_fingerprint(view, request):
+    return _fingerprint(view, request, await aget_data_version(request.user.id))
+
+
+class ConditionalGetMixin:
+    """Strong ETags and `If-None-Match` support for list and retrieve.
+
+    The ETag is derived from the user's data version instead of the
+    rendered body, so a matching request is answered with
+    `304 Not Modified` before the queryset or serializer run.
+    """
+
+    def get_etag(self, request):
+        return self._etag(request, get_request_fingerprint(self, request))
+
+    async def aget_etag(self, request):
+        return self._etag(request, await aget_request_fingerprint(self, request))
+
+    def _etag(self, request, fingerprint):
+        fingerprint = f'{fingerprint}:{request.accepted_media_type}'
+        return '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+
+    def _not_modified_response(self, request, etag):
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+    def _conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+
+        response = self._not_modified_response(request, etag) or handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+
+        return response
+
+    async def _aconditional_response(self, handler, request, *args, **kwargs):
+        etag = await self.aget_etag(request)
+
+        response = self._not_modified_response(request, etag) or await handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._aconditional_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self._aconditional_response(super().aretrieve, request, *args, **kwargs)
+
+
+class SparseQuerysetMixin:
+    """Load only what the serializer of a read will output.
+
+    Columns of fields left out by `?fields=` (see
+    `core.serializers.SparseFieldsetMixin`) are deferred and many-to-many
+    fields are only prefetched, ordered by primary key, when they are
+    returned.
+    """
+
+    def get_sparse_queryset(self, queryset):
+        opts = queryset.model._meta
+        columns, relations = [opts.pk.name], []
+
+        for field in self.get_serializer().fields.values():
+            try:
+                model_field = opts.get_field(field.source)
+            except FieldDoesNotExist:
+                # Not a model field (method field, property ...), it may
+                # read any column.
+                columns = None
+                continue
+
+            if model_field.many_to_many:
+                # Ordered like `ValuesReader`, so both read paths agree.
+                related = model_field.related_model._default_manager.order_by('pk')
+                relations.append(Prefetch(field.source, queryset=related))
+            elif columns is not None:
+                columns.append(field.source)
+
+        if columns is not None:
+            queryset = queryset.only(*columns)
+
+        return queryset.prefetch_related(*relations)
+
+
+class ValuesReadMixin:
+    """Serve list and retrieve from `values()` rows, skipping model
+    instances and the serializer field machinery.
+
+    Enabled with `API_FAST_READS`. Responses are the same as the regular
+    path (see `core.serializers.ValuesReader`), which is still used for
+    serializers the reader cannot compile.
+    """
+
+    def get_values_reader(self):
+        if not settings.API_FAST_READS:
+            return None
+
+        return ValuesReader.compile(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = reader.get_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.represent(page))
+
+        return Response(reader.represent(list(rows)))
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        rows = reader.get_values(self.filter_queryset(self.get_queryset()))
+        row = get_object_or_404(rows, **self._get_lookup())
+
+        return Response(reader.represent([row])[0])
+
+    async def alist(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return await sync_to_async(super().list)(request, *args, **kwargs)
+
+        rows = reader.get_values(self.filter_queryset(self.get_queryset()))
+        if self.paginator is not None:
+            page = await self.paginator.apaginate_queryset(rows, request, view=self)
+            if page is not None:
+                return self.get_paginated_response(await reader.arepresent(page))
+
+        return Response(await reader.arepresent([row async for row in rows]))
+
+    async def aretrieve(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return await sync_to_async(super().retrieve)(request, *args, **kwargs)
+
+        rows = reader.get_values(self.filter_queryset(self.get_queryset()))
+        # As `get_object_or_404()`.
+        try:
+            row = await rows.aget(**self._get_lookup())
+        except rows.model.DoesNotExist:
+            raise Http404(f'No {rows.model._meta.object_name} matches the given query.')
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+
+        return Response((await reader.arepresent([row]))[0])
+
+    def _get_lookup(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+
+class CachedResponseMixin:
+    """Cache list and retrieve responses per user and data version.
+
+    Keys embed the user's data version (see `core.cache.bump_data_version`),
+    so any write to the user's recipes or ingredients makes the old entries
+    unreachable and they age out of the bounded cache. Versions are shared
+    by every process, so the responses may be cached per process: a write
+    made anywhere, e.g. by `import_recipes`, is seen on the next request.
+    Hits skip the ORM and the serializers.
+    """
+
+    def get_response_cache_key(self, request):
+        return f'response:{get_request_fingerprint(self, request)}'
+
+    async def aget_response_cache_key(self, request):
+        return f'response:{await aget_request_fingerprint(self, request)}'
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+
+        data = get_response_cache().get(key)
+        if data is not None:
+            return Response(data)
+
+        return self._cache_response(key, handler(request, *args, **kwargs))
+
+    async def _acached_response(self, handler, request, *args, **kwargs):
+        key = await self.aget_response_cache_key(request)
+
+        data = await get_response_cache().aget(key)
+        if data is not None:
+            return Response(data)
+
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await get_response_cache().aset(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+
+        return response
+
+    def _cache_response(self, key, response):
+        if response.status_code == status.HTTP_200_OK:
+            get_response_cache().set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        return await self._acached_response(super().alist, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        return await self._acached_response(super().aretrieve, request, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """Serve the safe requests of users without recent writes from a replica.
+
+    Decided once DRF has authenticated the user, whose writes pin them to
+    the primary for a while (see `core.db.routers`).
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+
+        if request.method in SAFE_METHODS and not is_pinned_to_primary(request.user.pk):
+            use_replica()
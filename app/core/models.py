@@ -1,4 +1,9 @@
 from django.db import models
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
+
+from core.cache import bump_data_version
 
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -54,10 +59,62 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 
+class IngredientManager(models.Manager):
+    """Manager to resolve ingredients in bulk."""
+
+    def get_or_create_many(self, user, names):
+        """Return a dict mapping each name to the user's ingredient.
+
+        Runs one query for the existing names and, when some are missing,
+        one bulk insert plus one query to read them back. Concurrent
+        inserts of the same name are absorbed by the per-user unique
+        constraint. Bulk inserts send no signals, so the user's data
+        version is bumped here.
+        """
+        names = list(dict.fromkeys(names))
+        if not names:
+            return {}
+
+        ingredients = {
+            ingredient.name: ingredient
+            for ingredient in self.filter(user=user, name__in=names)
+        }
+        missing = [name for name in names if name not in ingredients]
+
+        if missing:
+            self.bulk_create(
+                [self.model(user=user, name=name) for name in missing],
+                ignore_conflicts=True
+            )
+            bump_data_version(user.id)
+            ingredients.update(
+                (ingredient.name, ingredient)
+                for ingredient in self.filter(user=user, name__in=missing)
+            )
+
+        return ingredients
+
+
 class Ingredient(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
 
+    objects = IngredientManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='ingredient_user_id_idx'),
+            # Case insensitive prefix search (`name__istartswith`) of the
+            # ingredient autocomplete.
+            models.Index(
+                'user', OpClass(Upper('name'), name='text_pattern_ops'),
+                name='ingredient_name_prefix_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_ingredient_name_per_user'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -69,6 +126,68 @@ class Recipe(models.Model):
     price = models.DecimalField(max_digits=5, decimal_places=2)
     description = models.TextField(blank=True)
     ingredients = models.ManyToManyField("Ingredient")
+    # Maintained by database triggers from the title, ingredient names and
+    # description, see migration 0005_recipe_search_vector.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Key of the record that `import_recipes` created the recipe from, which
+    # a later import of the same record updates.
+    import_key = models.CharField(max_length=255, null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'], name='recipe_user_id_idx'),
+            # Needs the btree_gin extension, see migration
+            # 0011_recipe_user_search_vector_idx.
+            GinIndex(fields=['user', 'search_vector'], name='recipe_user_search_vector_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'import_key'], name='unique_recipe_import_key_per_user'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RequestProfile(models.Model):
+    """Profile of one request, recorded on demand by `core.profiling`."""
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(UserProfile, on_delete=models.SET_NULL, null=True)
+    method = models.CharField(max_length=10)
+    path = models.TextField()
+    status_code = models.PositiveSmallIntegerField()
+    # Seconds.
+    duration = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    db_time = models.FloatField()
+    # Bytes allocated at the peak, as traced by tracemalloc.
+    peak_memory = models.BigIntegerField()
+    cpu_profile = models.TextField()
+    # [{'alias', 'sql', 'start', 'duration'}], times in seconds from the
+    # start of the request.
+    sql_timeline = models.JSONField(default=list)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
+
+
+class ImportCheckpoint(models.Model):
+    """Batches of a file committed by `import_recipes`, updated in the
+    transaction of each batch."""
+
+    user = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
+    # Absolute path of the imported file, unless named with --checkpoint.
+    name = models.TextField()
+    batches = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'], name='unique_import_checkpoint_per_user'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}: {self.batches} batches'
@@ -0,0 +1,171 @@
+"""Pagination shared by the API viewsets."""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.conf import settings
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination, Cursor, _reverse_ordering
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """Opt-in keyset pagination over the user's rows ordered by `-id`.
+
+    Responses are only paginated when the client sends `cursor` or
+    `page_size`, so existing clients keep receiving a plain list. Pages are
+    fetched with `WHERE id < position ... LIMIT n`, without OFFSET or COUNT,
+    so every page costs the same as the first one.
+    """
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        page_size = parse_positive_int(params.get(self.page_size_query_param), settings.API_PAGE_SIZE)
+        return min(page_size, settings.API_MAX_PAGE_SIZE)
+
+    def decode_cursor(self, request):
+        cursor = super().decode_cursor(request)
+        if cursor is None:
+            return None
+
+        if cursor.position is not None and not cursor.position.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+
+        # `id` is unique, so a position always identifies a single row and
+        # an offset is never needed.
+        return Cursor(offset=0, reverse=cursor.reverse, position=cursor.position)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return _run_sync(self._paginate(queryset, request, view))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset()` fetching the page with the async ORM."""
+        return await _run_async(self._paginate(queryset, request, view))
+
+    def _paginate(self, queryset, request, view):
+        """`CursorPagination.paginate_queryset()` without offsets.
+
+        A generator yielding the queryset of the page, to be sent back
+        evaluated, so the sync and async paths share the logic.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, current_position = (False, None) if self.cursor is None else self.cursor[1:]
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f'{order.lstrip("-")}__{lookup}': current_position})
+
+        results = yield queryset[:self.page_size + 1]
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            following_position = None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.next_position = current_position is not None, current_position
+            self.has_previous, self.previous_position = following_position is not None, following_position
+        else:
+            self.has_next, self.next_position = following_position is not None, following_position
+            self.has_previous, self.previous_position = current_position is not None, current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+
+class RankedKeysetPagination(BasePagination):
+    """Forward-only keyset pagination over `(rank, id)` for ranked results.
+
+    The queryset must be annotated with `rank` and ordered by `-rank, -id`.
+    The next page continues after the last row with
+    `rank < r OR (rank = r AND id < i)`, so deep pages need no OFFSET.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = min(
+            parse_positive_int(request.query_params.get(self.page_size_query_param), settings.API_PAGE_SIZE),
+            settings.API_MAX_PAGE_SIZE
+        )
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is not None:
+            rank, last_id = self.decode_cursor(encoded)
+            queryset = queryset.filter(Q(rank__lt=rank) | Q(rank=rank, id__lt=last_id))
+
+        results = list(queryset[:page_size + 1])
+        self.page = results[:page_size]
+        self.has_next = len(results) > page_size
+
+        return self.page
+
+    def decode_cursor(self, encoded):
+        try:
+            rank, last_id = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            return float(rank), int(last_id)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item):
+        return urlsafe_b64encode(json.dumps([item.rank, item.id]).encode()).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+def parse_positive_int(value, default):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return default
+
+    return value if value > 0 else default
+
+
+def _run_sync(pagination):
+    try:
+        queryset = next(pagination)
+        pagination.send(list(queryset))
+    except StopIteration as stop:
+        return stop.value
+
+
+async def _run_async(pagination):
+    try:
+        queryset = next(pagination)
+        pagination.send([item async for item in queryset])
+    except StopIteration as stop:
+        return stop.value
@@ -0,0 +1,131 @@
+"""On-demand profiling of single requests, for staff users.
+
+A request sending `X-Profile: 1` or `?profile=1` by a staff user is run
+under `cProfile` and `tracemalloc` by `core.middleware.ProfilerMiddleware`,
+with its SQL queries recorded. The result is stored as a `RequestProfile`,
+browsable in the admin, and only the latest `PROFILER_MAX_PROFILES` are kept.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from rest_framework import exceptions
+
+from core import metrics
+from core.authentication import CachedTokenAuthentication
+from core.models import RequestProfile
+
+# One profiled request at a time per process: the peak memory of tracemalloc
+# is process-wide.
+_lock = threading.Lock()
+
+
+def is_requested(request):
+    # The query string is only parsed when it may hold the flag.
+    return request.META.get('HTTP_X_PROFILE') == '1' or (
+        'profile' in request.META.get('QUERY_STRING', '') and request.GET.get('profile') == '1'
+    )
+
+
+def get_staff_user(request):
+    """Return the staff user making the request, or None.
+
+    API requests are authenticated by token, the admin by session.
+    """
+    try:
+        result = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+
+    return _staff(result[0] if result is not None else request.user)
+
+
+async def aget_staff_user(request):
+    try:
+        result = await CachedTokenAuthentication().aauthenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+
+    if result is None:
+        # The session user is loaded lazily, with the sync ORM.
+        return await sync_to_async(_staff)(request.user)
+
+    return _staff(result[0])
+
+
+def _staff(user):
+    return user if user.is_active and user.is_staff else None
+
+
+class Profiler:
+    """CPU profile, SQL timeline and peak memory of one request."""
+
+    def __init__(self):
+        self.timeline = []
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        """Start profiling, or return False if another request is profiled."""
+        if not _lock.acquire(blocking=False):
+            return False
+
+        self._tracing = tracemalloc.is_tracing()
+        if not self._tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        self.usage, self._token = metrics.start_db_usage(self.timeline)
+        self.started = time.perf_counter()
+        self.profile.enable()
+        return True
+
+    def stop(self):
+        self.profile.disable()
+        self.duration = time.perf_counter() - self.started
+        metrics.stop_db_usage(self._token)
+
+        self.peak_memory = tracemalloc.get_traced_memory()[1]
+        if not self._tracing:
+            tracemalloc.stop()
+        _lock.release()
+
+    def cpu_profile(self):
+        """Functions with the highest cumulative time, as printed by pstats."""
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(settings.PROFILER_MAX_FUNCTIONS)
+        return stream.getvalue()
+
+    def sql_timeline(self):
+        return [
+            {'alias': alias, 'sql': sql, 'start': started - self.started, 'duration': seconds}
+            for alias, sql, started, seconds in self.timeline
+        ]
+
+    def save(self, request, response, user):
+        """Store the profile, dropping the oldest ones beyond the limit."""
+        profile = RequestProfile.objects.create(
+            user=user,
+            method=request.method,
+            path=request.get_full_path(),
+            status_code=response.status_code,
+            duration=self.duration,
+            query_count=self.usage[0],
+            db_time=self.usage[1],
+            peak_memory=self.peak_memory,
+            cpu_profile=self.cpu_profile(),
+            sql_timeline=self.sql_timeline(),
+        )
+
+        oldest_kept = RequestProfile.objects.order_by('-pk').values_list('pk', flat=True)[
+            settings.PROFILER_MAX_PROFILES - 1:settings.PROFILER_MAX_PROFILES
+        ]
+        RequestProfile.objects.filter(pk__lt=oldest_kept).delete()
+        return profile
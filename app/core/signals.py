@@ -0,0 +1,45 @@
+"""Signal handlers keeping caches in sync with the database."""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_tokens
+from core.cache import bump_data_version
+from core.models import UserProfile, Recipe, Ingredient
+
+# Saves that only touch these fields cannot change who may authenticate.
+AUTH_IRRELEVANT_FIELDS = {'last_login'}
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_user_tokens(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached tokens on any change that may affect authentication,
+    e.g. deactivation or a new password.
+
+    Not sent by `QuerySet.update()`, e.g. `UserProfile.objects.filter(...)
+    .update(is_active=False)`, whose callers must invalidate the tokens.
+    """
+    if created or (update_fields and set(update_fields) <= AUTH_IRRELEVANT_FIELDS):
+        return
+
+    invalidate_tokens(Token.objects.filter(user=instance).values_list('key', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_user_data_version(sender, instance, **kwargs):
+    bump_data_version(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def bump_user_data_version_on_m2m(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        bump_data_version(instance.user_id)
@@ -0,0 +1,139 @@
+"""Startup of the application: retries with backoff and warm-up.
+
+`app/wsgi.py` and `app/asgi.py` start the warm-up in a background thread.
+It runs the steps listed in `STARTUP_WARM_UP_STEPS`, and
+`core.middleware.HealthCheckMiddleware` reports the process as ready only
+once they have all succeeded.
+"""
+import random
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils.module_loading import import_string
+
+from core.authentication import get_token_cache
+from core.cache import get_response_cache
+from core.serializers import ValuesReader
+
+
+def backoff_delays(base, cap):
+    """Yield exponential backoff delays with full jitter."""
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(cap, base * 2 ** attempt))
+        attempt += 1
+
+
+def retry(func, exceptions, timeout, base=0.1, cap=5.0, on_retry=None):
+    """Call `func()` until it does not raise one of `exceptions`.
+
+    Waits between attempts according to `backoff_delays()`, and raises the
+    last exception once `timeout` seconds have passed. `on_retry(exc, delay)`
+    is called before each wait.
+    """
+    deadline = time.monotonic() + timeout
+
+    for delay in backoff_delays(base, cap):
+        try:
+            return func()
+        except exceptions as exc:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise
+
+            delay = min(delay, remaining)
+            if on_retry is not None:
+                on_retry(exc, delay)
+            time.sleep(delay)
+
+
+def open_connections():
+    """Open `STARTUP_WARM_UP_CONNECTIONS` pooled connections per database."""
+    for alias in connections:
+        wrappers = [connections.create_connection(alias) for _ in range(settings.STARTUP_WARM_UP_CONNECTIONS)]
+        try:
+            for wrapper in wrappers:
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+        finally:
+            for wrapper in wrappers:
+                wrapper.close()
+
+
+def _iter_views(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_views(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern.callback
+
+
+def populate_url_resolvers():
+    # Populated on first access.
+    get_resolver().reverse_dict
+
+
+def compile_serializers():
+    """Build the fields, and values() readers, of the API views' serializers."""
+    for view in _iter_views(get_resolver().url_patterns):
+        serializer_class = getattr(getattr(view, 'cls', None), 'serializer_class', None)
+        if serializer_class is not None:
+            serializer = serializer_class()
+            serializer.fields
+            ValuesReader.compile(serializer)
+
+
+def prime_caches():
+    """Connect to the caches and load the content types."""
+    get_token_cache().get('warm-up')
+    get_response_cache().get('warm-up')
+    ContentType.objects.get_for_models(*apps.get_models())
+
+
+class Readiness:
+    """State of the warm-up of this process."""
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error = None
+        self.durations = {}
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Run `warm_up()` in a background thread, once."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+
+        threading.Thread(target=self._run, name='warm-up', daemon=True).start()
+
+    def _run(self):
+        try:
+            self.warm_up()
+        finally:
+            # Return the connections of this thread to the pool.
+            connections.close_all()
+
+    def warm_up(self):
+        try:
+            for path in settings.STARTUP_WARM_UP_STEPS:
+                started = time.monotonic()
+                retry(import_string(path), Exception, settings.STARTUP_WARM_UP_TIMEOUT)
+                self.durations[path] = time.monotonic() - started
+        except Exception as exc:
+            self.error = f'{path}: {exc!r}'
+        else:
+            self.ready.set()
+
+    def is_ready(self):
+        return self.ready.is_set()
+
+
+readiness = Readiness()
@@ -0,0 +1,166 @@
+"""The async read path returns the same responses as the sync views."""
+import asyncio
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, override_settings
+from django.urls import include, path, resolve
+
+from rest_framework.authtoken.models import Token
+from rest_framework.routers import DefaultRouter
+from rest_framework.test import APIClient
+
+from core.cache import get_response_cache
+from core.models import Ingredient, Recipe
+from ingredient.views import IngredientApiViewset
+from recipe.views import RecipeViewSet
+from user.views import ManageUserView
+
+# URLs of the ASGI deployment, built with the async read path enabled.
+with override_settings(API_ASYNC_READS=True):
+    recipe_router = DefaultRouter()
+    recipe_router.register('recipes', RecipeViewSet)
+    ingredient_router = DefaultRouter()
+    ingredient_router.register('ingredients', IngredientApiViewset)
+
+    urlpatterns = [
+        path('api/recipe/', include(recipe_router.urls)),
+        path('api/ingredient/', include(ingredient_router.urls)),
+        path('api/user/me/', ManageUserView.as_view()),
+    ]
+
+RECIPES_URL = '/api/recipe/recipes/'
+INGREDIENTS_URL = '/api/ingredient/ingredients/'
+ME_URL = '/api/user/me/'
+
+
+def off_event_loop(method):
+    """Wrap a blocking cache method to fail when called from the event loop."""
+    def wrapper(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return method(*args, **kwargs)
+
+        raise AssertionError(f'{method.__name__}() blocked the event loop')
+
+    return wrapper
+
+
+@override_settings(ROOT_URLCONF='core.tests.test_async_views')
+class AsyncReadTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            name='user',
+            password='pass123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+
+        salt = Ingredient.objects.create(user=self.user, name='salt')
+        self.soup = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=10, price=Decimal('4.50'), description='Hot'
+        )
+        self.soup.ingredients.add(salt)
+        for index in range(3):
+            Recipe.objects.create(user=self.user, title=f'Toast {index}', time_minutes=5, price=Decimal('1'))
+
+    def _sync_get(self, url, params, headers):
+        get_response_cache().clear()
+        client = APIClient()
+        with override_settings(ROOT_URLCONF='app.urls'):
+            return client.get(url, params, headers=headers)
+
+    async def assertSameResponse(self, url, params=None, headers=None):
+        headers = self.headers if headers is None else headers
+        expected = await sync_to_async(self._sync_get)(url, params, headers)
+
+        await sync_to_async(get_response_cache().clear)()
+        res = await self.async_client.get(url, params or {}, headers=headers)
+
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(res.content, expected.content)
+        self.assertEqual(res['Content-Type'], expected['Content-Type'])
+        return res
+
+    def test_read_views_are_async(self):
+        for url in (RECIPES_URL, f'{RECIPES_URL}{self.soup.id}/', INGREDIENTS_URL, ME_URL):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+
+    async def test_recipe_list(self):
+        await self.assertSameResponse(RECIPES_URL)
+
+    async def test_recipe_list_filtered_and_sparse(self):
+        await self.assertSameResponse(RECIPES_URL, {'ingredients_all': 'salt', 'fields': 'id,title,ingredients'})
+
+    async def test_recipe_list_pages(self):
+        res = await self.assertSameResponse(RECIPES_URL, {'page_size': 2})
+        res = await self.assertSameResponse(res.json()['next'])
+        await self.assertSameResponse(res.json()['previous'])
+
+    async def test_recipe_retrieve(self):
+        await self.assertSameResponse(f'{RECIPES_URL}{self.soup.id}/')
+
+    async def test_recipe_retrieve_not_found(self):
+        for recipe_id in ('0', 'abc'):
+            await self.assertSameResponse(f'{RECIPES_URL}{recipe_id}/')
+
+    async def test_ingredient_list(self):
+        await self.assertSameResponse(INGREDIENTS_URL)
+
+    async def test_me(self):
+        await self.assertSameResponse(ME_URL)
+
+    async def test_msgpack(self):
+        await self.assertSameResponse(RECIPES_URL, headers={**self.headers, 'Accept': 'application/msgpack'})
+
+    async def test_unauthenticated(self):
+        for headers in ({}, {'Authorization': 'Token invalid'}, {'Authorization': 'Token'}):
+            res = await self.assertSameResponse(RECIPES_URL, headers=headers)
+            self.assertEqual(res.status_code, 401)
+
+    async def test_not_modified(self):
+        res = await self.async_client.get(RECIPES_URL, headers=self.headers)
+
+        res = await self.async_client.get(RECIPES_URL, headers={**self.headers, 'If-None-Match': res['ETag']})
+
+        self.assertEqual(res.status_code, 304)
+
+    # The token and data version caches default to the database cache, kept
+    # out of the count.
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS='default', DATA_VERSION_CACHE_ALIAS='default')
+    def test_served_from_cache(self):
+        get = async_to_sync(self.async_client.get)
+        get(RECIPES_URL, headers=self.headers)
+
+        with self.assertNumQueries(0):
+            res = get(RECIPES_URL, headers=self.headers)
+
+        self.assertEqual(len(res.json()), 4)
+
+    async def test_writes_use_sync_view(self):
+        payload = {'title': 'Stew', 'time_minutes': 30, 'price': '3.00'}
+
+        res = await self.async_client.post(RECIPES_URL, payload, content_type='application/json', headers=self.headers)
+
+        self.assertEqual(res.status_code, 201)
+        self.assertTrue(await Recipe.objects.filter(title='Stew').aexists())
+
+    @override_settings(TOKEN_AUTH_CACHE_ALIAS='default', DATABASE_REPLICAS=['replica0'])
+    @patch('core.mixins.use_replica')
+    async def test_caches_are_not_read_on_the_event_loop(self, mock_use_replica):
+        blocking = {name: off_event_loop(getattr(LocMemCache, name)) for name in ('get', 'set', 'add', 'get_many')}
+
+        with patch.multiple(LocMemCache, **blocking):
+            # Cache misses, then hits.
+            for _ in range(2):
+                for url in (RECIPES_URL, f'{RECIPES_URL}{self.soup.id}/', INGREDIENTS_URL, ME_URL):
+                    res = await self.async_client.get(url, headers=self.headers)
+                    self.assertEqual(res.status_code, 200, url)
+
+        self.assertTrue(mock_use_replica.called)
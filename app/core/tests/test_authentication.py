@@ -0,0 +1,153 @@
+"""Testing cached token authentication."""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import CACHE_KEY_PREFIX, CachedTokenAuthentication, get_token_cache
+from core.cache import LocalTTLCache
+
+from unittest.mock import patch
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class TokenQueries(CaptureQueriesContext):
+    """Capture the token/user lookups, leaving out those of the database cache."""
+
+    def __init__(self):
+        super().__init__(connection)
+
+    @property
+    def token_queries(self):
+        return [query for query in self.captured_queries if Token._meta.db_table in query['sql']]
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user(
+            email='user@example.com',
+            name='User Test',
+            password='test123'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_invalidation_reaches_other_workers(self):
+        # The cache as another worker process connects to it.
+        other = caches.create_connection(settings.TOKEN_AUTH_CACHE_ALIAS)
+        self.auth.authenticate_credentials(self.token.key)
+        self.assertIsNotNone(other.get(CACHE_KEY_PREFIX + self.token.key))
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertIsNone(other.get(CACHE_KEY_PREFIX + self.token.key))
+
+    def test_cache_hit_skips_database(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        with TokenQueries() as queries:
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(queries.token_queries, [])
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+        self.assertIs(token.user, user)
+
+    def test_cache_hit_returns_copies(self):
+        first, _ = self.auth.authenticate_credentials(self.token.key)
+        first.name = 'Changed'
+
+        second, _ = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(second.name, 'User Test')
+
+    def test_invalid_token(self):
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials('invalid')
+
+    def test_deleted_token_invalidated(self):
+        key = self.token.key
+        self.auth.authenticate_credentials(key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_deactivated_user_invalidated(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_entry_cached_before_commit_invalidated(self):
+        key = self.token.key
+        active_user, token = self.auth.authenticate_credentials(key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # A concurrent request, still reading the committed user.
+            get_token_cache().set(CACHE_KEY_PREFIX + key, (active_user, token))
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(key)
+
+    def test_password_change_invalidated(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        with TokenQueries() as queries:
+            user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(len(queries.token_queries), 1)
+        self.assertTrue(user.check_password('newpass123'))
+
+    def test_last_login_update_keeps_entry(self):
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.save(update_fields=['last_login'])
+
+        with TokenQueries() as queries:
+            self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(queries.token_queries, [])
+
+
+class LocalTTLCacheTest(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LocalTTLCache(max_entries=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(len(cache), 2)
+
+    @patch('core.cache.time.monotonic')
+    def test_entries_expire(self, mock_monotonic):
+        cache = LocalTTLCache(max_entries=10, ttl=60)
+        mock_monotonic.return_value = 100
+        cache.set('a', 1)
+
+        mock_monotonic.return_value = 159
+        self.assertEqual(cache.get('a'), 1)
+
+        mock_monotonic.return_value = 160
+        self.assertIsNone(cache.get('a'))
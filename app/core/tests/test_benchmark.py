@@ -0,0 +1,155 @@
+"""Testing the benchmark command."""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase
+
+from core.cache import get_data_version
+from core.management.commands.benchmark import EMAIL_DOMAIN, ingredient_name, skewed_counts
+from core.models import Ingredient, Recipe
+
+LINKS = Recipe.ingredients.through
+
+
+class DatasetTest(SimpleTestCase):
+    def test_skewed_counts(self):
+        counts = skewed_counts(1000, 10, 1.1)
+
+        self.assertEqual(sum(counts), 1000)
+        self.assertEqual(counts, sorted(counts, reverse=True))
+        self.assertGreater(counts[0], 10 * counts[-1] / 2)
+
+    def test_ingredient_names_are_distinct(self):
+        names = [ingredient_name(index) for index in range(5000)]
+
+        self.assertEqual(len(set(names)), len(names))
+
+
+class GenerateTest(TestCase):
+    def generate(self, **options):
+        call_command('benchmark', 'generate', stdout=StringIO(), **options)
+
+    def test_generate(self):
+        self.generate(users=10, recipes=300, ingredients=50, max_links=4, batch_size=100)
+
+        users = get_user_model().objects.filter(email__endswith=EMAIL_DOMAIN)
+        self.assertEqual(users.count(), 10)
+        self.assertEqual(Recipe.objects.filter(user__in=users).count(), 300)
+        self.assertEqual(Ingredient.objects.filter(user__in=users).count(), 50)
+
+        recipes_per_user = sorted((user.recipe_set.count() for user in users), reverse=True)
+        self.assertEqual(recipes_per_user, skewed_counts(300, 10, 1.1))
+
+        links = LINKS.objects.select_related('recipe', 'ingredient')
+        self.assertTrue(links.exists())
+        self.assertTrue(all(link.recipe.user_id == link.ingredient.user_id for link in links))
+        self.assertLessEqual(max(recipe.ingredients.count() for recipe in Recipe.objects.all()), 4)
+
+    def test_search_vector_includes_ingredients(self):
+        self.generate(users=2, recipes=20, ingredients=10)
+
+        link = LINKS.objects.select_related('ingredient').first()
+
+        self.assertTrue(Recipe.objects.filter(pk=link.recipe_id, search_vector=link.ingredient.name).exists())
+
+    def test_existing_dataset_is_kept_unless_replaced(self):
+        self.generate(users=2, recipes=10, ingredients=4)
+
+        with self.assertRaises(CommandError):
+            self.generate(users=3, recipes=10, ingredients=4)
+
+        user = get_user_model().objects.get(email=f'user-0{EMAIL_DOMAIN}')
+        version = get_data_version(user.pk)
+        self.generate(users=3, recipes=10, ingredients=4, replace=True)
+
+        self.assertEqual(get_user_model().objects.filter(email__endswith=EMAIL_DOMAIN).count(), 3)
+        self.assertEqual((Recipe.objects.count(), Ingredient.objects.count()), (10, 4))
+        self.assertFalse(LINKS.objects.exclude(recipe__user_id=F('ingredient__user_id')).exists())
+        self.assertNotEqual(get_data_version(user.pk), version)
+
+
+class RunTest(TestCase):
+    def setUp(self):
+        self.output = os.path.join(tempfile.mkdtemp(), 'benchmark.json')
+
+    def tearDown(self):
+        if os.path.exists(self.output):
+            os.remove(self.output)
+
+    def test_requires_dataset(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'run', output=self.output)
+
+    def test_run(self):
+        call_command('benchmark', 'generate', users=3, recipes=30, ingredients=15, stdout=StringIO())
+        counts = Recipe.objects.count(), Ingredient.objects.count(), get_user_model().objects.count()
+
+        call_command('benchmark', 'run', output=self.output, requests=2, warmup=1, stdout=StringIO())
+
+        with open(self.output) as file:
+            report = json.load(file)
+        self.assertEqual(report['uncovered'], [])
+        self.assertEqual(report['meta']['dataset'], {'users': 3, 'recipes': 30, 'ingredients': 15})
+        for name, result in report['endpoints'].items():
+            self.assertEqual(sum(result['statuses'].values()), 2, name)
+            self.assertTrue(all(int(status) < 400 for status in result['statuses']), name)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertGreater(report['endpoints']['recipe-list GET']['queries_max'], 0)
+        self.assertIn('user:token POST', report['endpoints'])
+        # Writes are rolled back.
+        self.assertEqual((Recipe.objects.count(), Ingredient.objects.count(), get_user_model().objects.count()),
+                         counts)
+
+    def test_only_some_endpoints(self):
+        call_command('benchmark', 'generate', users=2, recipes=10, ingredients=4, stdout=StringIO())
+
+        call_command('benchmark', 'run', output=self.output, requests=1, endpoints=['recipe-list GET'],
+                     stdout=StringIO())
+
+        with open(self.output) as file:
+            self.assertEqual(list(json.load(file)['endpoints']), ['recipe-list GET'])
+
+    def test_response_cache_is_cleared_unless_warm(self):
+        call_command('benchmark', 'generate', users=1, recipes=10, ingredients=4, stdout=StringIO())
+        queries = {}
+
+        for warm_cache in (False, True):
+            call_command('benchmark', 'run', output=self.output, requests=3, users=1, endpoints=['recipe-list GET'],
+                         warm_cache=warm_cache, stdout=StringIO())
+            with open(self.output) as file:
+                queries[warm_cache] = json.load(file)['endpoints']['recipe-list GET']['queries_max']
+
+        self.assertGreater(queries[False], queries[True])
+
+
+class CompareTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def write(self, name, p95_ms):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as file:
+            json.dump({'endpoints': {'recipe-list GET': {
+                'p50_ms': 1.0, 'p95_ms': p95_ms, 'p99_ms': 3.0, 'queries_mean': 2.0,
+            }}}, file)
+        return path
+
+    def test_compare(self):
+        out = StringIO()
+
+        call_command('benchmark', 'compare', self.write('base.json', 2.0), self.write('head.json', 2.1), stdout=out)
+
+        self.assertIn('p95     2.00 ->     2.10 ms (+5%)', out.getvalue())
+
+    def test_fail_on_regression(self):
+        with self.assertRaisesMessage(CommandError, 'recipe-list GET'):
+            call_command(
+                'benchmark', 'compare', self.write('base.json', 2.0), self.write('head.json', 3.0),
+                fail_on_regression=True, stdout=StringIO()
+            )
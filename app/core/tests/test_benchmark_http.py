@@ -0,0 +1,38 @@
+"""Testing the `benchmark http` subcommand."""
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase
+
+from rest_framework.authtoken.models import Token
+
+from io import StringIO
+
+
+class BenchmarkHttpTest(LiveServerTestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(email='user@example.com', name='user', password='pass123')
+        self.token = Token.objects.create(user=user)
+
+    def test_reports_requests_and_status_codes(self):
+        out = StringIO()
+
+        call_command(
+            'benchmark', 'http', f'{self.live_server_url}/api/user/me/',
+            token=self.token.key, connections=2, requests=10, stdout=out
+        )
+
+        summary, statuses = out.getvalue().splitlines()
+        self.assertTrue(summary.startswith('10 requests over 2 connections'))
+        self.assertEqual(statuses, 'status codes: 200: 10')
+
+    def test_unauthenticated_requests_are_counted(self):
+        out = StringIO()
+
+        call_command('benchmark', 'http', f'{self.live_server_url}/api/user/me/', requests=3, stdout=out)
+
+        self.assertIn('status codes: 401: 3', out.getvalue())
+
+    def test_https_is_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'http', 'https://example.com/')
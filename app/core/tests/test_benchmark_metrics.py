@@ -0,0 +1,19 @@
+"""Testing the `benchmark metrics` subcommand."""
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.metrics import request_metrics
+
+from io import StringIO
+
+
+class BenchmarkMetricsTest(SimpleTestCase):
+    def test_reports_overhead(self):
+        out = StringIO()
+        before = request_metrics.render()
+
+        call_command('benchmark', 'metrics', requests=10, queries=2, stdout=out)
+
+        self.assertTrue(out.getvalue().startswith('2 queries per request: '))
+        self.assertIn('overhead', out.getvalue())
+        self.assertEqual(request_metrics.render(), before)
@@ -0,0 +1,16 @@
+"""Testing the `benchmark renderers` subcommand."""
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from io import StringIO
+
+
+class BenchmarkRenderersTest(SimpleTestCase):
+    def test_reports_every_codec(self):
+        out = StringIO()
+
+        call_command('benchmark', 'renderers', rows=[10], repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual([line.split(':')[0] for line in lines], ['10 rows json', '10 rows orjson', '10 rows msgpack'])
+        self.assertTrue(all(line.endswith('round trip ok: True') for line in lines))
@@ -0,0 +1,21 @@
+"""Testing the `benchmark serializers` subcommand."""
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core.models import Recipe
+
+from io import StringIO
+
+
+class BenchmarkSerializersTest(TestCase):
+    def test_reports_identical_output_and_rolls_back(self):
+        out = StringIO()
+
+        call_command('benchmark', 'serializers', rows=[3, 5], repeat=1, stdout=out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(all(line.endswith('identical output: True') for line in lines))
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(Recipe.objects.exists())
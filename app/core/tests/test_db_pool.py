@@ -0,0 +1,196 @@
+"""Testing the database connection pool."""
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from drf_spectacular.generators import SchemaGenerator
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db.pool import ConnectionPool, PoolTimeout, pool_stats
+
+DB_POOL_URL = reverse('db-pool-stats')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+def create_pool(**params):
+    return ConnectionPool(FakeConnection, **{'max_size': 2, 'timeout': 0.05, **params})
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    def test_released_connection_is_reused(self):
+        pool = create_pool()
+        connection = pool.acquire()
+
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['created'], 1)
+
+    def test_stats(self):
+        pool = create_pool()
+        connection = pool.acquire()
+        pool.release(pool.acquire())
+
+        stats = pool.stats()
+
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 1)
+        pool.release(connection)
+
+    def test_acquire_times_out_when_exhausted(self):
+        pool = create_pool()
+        pool.acquire(), pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_acquire_waits_for_release(self):
+        pool = create_pool(max_size=1, timeout=5)
+        connection = pool.acquire()
+        threading.Timer(0.05, pool.release, [connection]).start()
+
+        self.assertIs(pool.acquire(), connection)
+
+        stats = pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertGreater(stats['wait_time'], 0)
+
+    def test_release_rolls_back_open_transaction(self):
+        pool = create_pool()
+        connection = pool.acquire()
+        connection.autocommit = False
+
+        pool.release(connection)
+
+        self.assertEqual(connection.rollbacks, 1)
+
+    def test_closed_connection_is_replaced(self):
+        pool = create_pool()
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.close()
+
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertEqual(pool.stats()['discarded'], 1)
+
+    def test_idle_connection_is_checked(self):
+        pool = create_pool(check_after=0, is_usable=lambda connection: False)
+        connection = pool.acquire()
+        pool.release(connection)
+        time.sleep(0.001)
+
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool(lambda: 1 / 0, max_size=1, timeout=0.05)
+
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                pool.acquire()
+
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_closed_pool_discards_released_connections(self):
+        pool = create_pool()
+        connection = pool.acquire()
+        pool.close()
+
+        pool.release(connection)
+
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+
+class PooledBackendTest(TestCase):
+    def setUp(self):
+        self.wrapper = connections.create_connection('default')
+
+    def tearDown(self):
+        self.wrapper.close()
+
+    def test_closed_connection_returns_to_pool(self):
+        self.wrapper.ensure_connection()
+        connection = self.wrapper.connection
+        self.wrapper.close()
+
+        self.wrapper.ensure_connection()
+
+        self.assertIs(self.wrapper.connection, connection)
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_exhausted_pool_raises_operational_error(self):
+        self.wrapper.settings_dict = {
+            **self.wrapper.settings_dict, 'POOL': {'MAX_SIZE': 1, 'TIMEOUT': 0.05}
+        }
+        other = connections.create_connection('default')
+        other.settings_dict = self.wrapper.settings_dict
+        self.wrapper.ensure_connection()
+
+        try:
+            with self.assertRaises(OperationalError):
+                other.ensure_connection()
+        finally:
+            other.close()
+
+    def test_pooling_disabled(self):
+        self.wrapper.settings_dict = {**self.wrapper.settings_dict, 'POOL': {'MAX_SIZE': 0}}
+        self.wrapper.ensure_connection()
+        connection = self.wrapper.connection
+        self.wrapper.close()
+
+        self.assertTrue(connection.closed)
+
+
+@override_settings(ROOT_URLCONF='app.urls')
+class DatabasePoolStatsApiTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_admin_sees_stats(self):
+        admin = get_user_model().objects.create_superuser('admin@example.com', 'admin', 'pass123')
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(DB_POOL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, pool_stats())
+        self.assertIn('default', res.data)
+
+    def test_regular_user_forbidden(self):
+        user = get_user_model().objects.create_user(email='user@example.com', name='user', password='pass123')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_POOL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_schema_describes_stats(self):
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        response = schema['paths'][DB_POOL_URL]['get']['responses']['200']['content']['application/json']
+        self.assertEqual(set(response['schema']['additionalProperties']['properties']), set(create_pool().stats()))
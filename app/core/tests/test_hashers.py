@@ -0,0 +1,111 @@
+"""Testing the configurable password hashers and their rehash on login."""
+import re
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashers import classify, password_hash_stats
+from core.tests.test_metrics import sample
+
+TOKEN_URL = reverse('user:token')
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class HashersTest(SimpleTestCase):
+    def test_work_factor_is_read_from_settings(self):
+        self.assertTrue(make_password('pass123').startswith('pbkdf2_sha256$1000$'))
+
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(get_hasher('default').iterations, 2000)
+
+    def test_classify(self):
+        encoded = make_password('pass123')
+
+        self.assertEqual(classify(encoded), ('pbkdf2_sha256', 'current'))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertEqual(classify(encoded), ('pbkdf2_sha256', 'legacy'))
+        self.assertEqual(classify(make_password('pass123', hasher='pbkdf2_sha1')), ('pbkdf2_sha1', 'legacy'))
+        self.assertEqual(classify('md5$salt$hash'), ('unknown', 'legacy'))
+
+    @override_settings(PASSWORD_HASHER='scrypt', PASSWORD_HASHERS=[
+        'core.hashers.ScryptPasswordHasher', 'core.hashers.PBKDF2PasswordHasher',
+    ])
+    def test_other_algorithm_is_legacy(self):
+        self.assertEqual(classify(make_password('pass123', hasher='pbkdf2_sha256')), ('pbkdf2_sha256', 'legacy'))
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000, THROTTLE_RATES={})
+class RehashOnLoginTest(TestCase):
+    def setUp(self):
+        password_hash_stats.clear()
+        self.user = get_user_model().objects.create_user(email='user@example.com', name='user', password='pass123')
+        self.client = APIClient()
+
+    def login(self, password='pass123'):
+        return self.client.post(TOKEN_URL, {'email': 'user@example.com', 'password': password})
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=2000)
+    def test_legacy_hash_is_rehashed(self):
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+        self.assertEqual(self.login().status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=2000)
+    def test_failed_login_keeps_hash(self):
+        encoded = self.user.password
+
+        self.assertEqual(self.login(password='wrong').status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.password, encoded)
+
+    def test_metrics(self):
+        get_user_model().objects.create_user(email='other@example.com', name='other', password=None)
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            get_user_model().objects.create_user(email='new@example.com', name='new', password='pass123')
+            get_user_model().objects.create_user(email='new2@example.com', name='new2', password='pass123')
+
+            text = self.client.get('/metrics').content.decode()
+
+        self.assertEqual(sample(text, 'password_hashes', algorithm='pbkdf2_sha256', state='current'), 2)
+        self.assertEqual(sample(text, 'password_hashes', algorithm='pbkdf2_sha256', state='legacy'), 1)
+        self.assertIn(f'password_hashes_legacy_ratio {1 / 3}\n', text)
+
+    def test_metrics_are_cached(self):
+        self.client.get('/metrics')
+        get_user_model().objects.create_user(email='new@example.com', name='new', password='pass123')
+
+        with self.assertNumQueries(0):
+            text = self.client.get('/metrics').content.decode()
+
+        self.assertEqual(sample(text, 'password_hashes', algorithm='pbkdf2_sha256', state='current'), 1)
+
+
+class CalibrateHashersTest(SimpleTestCase):
+    def test_calibrate(self):
+        out = StringIO()
+
+        call_command('calibrate_hashers', target_ms=1, hashers=['pbkdf2_sha256'], repeat=1, stdout=out)
+
+        # The target is below the security floor.
+        self.assertIn('PASSWORD_PBKDF2_ITERATIONS=600000', out.getvalue())
+        self.assertIn('PASSWORD_HASHER=pbkdf2_sha256', out.getvalue())
+
+    def test_calibrate_below_minimum(self):
+        out = StringIO()
+
+        call_command('calibrate_hashers', target_ms=1, hashers=['pbkdf2_sha256'], repeat=1, below_minimum=True,
+                     stdout=out)
+
+        iterations = int(re.search(r'^PASSWORD_PBKDF2_ITERATIONS=(\d+)$', out.getvalue(), re.M).group(1))
+        self.assertLess(iterations, 600000)
+        self.assertIn('below the minimum work factor', out.getvalue())
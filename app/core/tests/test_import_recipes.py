@@ -0,0 +1,202 @@
+"""Testing the import_recipes command."""
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from core.models import ImportCheckpoint, Ingredient, Recipe
+
+from io import StringIO
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class ImportRecipesTest(TestCase):
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            name='User Test',
+            password='test123'
+        )
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as file:
+            file.write(content)
+        return path
+
+    def _write_ndjson(self, recipes):
+        return self._write('recipes.ndjson', ''.join(json.dumps(recipe) + '\n' for recipe in recipes))
+
+    def _import(self, path, **options):
+        out = StringIO()
+        call_command('import_recipes', path, user=self.user.email, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_ndjson(self):
+        Ingredient.objects.create(user=self.user, name='cheese')
+        path = self._write_ndjson([
+            {'title': 'Pizza', 'time_minutes': 15, 'price': '5.75', 'ingredients': ['cheese', 'tomato']},
+            {'title': 'Toast', 'time_minutes': 5, 'price': 1.5, 'description': 'Crispy',
+             'ingredients': [{'name': 'bread'}, {'name': 'cheese'}, {'name': 'cheese'}]},
+        ])
+
+        out = self._import(path)
+
+        self.assertIn('Imported 2 recipes', out)
+        pizza = Recipe.objects.get(user=self.user, title='Pizza')
+        self.assertEqual(sorted(pizza.ingredients.values_list('name', flat=True)), ['cheese', 'tomato'])
+        toast = Recipe.objects.get(user=self.user, title='Toast')
+        self.assertEqual(toast.description, 'Crispy')
+        self.assertEqual(str(toast.price), '1.50')
+        self.assertEqual(sorted(toast.ingredients.values_list('name', flat=True)), ['bread', 'cheese'])
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 3)
+
+    def test_import_csv(self):
+        path = self._write(
+            'recipes.csv',
+            'id,title,time_minutes,price,description,ingredients\n'
+            '1,"Pizza, large",15,5.75,,cheese;tomato\n'
+        )
+
+        self._import(path)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.title, 'Pizza, large')
+        self.assertEqual(recipe.ingredients.count(), 2)
+
+    def test_import_in_batches_writes_checkpoint(self):
+        path = self._write_ndjson([
+            {'title': f'Recipe {index}', 'time_minutes': 1, 'price': '1.00'} for index in range(5)
+        ])
+
+        out = self._import(path, batch_size=2)
+
+        self.assertIn('Batch 3: 1 recipes', out)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        self.assertEqual(ImportCheckpoint.objects.get(user=self.user, name=path).batches, 3)
+
+    def test_resume_from_checkpoint(self):
+        path = self._write_ndjson([
+            {'title': f'Recipe {index}', 'time_minutes': 1, 'price': '1.00'} for index in range(5)
+        ])
+        ImportCheckpoint.objects.create(user=self.user, name=path, batches=1)
+
+        self._import(path, batch_size=2)
+
+        titles = sorted(Recipe.objects.filter(user=self.user).values_list('title', flat=True))
+        self.assertEqual(titles, ['Recipe 2', 'Recipe 3', 'Recipe 4'])
+
+    def test_restart(self):
+        path = self._write_ndjson([{'title': 'Pizza', 'time_minutes': 15, 'price': '5.75'}])
+        ImportCheckpoint.objects.create(user=self.user, name=path, batches=1)
+
+        self._import(path, restart=True)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_import_again_updates(self):
+        recipes = [
+            {'title': 'Pizza', 'time_minutes': 15, 'price': '5.75', 'ingredients': ['cheese']},
+            {'title': 'Pizza', 'time_minutes': 15, 'price': '5.75', 'ingredients': ['cheese']},
+            {'id': 7, 'title': 'Toast', 'time_minutes': 5, 'price': '1.50', 'ingredients': ['bread']},
+        ]
+        path = self._write_ndjson(recipes)
+        self._import(path)
+
+        # The same records from another file, and with --restart.
+        recipes[2].update(title='Cheese toast', ingredients=['bread', 'cheese'])
+        for _ in range(2):
+            self._import(self._write('copy.ndjson', ''.join(json.dumps(recipe) + '\n' for recipe in recipes)),
+                         restart=True)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+        toast = Recipe.objects.get(user=self.user, import_key='id:7')
+        self.assertEqual(toast.title, 'Cheese toast')
+        self.assertEqual(sorted(toast.ingredients.values_list('name', flat=True)), ['bread', 'cheese'])
+        self.assertTrue(Recipe.objects.filter(pk=toast.pk, search_vector='cheese').exists())
+
+    def test_checkpoint_is_committed_with_its_batch(self):
+        path = self._write_ndjson([
+            {'title': f'Recipe {index}', 'time_minutes': 1, 'price': '1.00'} for index in range(3)
+        ])
+
+        update_or_create = ImportCheckpoint.objects.update_or_create
+
+        def crash_at_second_batch(**kwargs):
+            # After the rows of the batch were inserted.
+            if kwargs['defaults']['batches'] == 2:
+                raise KeyboardInterrupt
+            return update_or_create(**kwargs)
+
+        with patch.object(ImportCheckpoint.objects, 'update_or_create', side_effect=crash_at_second_batch):
+            with self.assertRaises(KeyboardInterrupt):
+                self._import(path, batch_size=1)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+        self._import(path, batch_size=1)
+
+        titles = sorted(Recipe.objects.filter(user=self.user).values_list('title', flat=True))
+        self.assertEqual(titles, ['Recipe 0', 'Recipe 1', 'Recipe 2'])
+
+    def test_out_of_range_values_name_the_batch(self):
+        for recipe in ({'title': 'x' * 256, 'time_minutes': 1, 'price': '1.00'},
+                       {'title': 'Caviar', 'time_minutes': 1, 'price': '1000.00'}):
+            path = self._write_ndjson([{'title': 'Pizza', 'time_minutes': 15, 'price': '5.75'}, recipe])
+
+            with self.assertRaisesMessage(CommandError, 'Batch 2: '):
+                self._import(path, batch_size=1, restart=True)
+
+            self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+            Recipe.objects.all().delete()
+
+    def test_invalid_record_stops_at_batch(self):
+        path = self._write_ndjson([
+            {'title': 'Pizza', 'time_minutes': 15, 'price': '5.75'},
+            {'title': 'Toast', 'price': '1.00'},
+        ])
+
+        with self.assertRaises(CommandError):
+            self._import(path, batch_size=1)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(ImportCheckpoint.objects.get(user=self.user, name=path).batches, 1)
+
+    def test_missing_ingredient_name_names_the_batch(self):
+        path = self._write_ndjson([
+            {'title': 'Pizza', 'time_minutes': 15, 'price': '5.75'},
+            {'title': 'Toast', 'time_minutes': 5, 'price': '1.00', 'ingredients': [{'amount': 1}]},
+        ])
+
+        with self.assertRaisesMessage(CommandError, 'Batch 2: invalid recipe'):
+            self._import(path, batch_size=1)
+
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_short_csv_row(self):
+        path = self._write(
+            'recipes.csv',
+            'title,time_minutes,price,description,ingredients\n'
+            'Pizza,15,5.75\n'
+            'Toast,5\n'
+        )
+
+        with self.assertRaisesMessage(CommandError, 'Batch 2: invalid recipe'):
+            self._import(path, batch_size=1)
+
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.ingredients.count(), 0)
+
+    def test_unknown_user(self):
+        path = self._write_ndjson([])
+
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, user='missing@example.com', stdout=StringIO())
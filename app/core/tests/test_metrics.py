@@ -0,0 +1,129 @@
+"""Testing the per-route request metrics."""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.metrics import LATENCY_BUCKETS, RequestMetrics, request_metrics
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample(text, name, **labels):
+    """Return the value of the sample with exactly these labels, or None."""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = f'{name}{{{label_text}}} '
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+
+    return None
+
+
+class RequestMetricsTest(SimpleTestCase):
+    def test_histogram_is_cumulative(self):
+        metrics = RequestMetrics()
+        metrics.observe('recipe-list', 'GET', 200, 0.003, 2, 0.001)
+        metrics.observe('recipe-list', 'GET', 200, 0.02, 3, 0.002)
+        metrics.observe('recipe-list', 'GET', 500, 60, 0, 0)
+
+        text = metrics.render()
+
+        labels = {'route': 'recipe-list', 'method': 'GET'}
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', **labels, le='0.005'), 1)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', **labels, le='0.025'), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', **labels, le=LATENCY_BUCKETS[-1]), 2)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_bucket', **labels, le='+Inf'), 3)
+        self.assertEqual(sample(text, 'http_request_duration_seconds_count', **labels), 3)
+        self.assertAlmostEqual(sample(text, 'http_request_duration_seconds_sum', **labels), 60.023)
+        self.assertEqual(sample(text, 'http_requests_total', **labels, status=200), 2)
+        self.assertEqual(sample(text, 'http_requests_total', **labels, status=500), 1)
+        self.assertEqual(sample(text, 'http_request_db_queries_total', **labels), 5)
+        self.assertAlmostEqual(sample(text, 'http_request_db_seconds_total', **labels), 0.003)
+
+    def test_label_values_are_escaped(self):
+        metrics = RequestMetrics()
+        metrics.observe('a"b\\c\nd', 'GET', 200, 0.1, 0, 0)
+
+        self.assertIn('route="a\\"b\\\\c\\nd"', metrics.render())
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        request_metrics.clear()
+        self.user = get_user_model().objects.create_user(email='user@example.com', name='user', password='pass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_metrics(self):
+        res = self.client.get('/metrics')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        return res.content.decode()
+
+    def test_refused_to_other_clients(self):
+        res = APIClient().get('/metrics', REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(res.status_code, 403)
+        self.assertNotIn(b'http_requests_total', res.content)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/8'], METRICS_TOKEN='secret')
+    def test_allowed_networks_and_token(self):
+        client = APIClient()
+
+        self.assertEqual(client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+        self.assertEqual(client.get('/metrics').status_code, 403)
+        self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.assertEqual(client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    def test_routes_are_labelled(self):
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=10, price='4.50')
+        self.client.get(RECIPES_URL)
+        self.client.get(reverse('recipe:recipe-detail', args=[recipe.id]))
+        self.client.get(reverse('ingredient:ingredient-list'))
+        self.client.post(reverse('user:token'), {})
+        self.client.get('/no-such-page/')
+
+        text = self.get_metrics()
+
+        for route, method, status in [
+            ('recipe-list', 'GET', 200),
+            ('recipe-detail', 'GET', 200),
+            ('ingredient-list', 'GET', 200),
+            ('user:token', 'POST', 400),
+            ('unmatched', 'GET', 404),
+        ]:
+            self.assertEqual(sample(text, 'http_requests_total', route=route, method=method, status=status), 1, route)
+        self.assertNotIn('/metrics', text)
+
+    def test_counts_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPES_URL)
+        query_count = len(queries)
+
+        text = self.get_metrics()
+
+        labels = {'route': 'recipe-list', 'method': 'GET'}
+        self.assertEqual(sample(text, 'http_request_db_queries_total', **labels), query_count)
+        self.assertGreater(sample(text, 'http_request_db_seconds_total', **labels), 0)
+
+    def test_pool_metrics(self):
+        self.client.get(RECIPES_URL)
+
+        text = self.get_metrics()
+
+        self.assertIsNotNone(sample(text, 'db_pool_connections', alias='default', state='in_use'))
+        self.assertIsNotNone(sample(text, 'db_pool_max_size', alias='default'))
+
+    @override_settings(ROOT_URLCONF='core.tests.test_async_views')
+    async def test_async_requests_are_recorded(self):
+        await self.async_client.get('/api/recipe/recipes/', headers={'Authorization': 'Token invalid'})
+
+        res = await self.async_client.get('/metrics')
+
+        text = res.content.decode()
+        self.assertEqual(sample(text, 'http_requests_total', route='recipe-list', method='GET', status=401), 1)
@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.test import TestCase
 
 from core.models import UserProfile, Ingredient, Recipe
@@ -101,6 +102,22 @@ class IngredientsModelTest(TestCase):
         self.assertEqual(str(ingredient), ingredient_details['name'])
         self.assertEqual(ingredient.user, self.user)
 
+    def test_get_or_create_many(self):
+        existing = create_ingriedient(name='salt', user=self.user)
+
+        ingredients = Ingredient.objects.get_or_create_many(self.user, ['salt', 'pepper', 'salt'])
+
+        self.assertEqual(list(ingredients), ['salt', 'pepper'])
+        self.assertEqual(ingredients['salt'], existing)
+        self.assertEqual(ingredients['pepper'].user, self.user)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_ingredient_name_unique_per_user(self):
+        create_ingriedient(name='salt', user=self.user)
+
+        with self.assertRaises(IntegrityError):
+            create_ingriedient(name='salt', user=self.user)
+
 
 class RecipeModelTest(TestCase):
     def setUp(self) -> None:
@@ -0,0 +1,155 @@
+"""Testing the on-demand request profiler."""
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.cache import get_response_cache
+from core.metrics import start_db_usage, stop_db_usage
+from core.models import Recipe, RequestProfile
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class ProfilerMiddlewareTest(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.staff = create_user(email='staff@example.com', name='staff', password='pass123')
+        self.staff.is_staff = True
+        self.staff.save()
+        self.user = create_user(email='user@example.com', name='user', password='pass123')
+        Recipe.objects.create(user=self.staff, title='Soup', time_minutes=10, price='4.50')
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.staff).key}')
+
+    def test_profile_with_header(self):
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        profile = RequestProfile.objects.get()
+        self.assertEqual(res['X-Profile-Id'], str(profile.pk))
+        self.assertEqual(profile.user, self.staff)
+        self.assertEqual((profile.method, profile.path, profile.status_code), ('GET', RECIPES_URL, 200))
+        self.assertGreater(profile.duration, 0)
+        self.assertGreater(profile.peak_memory, 0)
+        self.assertIn('function calls', profile.cpu_profile)
+        self.assertEqual(profile.query_count, len(profile.sql_timeline))
+        self.assertTrue(any('core_recipe' in query['sql'] for query in profile.sql_timeline))
+        self.assertTrue(all(query['alias'] == 'default' for query in profile.sql_timeline))
+
+    def test_profile_with_query_flag(self):
+        res = self.client.get(RECIPES_URL, {'profile': '1'})
+
+        self.assertIn('X-Profile-Id', res)
+        self.assertEqual(RequestProfile.objects.get().path, f'{RECIPES_URL}?profile=1')
+
+    def test_not_profiled_without_flag(self):
+        res = self.client.get(RECIPES_URL, {'profiled': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_flag_ignored_for_non_staff(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_flag_ignored_for_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_staff_session(self):
+        client = Client()
+        client.force_login(self.staff)
+
+        res = client.get(reverse('admin:index'), HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(RequestProfile.objects.get().path, reverse('admin:index'))
+
+    def test_single_profile_at_a_time(self):
+        profiling._lock.acquire()
+        try:
+            res = self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+        finally:
+            profiling._lock.release()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', res)
+
+    @override_settings(PROFILER_MAX_PROFILES=2)
+    def test_keeps_latest_profiles(self):
+        ids = [int(self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')['X-Profile-Id']) for _ in range(3)]
+
+        self.assertEqual(list(RequestProfile.objects.values_list('pk', flat=True)), ids[:0:-1])
+
+    def test_queries_still_counted_by_metrics(self):
+        usage, token = start_db_usage()
+        try:
+            self.client.get(RECIPES_URL, HTTP_X_PROFILE='1')
+        finally:
+            stop_db_usage(token)
+
+        # Plus the queries storing the profile.
+        self.assertGreater(usage[0], RequestProfile.objects.get().query_count)
+
+    @override_settings(ROOT_URLCONF='core.tests.test_async_views')
+    async def test_async_request(self):
+        token = await Token.objects.acreate(user=self.user, key='b' * 40)
+        await get_user_model().objects.filter(pk=self.user.pk).aupdate(is_staff=True)
+
+        res = await self.async_client.get(
+            '/api/recipe/recipes/', headers={'Authorization': f'Token {token.key}', 'X-Profile': '1'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        profile = await RequestProfile.objects.aget(pk=res['X-Profile-Id'])
+        self.assertEqual(profile.user_id, self.user.pk)
+        self.assertTrue(any('core_recipe' in query['sql'] for query in profile.sql_timeline))
+
+
+class RequestProfileAdminTest(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_superuser('admin@example.com', 'admin', 'pass123')
+        self.client = Client()
+        self.client.force_login(admin)
+        self.profile = RequestProfile.objects.create(
+            user=admin, method='GET', path=RECIPES_URL, status_code=200, duration=0.25, query_count=1,
+            db_time=0.01, peak_memory=4096, cpu_profile='10 function calls <in 0.2 seconds>',
+            sql_timeline=[{'alias': 'default', 'sql': 'SELECT "core_recipe"."id"', 'start': 0.1, 'duration': 0.01}],
+        )
+
+    def test_profile_list(self):
+        res = self.client.get(reverse('admin:core_requestprofile_changelist'))
+
+        self.assertContains(res, RECIPES_URL)
+        self.assertContains(res, '250.0')
+
+    def test_profile_detail(self):
+        res = self.client.get(reverse('admin:core_requestprofile_change', args=[self.profile.pk]))
+
+        self.assertContains(res, '10 function calls &lt;in 0.2 seconds&gt;')
+        self.assertContains(res, '+100.0 ms  10.0 ms  default  SELECT &quot;core_recipe&quot;.&quot;id&quot;')
+
+    def test_profiles_cannot_be_added(self):
+        res = self.client.get(reverse('admin:core_requestprofile_add'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
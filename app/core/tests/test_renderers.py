@@ -0,0 +1,71 @@
+"""Testing the JSON and MessagePack renderers and parsers."""
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+
+import msgpack
+
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import MessagePackParser, ORJSONParser
+from core.renderers import MessagePackRenderer, ORJSONRenderer
+
+SAMPLE = {
+    'id': 1,
+    'title': 'Zupa żurek\u2028\u2029',
+    'price': Decimal('5.30'),
+    'created': datetime.datetime(2023, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2023, 5, 1),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'label': gettext_lazy('Recipe'),
+    'ingredients': [{'id': 2, 'name': 'salt'}, {'id': 3, 'name': None}],
+    'ratio': 0.5,
+    'published': True,
+}
+
+
+class ORJSONRendererTest(TestCase):
+    def test_same_bytes_as_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(SAMPLE), JSONRenderer().render(SAMPLE))
+
+    def test_indent_falls_back_to_json_renderer(self):
+        rendered = ORJSONRenderer().render(SAMPLE, 'application/json; indent=4')
+
+        self.assertEqual(rendered, JSONRenderer().render(SAMPLE, 'application/json; indent=4'))
+
+    def test_unsupported_value_falls_back_to_json_renderer(self):
+        data = {'big': 2 ** 70}
+
+        self.assertEqual(ORJSONRenderer().render(data), b'{"big":1180591620717411303424}')
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTest(TestCase):
+    def test_parse(self):
+        data = ORJSONParser().parse(io.BytesIO('{"name": "żur", "price": "5.30"}'.encode()))
+
+        self.assertEqual(data, {'name': 'żur', 'price': '5.30'})
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"name": '))
+
+
+class MessagePackTest(TestCase):
+    def test_render_and_parse(self):
+        rendered = MessagePackRenderer().render(SAMPLE)
+        data = MessagePackParser().parse(io.BytesIO(rendered))
+
+        self.assertEqual(data, json.loads(JSONRenderer().render(SAMPLE)))
+
+    def test_parse_error(self):
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(io.BytesIO(msgpack.packb({'name': 'salt'})[:-2]))
@@ -0,0 +1,181 @@
+"""Testing the routing of reads to database replicas."""
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.cache import get_response_cache
+from core.db.routers import (
+    ReplicaRouter, get_pin_cache, is_pinned_to_primary, pin_to_primary, use_primary, use_replica,
+)
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+ME_URL = reverse('user:me')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def tearDown(self):
+        use_primary()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_use_replica(self):
+        use_replica()
+
+        self.assertEqual(self.router.db_for_read(Recipe), 'replica0')
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+        use_primary()
+
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_instance_hint_keeps_its_database(self):
+        recipe = Recipe()
+        recipe._state.db = 'default'
+        use_replica()
+
+        self.assertEqual(self.router.db_for_read(Recipe, instance=recipe), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        use_replica()
+
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+class PinToPrimaryTest(TestCase):
+    def test_pin_to_primary(self):
+        self.assertFalse(is_pinned_to_primary(1))
+
+        pin_to_primary(1)
+
+        self.assertTrue(is_pinned_to_primary(1))
+        self.assertFalse(is_pinned_to_primary(2))
+
+    def test_pins_outlive_the_response_cache(self):
+        pin_to_primary(1)
+
+        get_response_cache().clear()
+
+        self.assertTrue(is_pinned_to_primary(1))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self):
+        pin_to_primary(1)
+
+        self.assertFalse(is_pinned_to_primary(1))
+        self.assertIsNone(get_pin_cache().get('primary-pin:1'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'])
+@patch('core.mixins.use_replica')
+class ReplicaReadViewTest(TestCase):
+    """Which requests read from a replica, without reading from one."""
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = create_user(email='user@example.com', name='user', password='pass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_safe_requests_use_replica(self, mock_use_replica):
+        for url in (RECIPES_URL, ME_URL, reverse('ingredient:ingredient-list')):
+            mock_use_replica.reset_mock()
+
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            mock_use_replica.assert_called_once_with()
+
+    def test_writes_use_primary(self, mock_use_replica):
+        res = self.client.post(RECIPES_URL, {'title': 'Soup', 'time_minutes': 10, 'price': '4.50'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        mock_use_replica.assert_not_called()
+
+    def test_write_pins_user_to_primary(self, mock_use_replica):
+        self.client.patch(ME_URL, {'name': 'new name'})
+
+        self.client.get(RECIPES_URL)
+
+        self.assertTrue(is_pinned_to_primary(self.user.pk))
+        mock_use_replica.assert_not_called()
+
+    def test_failed_write_does_not_pin(self, mock_use_replica):
+        res = self.client.post(RECIPES_URL, {'title': 'Soup'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(is_pinned_to_primary(self.user.pk))
+
+    def test_unauthenticated_request_uses_primary(self, mock_use_replica):
+        res = APIClient().get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        mock_use_replica.assert_not_called()
+
+
+REPLICAS = [alias for alias in settings.DATABASES if alias != 'default']
+
+
+@skipUnless(REPLICAS, 'Set DB_REPLICA_HOSTS to test with a replica database.')
+@override_settings(DATABASE_REPLICAS=REPLICAS[:1])
+class ReplicaDatabaseTest(TestCase):
+    """Reads against a second database standing in for a lagging replica."""
+    databases = {'default', *REPLICAS[:1]}
+
+    def setUp(self):
+        get_response_cache().clear()
+        self.replica = REPLICAS[0]
+        self.user = create_user(email='user@example.com', name='user', password='pass123')
+        self.user.save(using=self.replica, force_insert=True)
+        self.token = Token.objects.create(user=self.user)
+
+        Recipe.objects.create(user=self.user, title='On primary', time_minutes=5, price='1.00')
+        Recipe.objects.using(self.replica).create(user=self.user, title='On replica', time_minutes=5, price='1.00')
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def _titles(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in res.json()]
+
+    def test_reads_from_replica(self):
+        self.assertEqual(self._titles(), ['On replica'])
+
+    def test_reads_own_writes(self):
+        res = self.client.post(RECIPES_URL, {'title': 'Stew', 'time_minutes': 30, 'price': '3.00'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        self.assertEqual(self._titles(), ['Stew', 'On primary'])
+
+    def test_reads_from_replica_once_pin_expires(self):
+        self.client.patch(ME_URL, {'name': 'new name'})
+        get_pin_cache().clear()
+
+        self.assertEqual(self._titles(), ['On replica'])
+
+    @override_settings(ROOT_URLCONF='core.tests.test_async_views')
+    async def test_async_read_from_replica(self):
+        res = await self.async_client.get('/api/recipe/recipes/', headers={'Authorization': f'Token {self.token.key}'})
+
+        self.assertEqual([recipe['title'] for recipe in res.json()], ['On replica'])
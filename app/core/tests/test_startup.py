@@ -0,0 +1,161 @@
+"""Testing the startup warm-up and health checks."""
+from django.db import DatabaseError, OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import startup
+from core.checks import check_database_connection
+from core.startup import Readiness, backoff_delays, retry
+
+from itertools import islice
+from unittest.mock import patch
+
+WARM_UP_STEPS = [
+    'core.startup.open_connections',
+    'core.startup.populate_url_resolvers',
+    'core.startup.compile_serializers',
+    'core.startup.prime_caches',
+]
+
+
+class RetryTest(SimpleTestCase):
+    def test_backoff_delays_grow_to_cap(self):
+        with patch('random.uniform', lambda low, high: high):
+            delays = list(islice(backoff_delays(0.5, 3), 5))
+
+        self.assertEqual(delays, [0.5, 1, 2, 3, 3])
+
+    @patch('time.sleep')
+    def test_retry_returns_result(self, mock_sleep):
+        results = iter([ValueError, ValueError, 'done'])
+
+        def func():
+            result = next(results)
+            if result is ValueError:
+                raise ValueError
+            return result
+
+        self.assertEqual(retry(func, ValueError, 60), 'done')
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    @patch('time.sleep')
+    def test_retry_does_not_catch_other_exceptions(self, mock_sleep):
+        def func():
+            raise KeyError
+
+        with self.assertRaises(KeyError):
+            retry(func, ValueError, 60)
+
+        mock_sleep.assert_not_called()
+
+    @patch('time.sleep')
+    def test_retry_calls_on_retry(self, mock_sleep):
+        calls = []
+        attempts = iter([True, False])
+
+        def func():
+            if next(attempts):
+                raise ValueError
+
+        retry(func, ValueError, 60, on_retry=lambda exc, delay: calls.append((type(exc), delay)))
+
+        self.assertEqual(calls, [(ValueError, mock_sleep.call_args.args[0])])
+
+
+class ReadinessTest(TestCase):
+    @override_settings(STARTUP_WARM_UP_STEPS=WARM_UP_STEPS)
+    def test_warm_up_sets_ready(self):
+        readiness = Readiness()
+
+        readiness.warm_up()
+
+        self.assertTrue(readiness.is_ready())
+        self.assertIsNone(readiness.error)
+        self.assertEqual(list(readiness.durations), WARM_UP_STEPS)
+
+    @override_settings(STARTUP_WARM_UP_STEPS=['core.startup.populate_url_resolvers'])
+    def test_start_warms_up_in_background(self):
+        readiness = Readiness()
+
+        readiness.start()
+        readiness.start()
+
+        self.assertTrue(readiness.ready.wait(10))
+
+    @override_settings(STARTUP_WARM_UP_STEPS=['core.startup.prime_caches'], STARTUP_WARM_UP_TIMEOUT=0)
+    @patch('core.startup.get_token_cache', side_effect=ConnectionError('cache down'))
+    def test_failed_warm_up_is_not_ready(self, mock_get_token_cache):
+        readiness = Readiness()
+
+        readiness.warm_up()
+
+        self.assertFalse(readiness.is_ready())
+        self.assertIn('cache down', readiness.error)
+
+
+class HealthCheckTest(TestCase):
+    def setUp(self):
+        self.readiness = Readiness()
+        patcher = patch.object(startup, 'readiness', self.readiness)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_healthz(self):
+        with self.assertNumQueries(0):
+            res = self.client.get('/healthz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_readyz_before_warm_up(self):
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'warming up'})
+
+    @override_settings(STARTUP_WARM_UP_STEPS=[])
+    def test_readyz_after_warm_up(self):
+        self.readiness.warm_up()
+
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {'status': 'ready'})
+
+    def test_readyz_after_failed_warm_up(self):
+        self.readiness.error = 'core.startup.open_connections: timeout'
+
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json()['status'], 'warm-up failed')
+
+    @override_settings(STARTUP_WARM_UP_STEPS=[])
+    @patch('django.db.backends.utils.CursorWrapper.execute', side_effect=DatabaseError)
+    def test_readyz_database_unavailable(self, mock_execute):
+        self.readiness.warm_up()
+
+        res = self.client.get('/readyz')
+
+        self.assertEqual(res.status_code, 503)
+        self.assertEqual(res.json(), {'status': 'database unavailable'})
+
+
+class DatabaseConnectionCheckTest(TestCase):
+    def test_connects_to_checked_databases(self):
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as mock_ensure_connection:
+            self.assertEqual(check_database_connection(None, databases=['default']), [])
+
+        mock_ensure_connection.assert_called_once_with()
+
+    def test_connection_error_is_raised(self):
+        with patch(
+            'django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection', side_effect=OperationalError
+        ):
+            with self.assertRaises(OperationalError):
+                check_database_connection(None, databases=['default'])
+
+    def test_skipped_without_databases(self):
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.ensure_connection') as mock_ensure_connection:
+            check_database_connection(None)
+
+        mock_ensure_connection.assert_not_called()
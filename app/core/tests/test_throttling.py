@@ -0,0 +1,169 @@
+"""Testing the token bucket throttles."""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import CacheBuckets, LocalBuckets, _local_buckets, parse_rate
+
+TOKEN_URL = reverse('user:token')
+CREATE_URL = reverse('user:create')
+RECIPES_URL = reverse('recipe:recipe-list')
+INGREDIENTS_URL = reverse('ingredient:ingredient-list')
+
+
+class BucketsTests:
+    """Shared by the bucket stores, which patch `self.clock`."""
+
+    def test_burst_then_refill(self):
+        self.now = 1000.0
+        with patch(self.clock, lambda: self.now):
+            self.assertEqual([self.buckets.consume('key', 3, 0.5) for _ in range(3)], [0, 0, 0])
+            self.assertEqual(self.buckets.consume('key', 3, 0.5), 2)
+
+            self.now += 1
+            self.assertEqual(self.buckets.consume('key', 3, 0.5), 1)
+
+            self.now += 1
+            self.assertEqual(self.buckets.consume('key', 3, 0.5), 0)
+            self.assertEqual(self.buckets.consume('key', 3, 0.5), 2)
+
+            self.now += 60
+            self.assertEqual([self.buckets.consume('key', 3, 0.5) for _ in range(4)], [0, 0, 0, 2])
+
+    def test_keys_have_their_own_bucket(self):
+        self.assertEqual(self.buckets.consume('a', 1, 1), 0)
+        self.assertGreater(self.buckets.consume('a', 1, 1), 0)
+        self.assertEqual(self.buckets.consume('b', 1, 1), 0)
+
+
+class LocalBucketsTest(BucketsTests, SimpleTestCase):
+    clock = 'core.throttling.time.monotonic'
+
+    def setUp(self):
+        self.buckets = LocalBuckets(max_entries=2)
+
+    def test_bounded(self):
+        for key in ('a', 'b', 'c'):
+            self.buckets.consume(key, 1, 1)
+
+        # `a` was dropped, its bucket is full again.
+        self.assertEqual(self.buckets.consume('a', 1, 1), 0)
+        self.assertGreater(self.buckets.consume('c', 1, 1), 0)
+
+
+class CacheBucketsTest(BucketsTests, SimpleTestCase):
+    clock = 'core.throttling.time.time'
+
+    def setUp(self):
+        self.buckets = CacheBuckets(caches['default'])
+        self.buckets.clear()
+
+
+class ParseRateTest(SimpleTestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('10/s'), (10, 10))
+        self.assertEqual(parse_rate('30/min'), (30, 0.5))
+        self.assertEqual(parse_rate('20/hour'), (20, 20 / 3600))
+        self.assertEqual(parse_rate('24/day'), (24, 24 / 86400))
+
+
+class ThrottledViewsTest(TestCase):
+    def setUp(self):
+        _local_buckets.clear()
+        self.user = get_user_model().objects.create_user(email='user@example.com', name='user', password='pass123')
+        self.client = APIClient()
+
+    def tearDown(self):
+        _local_buckets.clear()
+
+    def post_token(self, email='user@example.com', ip='10.0.0.1'):
+        return self.client.post(TOKEN_URL, {'email': email, 'password': 'pass123'}, REMOTE_ADDR=ip)
+
+    @override_settings(THROTTLE_RATES={'token-ip': '2/min'})
+    def test_token_per_ip(self):
+        self.assertEqual(self.post_token().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.post_token(email='other@example.com').status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.post_token()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '30')
+        self.assertEqual(self.post_token(ip='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_RATES={'token-account': '2/min'})
+    def test_token_per_account(self):
+        self.post_token(ip='10.0.0.1')
+        self.post_token(ip='10.0.0.2')
+
+        res = self.post_token(email=' USER@example.com', ip='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.post_token(email='other@example.com').status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(THROTTLE_RATES={'token-ip': '1/min'})
+    @patch('user.serializers.authenticate')
+    def test_throttled_before_password_check(self, mock_authenticate):
+        mock_authenticate.return_value = None
+        self.client.post(TOKEN_URL, {'email': 'user@example.com', 'password': 'x'})
+        mock_authenticate.reset_mock()
+
+        res = self.client.post(
+            TOKEN_URL, {'email': 'user@example.com', 'password': 'x'}, HTTP_AUTHORIZATION='Basic dXNlcjpwYXNz'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        mock_authenticate.assert_not_called()
+
+    @override_settings(THROTTLE_RATES={'create-ip': '1/hour', 'create-account': '1/hour'})
+    def test_create(self):
+        payload = {'email': 'new@example.com', 'name': 'new', 'password': 'pass123'}
+        self.assertEqual(self.client.post(CREATE_URL, payload).status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(CREATE_URL, {**payload, 'email': 'new2@example.com'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '3600')
+
+        res = self.client.post(CREATE_URL, payload, REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @override_settings(THROTTLE_RATES={'token-account': '1/min', 'create-account': '1/min'})
+    def test_body_not_an_object(self):
+        for url in (TOKEN_URL, CREATE_URL):
+            res = self.client.post(url, [], format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST, url)
+
+    @override_settings(THROTTLE_RATES={'write': '2/min'})
+    def test_writes_per_user(self):
+        self.client.force_authenticate(self.user)
+        recipe = {'title': 'Soup', 'time_minutes': 10, 'price': '4.50'}
+
+        self.assertEqual(self.client.post(RECIPES_URL, recipe).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(RECIPES_URL, recipe).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.post(RECIPES_URL, recipe).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(INGREDIENTS_URL).status_code, status.HTTP_200_OK)
+
+        other = get_user_model().objects.create_user(email='other@example.com', name='other', password='pass123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.post(RECIPES_URL, recipe).status_code, status.HTTP_201_CREATED)
+
+    @override_settings(THROTTLE_RATES={})
+    def test_scopes_without_rate_are_not_throttled(self):
+        # More than the default rates allow.
+        for _ in range(35):
+            self.assertEqual(self.post_token().status_code, status.HTTP_200_OK)
+
+    @override_settings(THROTTLE_RATES={'token-ip': '1/min'}, THROTTLE_CACHE_ALIAS='default')
+    def test_shared_cache(self):
+        caches['default'].clear()
+        self.post_token()
+
+        self.assertEqual(self.post_token().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(len(_local_buckets._buckets), 0)
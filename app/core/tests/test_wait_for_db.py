@@ -1,9 +1,11 @@
 from django.test import SimpleTestCase
 from django.core.management import call_command
+from django.core.management.base import CommandError
 
 from django.db.utils import OperationalError
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from io import StringIO
 from unittest.mock import patch
 
 
@@ -27,3 +29,22 @@ class CommandsTest(SimpleTestCase):
 
         self.assertTrue(mock_check.call_count, 6)
         mock_check.assert_called_with(databases=['default'])
+
+    @patch('time.sleep')
+    def test_retries_back_off(self, mock_sleep, mock_check):
+        mock_check.side_effect = [OperationalError] * 8 + [True]
+
+        call_command('wait_for_db', base_delay=0.1, max_delay=1, stdout=StringIO())
+
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        self.assertEqual(len(delays), 8)
+        self.assertTrue(all(0 <= delay <= min(1, 0.1 * 2 ** attempt) for attempt, delay in enumerate(delays)))
+
+    @patch('time.sleep')
+    def test_gives_up_after_timeout(self, mock_sleep, mock_check):
+        mock_check.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+        mock_sleep.assert_not_called()
@@ -0,0 +1,163 @@
+"""Token bucket throttles of the API.
+
+A rate `num/period` of `THROTTLE_RATES` is a bucket of `num` tokens refilled
+at `num` per period: bursts of up to `num` requests go through, then
+requests are admitted at the refill rate. Throttled requests get
+`429 Too Many Requests` with a `Retry-After` header from DRF.
+
+Buckets are kept in-process unless `THROTTLE_CACHE_ALIAS` names a cache
+shared by the workers.
+"""
+import functools
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+CACHE_KEY_PREFIX = 'throttle:'
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@functools.lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Return the capacity and tokens per second of a rate, e.g. `10/min`."""
+    num, period = rate.split('/')
+    capacity = int(num)
+    return capacity, capacity / DURATIONS[period[0]]
+
+
+class LocalBuckets:
+    """Bounded in-process store of token buckets, least recently used first out."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill):
+        """Take a token, returning 0, or the seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill)
+            wait = 0 if tokens >= 1 else (1 - tokens) / refill
+            self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Token buckets kept in a Django cache.
+
+    Buckets are read and written without a lock, so concurrent requests of
+    several workers may each take the last token of a bucket.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def consume(self, key, capacity, refill):
+        now = time.time()
+        tokens, updated = self.cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            return (1 - tokens) / refill
+
+        # Expires once full again, a missing bucket is a full one.
+        self.cache.set(key, (tokens - 1, now), math.ceil(capacity / refill))
+        return 0
+
+    def clear(self):
+        self.cache.clear()
+
+
+_local_buckets = LocalBuckets(settings.THROTTLE_MAX_ENTRIES)
+
+
+def get_buckets():
+    if settings.THROTTLE_CACHE_ALIAS:
+        return CacheBuckets(caches[settings.THROTTLE_CACHE_ALIAS])
+
+    return _local_buckets
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle requests with one token bucket per `get_key()`.
+
+    Requests of scopes without a rate in `THROTTLE_RATES` are not throttled.
+    """
+    scope = None
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_key(self, request, view):
+        """Return what the bucket is kept for, or None to let the request through."""
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        rate = settings.THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+
+        self._wait = get_buckets().consume(f'{CACHE_KEY_PREFIX}{scope}:{key}', *parse_rate(rate))
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class IPThrottle(TokenBucketThrottle):
+    """Per client IP, in the `<view.throttle_scope>-ip` scope."""
+
+    def get_scope(self, view):
+        return f'{view.throttle_scope}-ip'
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountThrottle(TokenBucketThrottle):
+    """Per email sent in the request, in the `<view.throttle_scope>-account` scope."""
+
+    def get_scope(self, view):
+        return f'{view.throttle_scope}-account'
+
+    def get_key(self, request, view):
+        # Bodies that are not objects, e.g. `[]`, are left to the serializer.
+        email = request.data.get('email') if isinstance(request.data, Mapping) else None
+        if not isinstance(email, str):
+            return None
+
+        return hashlib.md5(email.strip().lower().encode()).hexdigest()
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Per authenticated user, for unsafe methods."""
+    scope = 'write'
+
+    def get_key(self, request, view):
+        if request.method in SAFE_METHODS or not request.user.is_authenticated:
+            return None
+
+        return request.user.pk
@@ -0,0 +1,33 @@
+"""Operational endpoints of the API."""
+from drf_spectacular.utils import OpenApiResponse, extend_schema
+
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.db.pool import pool_stats
+
+# Statistics of `core.db.pool.ConnectionPool.stats()`, by database alias.
+POOL_STATS_SCHEMA = {
+    'type': 'object',
+    'additionalProperties': {
+        'type': 'object',
+        'properties': {
+            **{name: {'type': 'integer'} for name in (
+                'max_size', 'size', 'in_use', 'idle', 'waits', 'timeouts', 'created', 'discarded',
+            )},
+            'wait_time': {'type': 'number', 'description': 'Seconds spent waiting for a connection.'},
+        },
+    },
+}
+
+
+class DatabasePoolStatsView(APIView):
+    """Connection pool statistics of the process serving the request."""
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [permissions.IsAdminUser]
+
+    @extend_schema(responses=OpenApiResponse(POOL_STATS_SCHEMA, description='Statistics by database alias.'))
+    def get(self, request):
+        return Response(pool_stats())
@@ -1,14 +1,40 @@
+from django.db import IntegrityError, transaction
+
 from rest_framework import serializers
 
 from core.models import Ingredient
+from core.serializers import SparseFieldsetMixin
+
+DUPLICATE_NAME_MESSAGE = 'Ingredient with this name already exists.'
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
 
+    def validate_name(self, value):
+        # Nested recipe payloads reuse existing names on purpose, only
+        # renaming an ingredient can clash with another one of the user.
+        if isinstance(self.instance, Ingredient):
+            duplicate = Ingredient.objects.filter(
+                user_id=self.instance.user_id, name=value
+            ).exclude(id=self.instance.id)
+            if duplicate.exists():
+                raise serializers.ValidationError(DUPLICATE_NAME_MESSAGE)
+
+        return value
+
+    def update(self, instance, validated_data):
+        # A concurrent rename to the same name passes validate_name too, the
+        # unique constraint rejects the later one.
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'name': [DUPLICATE_NAME_MESSAGE]})
+
     # def create(self, validated_data):
     #     user = self.context['request'].user
     #     return Ingredient.objects.create(**validated_data, user=user)
@@ -1,3 +1,6 @@
+from unittest.mock import patch
+
+from django.db import connection
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -9,6 +12,7 @@ from core.models import UserProfile, Ingredient
 from ingredient.serializers import IngredientSerializer
 
 INGREDIENTS_URL = reverse('ingredient:ingredient-list')
+AUTOCOMPLETE_URL = reverse('ingredient:ingredient-autocomplete')
 
 
 def detail_url(ingredient_id):
@@ -128,3 +132,93 @@ class IngredientApiTest(TestCase):
         ingredient.refresh_from_db()
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(ingredient.user, user)
+
+    def test_list_ingredients_paginated(self):
+        ingredients = [create_ingriedient(name=f'ingredient {index}', user=self.user) for index in range(3)]
+
+        res = self.client.get(INGREDIENTS_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data['results']], [ingredients[2].id, ingredients[1].id])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual([item['id'] for item in res.data['results']], [ingredients[0].id])
+        self.assertIsNone(res.data['next'])
+
+    def test_rename_to_existing_name_rejected(self):
+        create_ingriedient(name='salt', user=self.user)
+        ingredient = create_ingriedient(name='pepper', user=self.user)
+
+        res = self.client.patch(detail_url(ingredient.id), {'name': 'salt'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'pepper')
+
+    def test_concurrent_rename_to_same_name_rejected(self):
+        ingredient = create_ingriedient(name='pepper', user=self.user)
+        other = create_ingriedient(name='chili', user=self.user)
+
+        def rename_other(value):
+            # Another request renames an ingredient after this one was validated.
+            Ingredient.objects.filter(id=other.id).update(name='salt')
+            return value
+
+        with patch.object(IngredientSerializer, 'validate_name', side_effect=rename_other):
+            res = self.client.patch(detail_url(ingredient.id), {'name': 'salt'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+        ingredient.refresh_from_db()
+        self.assertEqual(ingredient.name, 'pepper')
+
+    def test_autocomplete_prefix_matches(self):
+        salt = create_ingriedient(name='Salt', user=self.user)
+        salmon = create_ingriedient(name='salmon', user=self.user)
+        create_ingriedient(name='basil', user=self.user)
+        other = create_user(email='other@example.com', name='other', password='test123')
+        create_ingriedient(name='saffron', user=other)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'sa'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, IngredientSerializer([salmon, salt], many=True).data)
+
+    def test_autocomplete_limit(self):
+        for index in range(5):
+            create_ingriedient(name=f'salt {index}', user=self.user)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': 'salt', 'limit': 2})
+
+        self.assertEqual([item['name'] for item in res.data], ['salt 0', 'salt 1'])
+
+    def test_autocomplete_escapes_wildcards(self):
+        create_ingriedient(name='salt', user=self.user)
+
+        res = self.client.get(AUTOCOMPLETE_URL, {'q': '%a'})
+
+        self.assertEqual(res.data, [])
+
+    def test_autocomplete_requires_query(self):
+        res = self.client.get(AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_autocomplete_uses_prefix_index(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(user=self.user, name=f'{letter}{index}')
+            for letter in 'abcdefghijklmnopqrstuvwxyz' for index in range(100)
+        )
+        queryset = Ingredient.objects.filter(user=self.user, name__istartswith='s1')
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_ingredient')
+        plan = queryset.explain()
+
+        self.assertIn('ingredient_name_prefix_idx', plan)
+
+    def test_list_sparse_fields(self):
+        ingredient = create_ingriedient(name='salt', user=self.user)
+
+        res = self.client.get(INGREDIENTS_URL, {'fields': 'name'})
+
+        self.assertEqual(res.data, [{'name': ingredient.name}])
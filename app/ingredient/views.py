@@ -1,12 +1,29 @@
+from django.conf import settings
+from django.db.models.functions import Upper
+
 from rest_framework import viewsets, mixins
-from rest_framework import permissions, authentication
+from rest_framework import permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
 from ingredient.serializers import IngredientSerializer
 
+from core.async_views import AsyncReadMixin
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ConditionalGetMixin, CachedResponseMixin, ReplicaReadMixin, SparseQuerysetMixin, ValuesReadMixin
+from core.pagination import KeysetPagination, parse_positive_int
+from core.throttling import WriteThrottle
 from core.models import Ingredient
 
 
-class IngredientApiViewset(mixins.ListModelMixin,
+class IngredientApiViewset(AsyncReadMixin,
+                           ReplicaReadMixin,
+                           ConditionalGetMixin,
+                           CachedResponseMixin,
+                           SparseQuerysetMixin,
+                           ValuesReadMixin,
+                           mixins.ListModelMixin,
                            mixins.RetrieveModelMixin,
                            mixins.UpdateModelMixin,
                            mixins.DestroyModelMixin,
@@ -15,10 +32,43 @@ class IngredientApiViewset(mixins.ListModelMixin,
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    throttle_classes = [WriteThrottle]
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+
+        if self.action in ('list', 'retrieve', 'autocomplete'):
+            return self.get_sparse_queryset(queryset)
+
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """Return the user's ingredients whose name starts with `?q=`, case insensitive.
+
+        At most `?limit=` ingredients are returned, ordered by name. Matches
+        are read from the `ingredient_name_prefix_idx` index and responses
+        are cached like list responses.
+        """
+        return self._cached_response(self._autocomplete, request)
+
+    def _autocomplete(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            raise ValidationError({'q': 'This query parameter is required.'})
+
+        limit = min(
+            parse_positive_int(request.query_params.get('limit'), settings.INGREDIENT_AUTOCOMPLETE_LIMIT),
+            settings.INGREDIENT_AUTOCOMPLETE_MAX_LIMIT
+        )
+        # Ordering by `name` would let the planner walk the whole (user, name)
+        # unique index instead of the prefix index.
+        ingredients = self.get_queryset().filter(name__istartswith=prefix).order_by(Upper('name'), 'id')[:limit]
+        serializer = self.get_serializer(ingredients, many=True)
+
+        return Response(serializer.data)
@@ -0,0 +1,69 @@
+"""Filtering of recipes by their ingredients."""
+from django.db.models import Count, Q, Subquery
+from django.db.models.lookups import Exact
+
+from rest_framework.filters import BaseFilterBackend
+
+from core.models import Recipe, Ingredient
+
+
+def parse_ingredients(value):
+    """Split a comma separated list into ingredient ids and names."""
+    ids, names = set(), set()
+    for item in value.split(','):
+        item = item.strip()
+        if item.isdigit():
+            ids.add(int(item))
+        elif item:
+            names.add(item)
+
+    return ids, names
+
+
+def _count(queryset):
+    """Scalar subquery counting the rows of `queryset`."""
+    return Subquery(queryset.order_by().values('user').annotate(count=Count('*')).values('count'))
+
+
+class IngredientFilterBackend(BaseFilterBackend):
+    """Filter recipes containing any (`ingredients_any`) or all
+    (`ingredients_all`) of the given ingredient ids or names.
+
+    Both filters are semi-joins on the recipe/ingredient table. "All" is a
+    single `GROUP BY recipe_id HAVING COUNT(*) = n` instead of one join per
+    ingredient, with `n` and the check that every requested ingredient
+    exists as scalar subqueries. Filtering runs no query of its own, so
+    the queryset can also be evaluated with the async ORM.
+    """
+    any_query_param = 'ingredients_any'
+    all_query_param = 'ingredients_all'
+
+    def filter_queryset(self, request, queryset, view):
+        RecipeIngredient = Recipe.ingredients.through
+        params = request.query_params
+
+        if self.any_query_param in params:
+            ids, names = parse_ingredients(params[self.any_query_param])
+            links = RecipeIngredient.objects.filter(
+                Q(ingredient_id__in=ids) | Q(ingredient__user=request.user, ingredient__name__in=names)
+            )
+            queryset = queryset.filter(id__in=links.values('recipe_id'))
+
+        if self.all_query_param in params:
+            ids, names = parse_ingredients(params[self.all_query_param])
+            if not ids and not names:
+                return queryset.none()
+
+            requested = Ingredient.objects.filter(user=request.user).filter(Q(id__in=ids) | Q(name__in=names))
+            links = RecipeIngredient.objects.filter(ingredient__in=requested).values('recipe_id').annotate(
+                matched=Count('*')
+            ).filter(matched=_count(requested))
+            queryset = queryset.filter(id__in=links.values('recipe_id'))
+
+            # A missing ingredient cannot be contained by any recipe.
+            if ids:
+                queryset = queryset.filter(Exact(_count(requested.filter(id__in=ids)), len(ids)))
+            if names:
+                queryset = queryset.filter(Exact(_count(requested.filter(name__in=names)), len(names)))
+
+        return queryset
@@ -1,32 +1,76 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
 from rest_framework import serializers
 
+from core.cache import bump_data_version
+from core.serializers import SparseFieldsetMixin
 from core.models import Recipe, Ingredient
 
 from ingredient.serializers import IngredientSerializer
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     ingredients = IngredientSerializer(many=True, required=False)
 
     class Meta:
         model = Recipe
         fields = ['id', 'title', 'time_minutes', 'price', 'ingredients']
         read_only_fields = ['id']
+        expandable_fields = ['description']
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
+    def _get_ingredient_ids(self, ingredients):
         user = self.context['request'].user
+        ingredient_objs = Ingredient.objects.get_or_create_many(
+            user, [ingredient['name'] for ingredient in ingredients]
+        )
 
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
-                user=user, **ingredient
-            )
-            recipe.ingredients.add(ingredient_obj)
+        return {ingredient.id for ingredient in ingredient_objs.values()}
+
+    def _add_ingredients(self, recipe, ingredient_ids):
+        RecipeIngredient = Recipe.ingredients.through
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredient_id) for ingredient_id in ingredient_ids],
+            ignore_conflicts=True
+        )
+        bump_data_version(recipe.user_id)
+
+    def _get_or_create_ingredients(self, ingredients, recipe):
+        self._add_ingredients(recipe, self._get_ingredient_ids(ingredients))
+
+    def _update_ingredients(self, ingredients, recipe):
+        """Write only the through rows that differ from the requested set."""
+        RecipeIngredient = Recipe.ingredients.through
+        current_ids = set(
+            RecipeIngredient.objects.filter(recipe_id=recipe.id).values_list('ingredient_id', flat=True)
+        )
+        requested_ids = self._get_ingredient_ids(ingredients)
+
+        removed_ids = current_ids - requested_ids
+        if removed_ids:
+            RecipeIngredient.objects.filter(recipe_id=recipe.id, ingredient_id__in=removed_ids).delete()
+            bump_data_version(recipe.user_id)
+
+        added_ids = requested_ids - current_ids
+        if added_ids:
+            self._add_ingredients(recipe, added_ids)
 
     def create(self, validated_data):
 
         ingredients = validated_data.pop('ingredients', [])
-        recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_ingredients(ingredients, recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            if ingredients:
+                self._get_or_create_ingredients(ingredients, recipe)
+
+        return recipe
+
+    def update(self, instance, validated_data):
+        ingredients = validated_data.pop('ingredients', None)
+        with transaction.atomic():
+            recipe = super().update(instance, validated_data)
+            if ingredients is not None:
+                self._update_ingredients(ingredients, recipe)
 
         return recipe
 
@@ -34,3 +78,36 @@ class RecipeSerializer(serializers.ModelSerializer):
 class DetailRecipeSerializer(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description']
+
+
+class RecipeBatchSerializer(serializers.ListSerializer):
+    """Validate a list of recipes together and create them in bulk."""
+    child = DetailRecipeSerializer()
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        ingredient_names = [
+            [ingredient['name'] for ingredient in item.pop('ingredients', [])]
+            for item in validated_data
+        ]
+
+        with transaction.atomic():
+            recipes = Recipe.objects.bulk_create([Recipe(**item) for item in validated_data])
+            ingredients = Ingredient.objects.get_or_create_many(
+                user, [name for names in ingredient_names for name in names]
+            )
+
+            RecipeIngredient = Recipe.ingredients.through
+            RecipeIngredient.objects.bulk_create(
+                [
+                    RecipeIngredient(recipe_id=recipe.id, ingredient_id=ingredients[name].id)
+                    for recipe, names in zip(recipes, ingredient_names)
+                    for name in dict.fromkeys(names)
+                ],
+                ignore_conflicts=True
+            )
+            bump_data_version(user.id)
+
+        prefetch_related_objects(recipes, 'ingredients')
+
+        return recipes
@@ -0,0 +1,79 @@
+"""The values() read path returns the same JSON as the serializers."""
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.cache import get_response_cache
+from core.models import Ingredient
+from core.serializers import ValuesReader
+
+from recipe.serializers import RecipeSerializer
+from recipe.tests.test_recipe_api import create_user, create_recipe, RECIPE_URL, detail_url
+
+from decimal import Decimal
+
+INGREDIENTS_URL = reverse('ingredient:ingredient-list')
+
+
+class FastReadTest(TestCase):
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            name='user',
+            password='pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        salt = Ingredient.objects.create(user=self.user, name='salt')
+        pepper = Ingredient.objects.create(user=self.user, name='pepper')
+        self.soup = create_recipe(user=self.user, title='Soup', price=Decimal('4.50'))
+        self.soup.ingredients.add(pepper, salt)
+        create_recipe(user=self.user, title='Toast', price=Decimal('1'), description='')
+
+    def assertSameContent(self, url, params=None):
+        with override_settings(API_FAST_READS=False):
+            get_response_cache().clear()
+            expected = self.client.get(url, params)
+        get_response_cache().clear()
+        res = self.client.get(url, params)
+
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(res.content, expected.content)
+
+    def test_list_same_content(self):
+        self.assertSameContent(RECIPE_URL)
+
+    def test_retrieve_same_content(self):
+        self.assertSameContent(detail_url(self.soup.id))
+
+    def test_retrieve_not_found(self):
+        self.assertSameContent(detail_url(0))
+
+    def test_paginated_list_same_content(self):
+        self.assertSameContent(RECIPE_URL, {'page_size': 1})
+
+    def test_sparse_fields_same_content(self):
+        self.assertSameContent(RECIPE_URL, {'fields': 'title,price', 'expand': 'description'})
+
+    def test_filtered_list_same_content(self):
+        self.assertSameContent(RECIPE_URL, {'ingredients_all': 'salt'})
+
+    def test_ingredient_list_same_content(self):
+        self.assertSameContent(INGREDIENTS_URL)
+
+    @override_settings(DATA_VERSION_CACHE_ALIAS='default')
+    def test_list_loads_ingredients_with_one_query(self):
+        get_response_cache().clear()
+
+        with self.assertNumQueries(2):
+            self.client.get(RECIPE_URL)
+
+    def test_unsupported_serializer_not_compiled(self):
+        class UserRecipeSerializer(RecipeSerializer):
+            class Meta(RecipeSerializer.Meta):
+                fields = RecipeSerializer.Meta.fields + ['user']
+
+        self.assertIsNotNone(ValuesReader.compile(RecipeSerializer()))
+        self.assertIsNone(ValuesReader.compile(UserRecipeSerializer()))
@@ -0,0 +1,247 @@
+"""Query budgets for the recipe and ingredient endpoints."""
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Ingredient
+
+from recipe.tests.test_recipe_api import create_user, create_recipe, RECIPE_URL, BATCH_URL, detail_url
+
+from decimal import Decimal
+
+INGREDIENTS_URL = reverse('ingredient:ingredient-list')
+AUTOCOMPLETE_URL = reverse('ingredient:ingredient-autocomplete')
+
+# Transaction control is not counted: savepoints inside test cases map to
+# BEGIN/COMMIT in production, which are not round trips for statements.
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+# Maximum number of SQL queries each endpoint/action may run. The budgets
+# must hold whatever the number of rows owned by the user.
+QUERY_BUDGETS = {
+    'recipe-list': 2,
+    'recipe-filter-ingredients': 3,
+    'recipe-retrieve': 2,
+    'recipe-create': 2,
+    'recipe-create-with-ingredients': 6,
+    'recipe-update': 3,
+    'recipe-partial-update': 3,
+    'recipe-update-ingredients': 9,
+    'recipe-destroy': 3,
+    'recipe-batch': 6,
+    'ingredient-list': 1,
+    'ingredient-retrieve': 1,
+    'ingredient-autocomplete': 1,
+    'ingredient-update': 3,
+    'ingredient-destroy': 3,
+}
+
+
+def ingredient_detail_url(ingredient_id):
+    return reverse('ingredient:ingredient-detail', args=(ingredient_id,))
+
+
+# Data versions are kept in a local cache, the budgets count the queries of
+# the endpoints, not those of the database cache.
+@override_settings(DATA_VERSION_CACHE_ALIAS='default')
+class QueryBudgetTestCase(TestCase):
+    """Base class asserting that a block stays within its declared budget."""
+
+    def assertWithinBudget(self, name, func, *args, **kwargs):
+        budget = QUERY_BUDGETS[name]
+        with CaptureQueriesContext(connection) as ctx:
+            res = func(*args, **kwargs)
+
+        queries = [
+            query['sql'] for query in ctx.captured_queries
+            if not query['sql'].startswith(TRANSACTION_CONTROL)
+        ]
+        executed = len(queries)
+        if executed > budget:
+            queries = '\n'.join(queries)
+            self.fail(f'{name} ran {executed} queries, budget is {budget}:\n{queries}')
+
+        return res
+
+
+class RecipeQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            name='user',
+            password='pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def _create_recipes(self, count, ingredients_per_recipe=3):
+        recipes = []
+        for index in range(count):
+            recipe = create_recipe(user=self.user, title=f'Recipe {index}')
+            for position in range(ingredients_per_recipe):
+                ingredient = Ingredient.objects.create(user=self.user, name=f'ingredient {recipe.id}-{position}')
+                recipe.ingredients.add(ingredient)
+            recipes.append(recipe)
+        return recipes
+
+    def test_list_budget_independent_of_rows(self):
+        for count in (1, 10):
+            self._create_recipes(count)
+            res = self.assertWithinBudget('recipe-list', self.client.get, RECIPE_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_includes_prefetched_ingredients(self):
+        self._create_recipes(5, ingredients_per_recipe=2)
+
+        res = self.assertWithinBudget('recipe-list', self.client.get, RECIPE_URL)
+
+        self.assertEqual(len(res.data), 5)
+        for recipe in res.data:
+            self.assertEqual(len(recipe['ingredients']), 2)
+
+    def test_filter_ingredients_budget(self):
+        recipes = self._create_recipes(5, ingredients_per_recipe=2)
+        names = ','.join(ingredient.name for ingredient in recipes[0].ingredients.all())
+
+        for param in ('ingredients_any', 'ingredients_all'):
+            res = self.assertWithinBudget(
+                'recipe-filter-ingredients', self.client.get, RECIPE_URL, {param: names}
+            )
+            self.assertEqual([recipe['id'] for recipe in res.data], [recipes[0].id])
+
+    def test_retrieve_budget(self):
+        recipe = self._create_recipes(1, ingredients_per_recipe=10)[0]
+
+        res = self.assertWithinBudget('recipe-retrieve', self.client.get, detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['ingredients']), 10)
+
+    def test_create_budget(self):
+        payload = {
+            'title': 'Soup',
+            'time_minutes': 30,
+            'price': Decimal('4.50'),
+        }
+
+        res = self.assertWithinBudget('recipe-create', self.client.post, RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_with_ingredients_budget_independent_of_count(self):
+        for count in (2, 20):
+            payload = {
+                'title': f'Soup {count}',
+                'time_minutes': 30,
+                'price': Decimal('4.50'),
+                'ingredients': [{'name': f'ingredient {count}-{index}'} for index in range(count)],
+            }
+
+            res = self.assertWithinBudget(
+                'recipe-create-with-ingredients', self.client.post, RECIPE_URL, payload, format='json'
+            )
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data['ingredients']), count)
+
+    def test_update_budget(self):
+        recipe = self._create_recipes(1)[0]
+        payload = {
+            'title': 'Updated',
+            'time_minutes': 10,
+            'price': Decimal('1.00'),
+        }
+
+        res = self.assertWithinBudget('recipe-update', self.client.put, detail_url(recipe.id), payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_partial_update_budget(self):
+        recipe = self._create_recipes(1)[0]
+
+        res = self.assertWithinBudget(
+            'recipe-partial-update', self.client.patch, detail_url(recipe.id), {'title': 'New'}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_ingredients_budget_independent_of_count(self):
+        for count in (2, 20):
+            recipe = self._create_recipes(1, ingredients_per_recipe=count)[0]
+            names = list(recipe.ingredients.values_list('name', flat=True))
+            payload = {
+                'ingredients': [{'name': name} for name in names[1:]] + [{'name': f'new {recipe.id}'}]
+            }
+
+            res = self.assertWithinBudget(
+                'recipe-update-ingredients', self.client.patch, detail_url(recipe.id), payload, format='json'
+            )
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(res.data['ingredients']), count)
+
+    def test_batch_budget_independent_of_count(self):
+        for count in (2, 50):
+            payload = [
+                {
+                    'title': f'Recipe {count}-{index}',
+                    'time_minutes': 10,
+                    'price': Decimal('2.00'),
+                    'ingredients': [{'name': 'salt'}, {'name': f'ingredient {count}-{index}'}],
+                }
+                for index in range(count)
+            ]
+
+            res = self.assertWithinBudget('recipe-batch', self.client.post, BATCH_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(res.data), count)
+
+    def test_destroy_budget(self):
+        recipe = self._create_recipes(1, ingredients_per_recipe=5)[0]
+
+        res = self.assertWithinBudget('recipe-destroy', self.client.delete, detail_url(recipe.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class IngredientQueryBudgetTest(QueryBudgetTestCase):
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            name='user',
+            password='pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_budget_independent_of_rows(self):
+        for count in (1, 10):
+            for index in range(count):
+                Ingredient.objects.create(user=self.user, name=f'ingredient {count}-{index}')
+            res = self.assertWithinBudget('ingredient-list', self.client.get, INGREDIENTS_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_budget(self):
+        ingredient = Ingredient.objects.create(user=self.user, name='salt')
+
+        res = self.assertWithinBudget('ingredient-retrieve', self.client.get, ingredient_detail_url(ingredient.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_autocomplete_budget(self):
+        for index in range(10):
+            Ingredient.objects.create(user=self.user, name=f'salt {index}')
+
+        res = self.assertWithinBudget('ingredient-autocomplete', self.client.get, AUTOCOMPLETE_URL, {'q': 'salt'})
+        self.assertEqual(len(res.data), 10)
+
+    def test_update_budget(self):
+        ingredient = Ingredient.objects.create(user=self.user, name='salt')
+
+        res = self.assertWithinBudget(
+            'ingredient-update', self.client.put, ingredient_detail_url(ingredient.id), {'name': 'pepper'},
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_destroy_budget(self):
+        ingredient = Ingredient.objects.create(user=self.user, name='salt')
+
+        res = self.assertWithinBudget('ingredient-destroy', self.client.delete, ingredient_detail_url(ingredient.id))
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
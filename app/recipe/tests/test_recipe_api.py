@@ -1,16 +1,25 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
-from core.models import Recipe
+from core.models import Recipe, Ingredient
 
 from recipe.serializers import RecipeSerializer
 
 from decimal import Decimal
 
+import csv
+import io
+import json
+
+import msgpack
+
 
 def create_user(**params):
     return get_user_model().objects.create_user(**params)
@@ -31,6 +40,9 @@ def create_recipe(user, **params):
 
 
 RECIPE_URL = reverse('recipe:recipe-list')
+BATCH_URL = reverse('recipe:recipe-batch')
+EXPORT_URL = reverse('recipe:recipe-export')
+SEARCH_URL = reverse('recipe:recipe-search')
 
 
 def detail_url(recipe_id):
@@ -214,3 +226,493 @@ class PrivateRecipeTest(TestCase):
         recipe = Recipe.objects.get(user=self.user)
         self.assertEqual(recipe.ingredients.count(), 2)
         self.assertEqual(recipe.user, self.user)
+
+    def test_list_is_not_paginated_by_default(self):
+        for index in range(3):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsInstance(res.data, list)
+        self.assertEqual(len(res.data), 3)
+
+    def test_list_paginated_with_cursor(self):
+        recipes = [create_recipe(user=self.user, title=f'Recipe {index}') for index in range(5)]
+        expected_ids = [recipe.id for recipe in reversed(recipes)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', res.data)
+        self.assertIsNone(res.data['previous'])
+        self.assertEqual([recipe['id'] for recipe in res.data['results']], expected_ids[:2])
+
+        seen_ids = []
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            seen_ids.extend(recipe['id'] for recipe in res.data['results'])
+            next_url = res.data['next']
+
+        self.assertEqual(seen_ids, expected_ids[2:])
+        self.assertIsNotNone(res.data['previous'])
+
+    @override_settings(API_MAX_PAGE_SIZE=2)
+    def test_list_page_size_limited(self):
+        for index in range(3):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+
+        res = self.client.get(RECIPE_URL, {'page_size': 100})
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_list_invalid_cursor(self):
+        res = self.client.get(RECIPE_URL, {'cursor': 'invalid'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_page_does_not_use_offset_or_count(self):
+        for index in range(5):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+        first_page = self.client.get(RECIPE_URL, {'page_size': 2})
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get(first_page.data['next'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for query in ctx.captured_queries:
+            self.assertNotIn('OFFSET', query['sql'])
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_create_recipe_reuses_existing_ingredient(self):
+        existing = Ingredient.objects.create(user=self.user, name='cheese')
+        payload = {
+            'title': 'Pizza',
+            'time_minutes': 15,
+            'price': Decimal('5.75'),
+            'ingredients': [{'name': 'cheese'}, {'name': 'tomato'}, {'name': 'cheese'}]
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        self.assertEqual(recipe.ingredients.count(), 2)
+        self.assertIn(existing, recipe.ingredients.all())
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+
+    def test_create_recipe_does_not_reuse_other_users_ingredient(self):
+        new_user = create_user(
+            email='new_user@example.com',
+            name="New User",
+            password="userpass123"
+        )
+        other = Ingredient.objects.create(user=new_user, name='cheese')
+        payload = {
+            'title': 'Pizza',
+            'time_minutes': 15,
+            'price': Decimal('5.75'),
+            'ingredients': [{'name': 'cheese'}]
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user)
+        ingredient = recipe.ingredients.get()
+        self.assertNotEqual(ingredient.id, other.id)
+        self.assertEqual(ingredient.user, self.user)
+
+    def test_update_recipe_ingredients(self):
+        recipe = create_recipe(user=self.user)
+        salt = Ingredient.objects.create(user=self.user, name='salt')
+        pepper = Ingredient.objects.create(user=self.user, name='pepper')
+        recipe.ingredients.add(salt, pepper)
+        payload = {
+            'ingredients': [{'name': 'salt'}, {'name': 'garlic'}]
+        }
+
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list('name', flat=True)),
+            ['garlic', 'salt']
+        )
+        self.assertEqual(sorted(item['name'] for item in res.data['ingredients']), ['garlic', 'salt'])
+        self.assertTrue(Ingredient.objects.filter(id=pepper.id).exists())
+
+    def test_update_recipe_clear_ingredients(self):
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='salt'))
+
+        res = self.client.patch(detail_url(recipe.id), {'ingredients': []}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(recipe.ingredients.exists())
+
+    def test_update_recipe_without_ingredients_keeps_them(self):
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='salt'))
+
+        res = self.client.patch(detail_url(recipe.id), {'title': 'New title'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(recipe.ingredients.count(), 1)
+
+    def test_update_recipe_unchanged_ingredients_no_writes(self):
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='salt'),
+            Ingredient.objects.create(user=self.user, name='pepper'),
+        )
+        payload = {
+            'ingredients': [{'name': 'pepper'}, {'name': 'salt'}]
+        }
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        writes = [query['sql'] for query in ctx.captured_queries if query['sql'].startswith(('INSERT', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+    def test_batch_create_recipes(self):
+        Ingredient.objects.create(user=self.user, name='cheese')
+        payload = [
+            {
+                'title': 'Pizza',
+                'time_minutes': 15,
+                'price': Decimal('5.75'),
+                'ingredients': [{'name': 'cheese'}, {'name': 'tomato'}]
+            },
+            {
+                'title': 'Toast',
+                'time_minutes': 5,
+                'price': Decimal('1.50'),
+                'description': 'Cheese toast',
+                'ingredients': [{'name': 'cheese'}, {'name': 'bread'}]
+            },
+            {
+                'title': 'Water',
+                'time_minutes': 1,
+                'price': Decimal('0.10'),
+            },
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in res.data], ['Pizza', 'Toast', 'Water'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 3)
+        toast = Recipe.objects.get(id=res.data[1]['id'])
+        self.assertEqual(toast.user, self.user)
+        self.assertEqual(toast.description, 'Cheese toast')
+        self.assertEqual(sorted(toast.ingredients.values_list('name', flat=True)), ['bread', 'cheese'])
+        self.assertEqual(sorted(item['name'] for item in res.data[0]['ingredients']), ['cheese', 'tomato'])
+
+    def test_batch_create_invalid_item(self):
+        payload = [
+            {'title': 'Pizza', 'time_minutes': 15, 'price': Decimal('5.75')},
+            {'title': 'Toast'},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('time_minutes', res.data[1])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    @override_settings(RECIPE_BATCH_MAX_SIZE=1)
+    def test_batch_create_too_many_items(self):
+        payload = [
+            {'title': 'Pizza', 'time_minutes': 15, 'price': Decimal('5.75')},
+            {'title': 'Toast', 'time_minutes': 5, 'price': Decimal('1.50')},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_batch_create_requires_list(self):
+        res = self.client.post(BATCH_URL, {'title': 'Pizza'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_ndjson(self):
+        first = create_recipe(user=self.user, title='Pizza', price=Decimal('5.50'))
+        first.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='cheese'),
+            Ingredient.objects.create(user=self.user, name='tomato'),
+        )
+        second = create_recipe(user=self.user, title='Toast')
+        create_recipe(
+            user=create_user(email='new_user@example.com', name='New User', password='userpass123'),
+            title='Not mine'
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual([recipe['id'] for recipe in recipes], [first.id, second.id])
+        self.assertEqual(recipes[0]['price'], '5.50')
+        self.assertEqual([item['name'] for item in recipes[0]['ingredients']], ['cheese', 'tomato'])
+        self.assertEqual(recipes[1]['ingredients'], [])
+
+    def test_export_csv(self):
+        recipe = create_recipe(user=self.user, title='Pizza, large')
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='cheese'))
+
+        res = self.client.get(EXPORT_URL, {'output': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(b''.join(res.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'title', 'time_minutes', 'price', 'description', 'ingredients'])
+        self.assertEqual(rows[1], [str(recipe.id), 'Pizza, large', '60', '5.30', 'Italiaz lazagne', 'cheese'])
+
+    def test_export_invalid_output(self):
+        res = self.client.get(EXPORT_URL, {'output': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    def test_export_loads_ingredients_per_chunk(self):
+        for index in range(5):
+            recipe = create_recipe(user=self.user, title=f'Recipe {index}')
+            recipe.ingredients.add(Ingredient.objects.create(user=self.user, name=f'ingredient {index}'))
+
+        res = self.client.get(EXPORT_URL)
+        with CaptureQueriesContext(connection) as ctx:
+            lines = b''.join(res.streaming_content).decode().splitlines()
+
+        self.assertEqual(len(lines), 5)
+        ingredient_queries = [query for query in ctx.captured_queries if 'core_recipe_ingredients' in query['sql']]
+        self.assertEqual(len(ingredient_queries), 3)
+
+    @override_settings(RECIPE_EXPORT_CHUNK_SIZE=2)
+    async def test_export_streams_under_asgi(self):
+        recipes = [await Recipe.objects.acreate(user=self.user, title=f'Recipe {index}', time_minutes=5, price=1)
+                   for index in range(5)]
+        token = await Token.objects.acreate(user=self.user)
+
+        res = await self.async_client.get(EXPORT_URL, headers={'Authorization': f'Token {token.key}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # Sent part by part, rather than read whole by Django first.
+        self.assertTrue(res.is_async)
+        parts = [part async for part in res.streaming_content]
+        self.assertEqual(len(parts), 3)
+        lines = b''.join(parts).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [recipe.id for recipe in recipes])
+
+    def test_search_title_ingredients_and_description(self):
+        by_title = create_recipe(user=self.user, title='Tomato soup', description='')
+        by_ingredient = create_recipe(user=self.user, title='Pizza', description='')
+        by_ingredient.ingredients.add(Ingredient.objects.create(user=self.user, name='tomato'))
+        by_description = create_recipe(user=self.user, title='Salad', description='Fresh tomatoes')
+        create_recipe(user=self.user, title='Pasta', description='')
+
+        res = self.client.get(SEARCH_URL, {'q': 'tomato'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [by_title.id, by_ingredient.id, by_description.id]
+        )
+        self.assertEqual(res.data['results'][1]['ingredients'][0]['name'], 'tomato')
+
+    def test_search_limited_to_user(self):
+        new_user = create_user(
+            email='new_user@example.com',
+            name="New User",
+            password="userpass123"
+        )
+        create_recipe(user=new_user, title='Tomato soup')
+
+        res = self.client.get(SEARCH_URL, {'q': 'tomato'})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_follows_ingredient_changes(self):
+        recipe = create_recipe(user=self.user, title='Pizza', description='')
+        ingredient = Ingredient.objects.create(user=self.user, name='basil')
+        recipe.ingredients.add(ingredient)
+
+        ingredient.name = 'oregano'
+        ingredient.save()
+        self.assertEqual(self.client.get(SEARCH_URL, {'q': 'basil'}).data['results'], [])
+        self.assertEqual(len(self.client.get(SEARCH_URL, {'q': 'oregano'}).data['results']), 1)
+
+        recipe.ingredients.remove(ingredient)
+        self.assertEqual(self.client.get(SEARCH_URL, {'q': 'oregano'}).data['results'], [])
+
+    def test_search_follows_recipe_update(self):
+        recipe = create_recipe(user=self.user, title='Pizza')
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Calzone'}, format='json')
+
+        self.assertEqual(self.client.get(SEARCH_URL, {'q': 'pizza'}).data['results'], [])
+        self.assertEqual(len(self.client.get(SEARCH_URL, {'q': 'calzone'}).data['results']), 1)
+
+    def test_search_paginated(self):
+        recipes = [create_recipe(user=self.user, title=f'Soup {index}') for index in range(5)]
+
+        res = self.client.get(SEARCH_URL, {'q': 'soup', 'page_size': 2})
+        seen_ids = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen_ids.extend(recipe['id'] for recipe in res.data['results'])
+
+        self.assertEqual(seen_ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_search_requires_query(self):
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_invalid_cursor(self):
+        res = self.client.get(SEARCH_URL, {'q': 'soup', 'cursor': 'invalid'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def _create_recipes_with_ingredients(self):
+        salt = Ingredient.objects.create(user=self.user, name='salt')
+        pepper = Ingredient.objects.create(user=self.user, name='pepper')
+        soup = create_recipe(user=self.user, title='Soup')
+        soup.ingredients.add(salt, pepper)
+        stew = create_recipe(user=self.user, title='Stew')
+        stew.ingredients.add(salt)
+        create_recipe(user=self.user, title='Salad')
+
+        return salt, pepper, soup, stew
+
+    def test_filter_any_ingredients(self):
+        salt, pepper, soup, stew = self._create_recipes_with_ingredients()
+
+        res = self.client.get(RECIPE_URL, {'ingredients_any': f'{pepper.id},salt'})
+
+        self.assertEqual([recipe['id'] for recipe in res.data], [stew.id, soup.id])
+
+    def test_filter_all_ingredients(self):
+        salt, pepper, soup, stew = self._create_recipes_with_ingredients()
+
+        res = self.client.get(RECIPE_URL, {'ingredients_all': f'{salt.id},pepper'})
+
+        self.assertEqual([recipe['id'] for recipe in res.data], [soup.id])
+
+    def test_filter_all_ingredients_same_ingredient_by_id_and_name(self):
+        salt, pepper, soup, stew = self._create_recipes_with_ingredients()
+
+        res = self.client.get(RECIPE_URL, {'ingredients_all': f'{salt.id},salt'})
+
+        self.assertEqual([recipe['id'] for recipe in res.data], [stew.id, soup.id])
+
+    def test_filter_all_ingredients_unknown_ingredient(self):
+        self._create_recipes_with_ingredients()
+
+        res = self.client.get(RECIPE_URL, {'ingredients_all': 'salt,saffron'})
+
+        self.assertEqual(res.data, [])
+
+    def test_filter_ingredients_of_other_user(self):
+        self._create_recipes_with_ingredients()
+        other = create_user(
+            email='other@example.com',
+            name='other',
+            password='pass123'
+        )
+        recipe = create_recipe(user=other)
+        recipe.ingredients.add(Ingredient.objects.create(user=other, name='saffron'))
+
+        for param in ('ingredients_any', 'ingredients_all'):
+            res = self.client.get(RECIPE_URL, {param: 'saffron'})
+
+            self.assertEqual(res.data, [])
+
+    def test_filter_all_ingredients_single_grouped_query(self):
+        salt, pepper, soup, stew = self._create_recipes_with_ingredients()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(RECIPE_URL, {'ingredients_all': 'salt,pepper'})
+
+        link_table = Recipe.ingredients.through._meta.db_table
+        recipe_queries = [query['sql'] for query in queries if 'FROM "core_recipe" ' in query['sql']]
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertEqual(recipe_queries[0].count(f'FROM "{link_table}"'), 1)
+        self.assertIn('GROUP BY', recipe_queries[0])
+
+    def test_filter_combines_with_search(self):
+        salt, pepper, soup, stew = self._create_recipes_with_ingredients()
+
+        res = self.client.get(SEARCH_URL, {'q': 'salt', 'ingredients_all': 'pepper'})
+
+        self.assertEqual([recipe['id'] for recipe in res.data['results']], [soup.id])
+
+    def test_list_sparse_fields_trim_query(self):
+        recipe = create_recipe(user=self.user, title='Soup')
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='salt'))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPE_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.data, [{'id': recipe.id, 'title': 'Soup'}])
+        recipe_queries = [query['sql'] for query in queries if 'core_recipe' in query['sql']]
+        self.assertEqual(len(recipe_queries), 1)
+        self.assertNotIn('"description"', recipe_queries[0])
+        self.assertNotIn('"price"', recipe_queries[0])
+
+    def test_list_expand_description(self):
+        recipe = create_recipe(user=self.user, description='Slowly')
+
+        res = self.client.get(RECIPE_URL, {'expand': 'description'})
+
+        self.assertEqual(res.data[0]['description'], 'Slowly')
+        self.assertEqual(res.data[0]['id'], recipe.id)
+        self.assertIn('ingredients', res.data[0])
+
+    def test_retrieve_sparse_fields(self):
+        recipe = create_recipe(user=self.user)
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='salt'))
+
+        res = self.client.get(detail_url(recipe.id), {'fields': 'ingredients'})
+
+        self.assertEqual(res.data, {'ingredients': [{'id': recipe.ingredients.get().id, 'name': 'salt'}]})
+
+    def test_sparse_fields_unknown_field(self):
+        create_recipe(user=self.user)
+
+        for params in ({'fields': 'id,user'}, {'expand': 'price'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fields_ignored_on_write(self):
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': Decimal('1.00')}
+
+        res = self.client.post(f'{RECIPE_URL}?fields=id', payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Soup')
+
+    def test_list_as_msgpack(self):
+        recipe = create_recipe(user=self.user, title='Soup')
+
+        res = self.client.get(RECIPE_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(res.content)
+        self.assertEqual(data, [RecipeSerializer(recipe).data])
+
+    def test_create_recipe_from_msgpack(self):
+        payload = {'title': 'Soup', 'time_minutes': 5, 'price': '1.50', 'ingredients': [{'name': 'salt'}]}
+
+        res = self.client.post(
+            RECIPE_URL, msgpack.packb(payload), content_type='application/msgpack', HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(msgpack.unpackb(res.content)['ingredients'][0]['name'], 'salt')
+        self.assertEqual(Recipe.objects.get(user=self.user).price, Decimal('1.50'))
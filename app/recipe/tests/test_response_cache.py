@@ -0,0 +1,251 @@
+"""Per-user response cache of the recipe and ingredient endpoints."""
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.cache import bump_data_version, get_response_cache
+from core.models import Ingredient, Recipe
+
+from recipe.tests.test_recipe_api import create_user, create_recipe, RECIPE_URL, BATCH_URL, detail_url
+
+from decimal import Decimal
+from unittest.mock import patch
+
+INGREDIENTS_URL = reverse('ingredient:ingredient-list')
+
+
+# Hits counted for no queries read the data version from a local cache
+# instead of the database one.
+LOCAL_DATA_VERSIONS = override_settings(DATA_VERSION_CACHE_ALIAS='default')
+
+
+def bump_data_version_elsewhere(user_id):
+    """Bump the data version as another process, e.g. `import_recipes`, does."""
+    other = caches.create_connection(settings.DATA_VERSION_CACHE_ALIAS)
+    with patch('core.cache.get_data_version_cache', return_value=other):
+        bump_data_version(user_id)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = create_user(
+            email='user@example.com',
+            name='user',
+            password='pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    @LOCAL_DATA_VERSIONS
+    def test_list_served_from_cache(self):
+        create_recipe(user=self.user, title='Soup')
+        first = self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPE_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+
+    @LOCAL_DATA_VERSIONS
+    def test_retrieve_served_from_cache(self):
+        recipe = create_recipe(user=self.user, title='Soup')
+        self.client.get(detail_url(recipe.id))
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['title'], 'Soup')
+
+    def test_not_found_not_cached(self):
+        self.client.get(detail_url(0))
+
+        recipe = create_recipe(user=self.user)
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_query_string_part_of_key(self):
+        for index in range(3):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+        self.client.get(RECIPE_URL)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_create_invalidates(self):
+        self.client.get(RECIPE_URL)
+
+        self.client.post(RECIPE_URL, {'title': 'Soup', 'time_minutes': 5, 'price': Decimal('1.00')}, format='json')
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_update_invalidates(self):
+        recipe = create_recipe(user=self.user, title='Soup')
+        self.client.get(detail_url(recipe.id))
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Stew'}, format='json')
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['title'], 'Stew')
+
+    def test_ingredient_update_through_recipe_invalidates(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+        self.client.get(INGREDIENTS_URL)
+
+        self.client.patch(detail_url(recipe.id), {'ingredients': [{'name': 'salt'}]}, format='json')
+
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual([item['name'] for item in res.data['ingredients']], ['salt'])
+        res = self.client.get(INGREDIENTS_URL)
+        self.assertEqual([item['name'] for item in res.data], ['salt'])
+
+    def test_m2m_change_invalidates(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(detail_url(recipe.id))
+
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='salt'))
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+    def test_batch_invalidates(self):
+        self.client.get(RECIPE_URL)
+
+        self.client.post(BATCH_URL, [{'title': 'Soup', 'time_minutes': 5, 'price': Decimal('1.00')}], format='json')
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data), 1)
+
+    def test_delete_invalidates(self):
+        recipe = create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        Recipe.objects.filter(id=recipe.id).get().delete()
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data, [])
+
+    @LOCAL_DATA_VERSIONS
+    def test_other_users_writes_keep_cache(self):
+        other = create_user(
+            email='other@example.com',
+            name='other',
+            password='pass123'
+        )
+        create_recipe(user=self.user)
+        self.client.get(RECIPE_URL)
+
+        create_recipe(user=other)
+
+        with self.assertNumQueries(0):
+            self.client.get(RECIPE_URL)
+
+    def test_write_in_another_process_invalidates(self):
+        recipe = create_recipe(user=self.user, title='Soup')
+        self.client.get(detail_url(recipe.id))
+
+        Recipe.objects.filter(pk=recipe.pk).update(title='Stew')
+        bump_data_version_elsewhere(self.user.id)
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.data['title'], 'Stew')
+
+    def test_cache_per_user(self):
+        other = create_user(
+            email='other@example.com',
+            name='other',
+            password='pass123'
+        )
+        create_recipe(user=self.user, title='Mine')
+        self.client.get(RECIPE_URL)
+
+        client = APIClient()
+        client.force_authenticate(user=other)
+        res = client.get(RECIPE_URL)
+
+        self.assertEqual(res.data, [])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        get_response_cache().clear()
+        self.user = create_user(
+            email='user@example.com',
+            name='user',
+            password='pass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_returns_etag(self):
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+
+    @LOCAL_DATA_VERSIONS
+    def test_matching_etag_not_modified(self):
+        recipe = create_recipe(user=self.user)
+        for url in (RECIPE_URL, detail_url(recipe.id), INGREDIENTS_URL):
+            etag = self.client.get(url)['ETag']
+
+            with self.assertNumQueries(0):
+                res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(res['ETag'], etag)
+            self.assertFalse(res.content)
+
+    def test_etag_changes_after_write(self):
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        self.client.patch(detail_url(recipe.id), {'title': 'Stew'}, format='json')
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['title'], 'Stew')
+
+    def test_etag_changes_after_write_in_another_process(self):
+        recipe = create_recipe(user=self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        Recipe.objects.filter(pk=recipe.pk).update(title='Stew')
+        bump_data_version_elsewhere(self.user.id)
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Stew')
+
+    def test_etag_differs_per_url(self):
+        for index in range(2):
+            create_recipe(user=self.user, title=f'Recipe {index}')
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        res = self.client.get(RECIPE_URL, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_differs_per_user(self):
+        other = create_user(
+            email='other@example.com',
+            name='other',
+            password='pass123'
+        )
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        client = APIClient()
+        client.force_authenticate(user=other)
+        res = client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
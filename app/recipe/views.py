@@ -1,24 +1,112 @@
-from rest_framework import viewsets, permissions, authentication
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
 
-from recipe.serializers import RecipeSerializer, DetailRecipeSerializer
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 
+from recipe.export import EXPORT_FORMATS, aiterate
+from recipe.filters import IngredientFilterBackend
+from recipe.serializers import RecipeSerializer, DetailRecipeSerializer, RecipeBatchSerializer
+
+from core.async_views import AsyncReadMixin
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ConditionalGetMixin, CachedResponseMixin, ReplicaReadMixin, SparseQuerysetMixin, ValuesReadMixin
+from core.pagination import KeysetPagination, RankedKeysetPagination
+from core.throttling import WriteThrottle
 from core.models import Recipe
 
+# Must match the configuration used by the search vector triggers.
+SEARCH_CONFIG = 'english'
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AsyncReadMixin,
+                    ReplicaReadMixin,
+                    ConditionalGetMixin,
+                    CachedResponseMixin,
+                    SparseQuerysetMixin,
+                    ValuesReadMixin,
+                    viewsets.ModelViewSet):
     serializer_class = DetailRecipeSerializer
     queryset = Recipe.objects.all()
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    throttle_classes = [WriteThrottle]
+    pagination_class = KeysetPagination
+    filter_backends = [IngredientFilterBackend]
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        queryset = self.queryset.filter(user=self.request.user).order_by('-id')
+
+        if self.action in ('list', 'retrieve', 'search'):
+            return self.get_sparse_queryset(queryset)
+
+        return queryset.defer('search_vector')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'search'):
             return RecipeSerializer
 
         return self.serializer_class
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """Create a list of recipes in one transaction.
+
+        Responds with the created recipes in request order, or with one
+        error object per item (empty for valid items) when any is invalid.
+        """
+        serializer = RecipeBatchSerializer(
+            data=request.data,
+            context=self.get_serializer_context(),
+            allow_empty=False,
+            max_length=settings.RECIPE_BATCH_MAX_SIZE
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all recipes of the user as NDJSON (default) or CSV (`?output=csv`)."""
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Choose one of: {", ".join(EXPORT_FORMATS)}.'})
+
+        stream, content_type = EXPORT_FORMATS[output]
+        content = stream(self.filter_queryset(self.get_queryset()))
+        if isinstance(request._request, ASGIRequest):
+            content = aiterate(content)
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="recipes.{output}"'
+
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Full-text search over title, ingredient names and description, best matches first."""
+        terms = request.query_params.get('q', '').strip()
+        if not terms:
+            raise ValidationError({'q': 'This query parameter is required.'})
+
+        query = SearchQuery(terms, config=SEARCH_CONFIG, search_type='websearch')
+        # ts_rank returns a real, cast so the rank in cursors round-trips exactly.
+        queryset = self.filter_queryset(self.get_queryset()).filter(search_vector=query).annotate(
+            rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+        ).order_by('-rank', '-id')
+
+        paginator = RankedKeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
@@ -1,23 +1,41 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.async_views import AsyncReadMixin
+from core.authentication import CachedTokenAuthentication
+from core.mixins import ReplicaReadMixin
+from core.throttling import AccountThrottle, IPThrottle
+
 from user.serializers import UserSerializer, UserTokenSerializer
 
 
 class UserCreateApiView(generics.CreateAPIView):
     serializer_class = UserSerializer
+    # No authentication, Basic authentication would hash a password before
+    # the throttles run.
+    authentication_classes = []
+    throttle_classes = [IPThrottle, AccountThrottle]
+    throttle_scope = 'create'
 
 
 class UserTokenApiView(ObtainAuthToken):
     serializer_class = UserTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    authentication_classes = []
+    throttle_classes = [IPThrottle, AccountThrottle]
+    throttle_scope = 'token'
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(AsyncReadMixin, ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         return self.request.user
+
+    async def aget(self, request, *args, **kwargs):
+        # The user is loaded by the async authentication, retrieving it
+        # runs no query.
+        return self.retrieve(request, *args, **kwargs)